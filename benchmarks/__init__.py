@@ -0,0 +1 @@
+"""Offline benchmarks for the Portfolio Manager MCP server."""
@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import sys
+import json
+import argparse
+from typing import Dict
+
+# Metrics compared between runs and whether a higher value is better
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "throughput_ops_per_s": True,
+    "peak_memory_mb": False,
+}
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", help="Result file of the baseline commit")
+    parser.add_argument("candidate", help="Result file of the commit under test")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percentage change counted as a regression (default: 10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    args = parser.parse_args()
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    if baseline.get("config") != candidate.get("config"):
+        print("Warning: runs used different benchmark configurations", file=sys.stderr)
+
+    print(f"{'scenario':<24} {'metric':<22} {baseline['commit']:>12} {candidate['commit']:>12} {'change':>9}")
+    regressions = 0
+    for scenario, before in baseline["scenarios"].items():
+        after = candidate["scenarios"].get(scenario)
+        if after is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in before or metric not in after or not before[metric]:
+                continue
+            change = (after[metric] - before[metric]) / before[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > args.threshold else ""
+            regressions += bool(flag)
+            print(f"{scenario:<24} {metric:<22} {before[metric]:>12.3f} {after[metric]:>12.3f} {change:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold}%", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Stand-in for the Alpha Vantage and NewsAPI services.
+
+FakeUpstream is an httpx transport that answers upstream requests from
+recorded payloads in benchmarks/recordings, falling back to deterministic
+synthetic payloads for anything that has not been recorded. Latency and
+rate-limit errors are injected from a seeded RNG so runs are repeatable.
+"""
+import os
+import json
+import zlib
+import random
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# Last trading day of the synthetic series, fixed so payloads never change between runs
+SYNTHETIC_END_DATE = date(2026, 1, 30)
+
+ALPHA_VANTAGE_HOST = "www.alphavantage.co"
+NEWS_API_HOST = "newsapi.org"
+
+def recording_path(function: str, key: str, recordings_dir: str = RECORDINGS_DIR) -> str:
+    """Get the file a recorded payload for (function, key) is stored in."""
+    safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+    return os.path.join(recordings_dir, f"{function}_{safe_key}.json")
+
+def _business_days(count: int) -> list:
+    days = []
+    current = SYNTHETIC_END_DATE
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current.isoformat())
+        current -= timedelta(days=1)
+    return days
+
+def _seed(key: str) -> int:
+    return zlib.crc32(key.encode("utf-8"))
+
+def synthetic_daily_series(symbol: str, days: int = 100) -> Dict[str, Any]:
+    """Build a TIME_SERIES_DAILY payload with a deterministic random walk for a symbol."""
+    rng = np.random.default_rng(_seed(symbol))
+    dates = _business_days(days)
+    closes = 20 + 280 * rng.random() * np.cumprod(1 + rng.normal(0.0004, 0.018, days))
+    series = {}
+    for i, day in enumerate(dates):
+        close = closes[i]
+        series[day] = {
+            "1. open": f"{close * (1 + rng.normal(0, 0.004)):.4f}",
+            "2. high": f"{close * 1.01:.4f}",
+            "3. low": f"{close * 0.99:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(int(rng.integers(100_000, 50_000_000))),
+        }
+    return {
+        "Meta Data": {"1. Information": "Daily Prices (open, high, low, close) and Volumes", "2. Symbol": symbol},
+        "Time Series (Daily)": series,
+    }
+
+def synthetic_intraday(symbol: str, interval_minutes: int = 5) -> Dict[str, Any]:
+    """Build a TIME_SERIES_INTRADAY payload for the last synthetic trading day of a symbol."""
+    rng = np.random.default_rng(_seed(f"{symbol}:intraday"))
+    closes = synthetic_daily_series(symbol)["Time Series (Daily)"]
+    close = float(closes[SYNTHETIC_END_DATE.isoformat()]["4. close"])
+    count = 390 // interval_minutes
+    path = close * np.cumprod(1 + rng.normal(0, 0.001, count))
+    series = {}
+    for i in range(count):
+        minutes = 9 * 60 + 30 + i * interval_minutes
+        stamp = f"{SYNTHETIC_END_DATE.isoformat()} {minutes // 60:02d}:{minutes % 60:02d}:00"
+        series[stamp] = {
+            "1. open": f"{path[i] * (1 + rng.normal(0, 0.0005)):.4f}",
+            "2. high": f"{path[i] * 1.001:.4f}",
+            "3. low": f"{path[i] * 0.999:.4f}",
+            "4. close": f"{path[i]:.4f}",
+            "5. volume": str(int(rng.integers(1_000, 500_000))),
+        }
+    return {
+        "Meta Data": {"1. Information": "Intraday Prices and Volumes", "2. Symbol": symbol,
+                      "4. Interval": f"{interval_minutes}min"},
+        f"Time Series ({interval_minutes}min)": series,
+    }
+
+def synthetic_global_quote(symbol: str, tick: int = 0) -> Dict[str, Any]:
+    """Build a GLOBAL_QUOTE payload; each tick moves the price one step of a deterministic random walk."""
+    closes = synthetic_daily_series(symbol)["Time Series (Daily)"]
+    days = list(closes)
+    previous_close = float(closes[days[1]]["4. close"])
+    rng = np.random.default_rng(_seed(f"{symbol}:quote"))
+    price = float(closes[days[0]]["4. close"]) * np.prod(1 + rng.normal(0, 0.001, tick + 1))
+    return {"Global Quote": {
+        "01. symbol": symbol,
+        "05. price": f"{price:.4f}",
+        "07. latest trading day": days[0],
+        "08. previous close": f"{previous_close:.4f}",
+        "09. change": f"{price - previous_close:.4f}",
+        "10. change percent": f"{(price / previous_close - 1) * 100:.4f}%",
+    }}
+
+def synthetic_fx_daily(pair: str, days: int = 100) -> Dict[str, Any]:
+    """Build an FX_DAILY payload with a deterministic rate path for a "FROM/TO" currency pair."""
+    from_currency, _, to_currency = pair.partition("/")
+    rng = np.random.default_rng(_seed(pair))
+    rates = (0.5 + 1.5 * rng.random()) * np.cumprod(1 + rng.normal(0, 0.004, days))
+    series = {}
+    for i, day in enumerate(_business_days(days)):
+        rate = rates[i]
+        series[day] = {
+            "1. open": f"{rate * (1 + rng.normal(0, 0.001)):.5f}",
+            "2. high": f"{rate * 1.003:.5f}",
+            "3. low": f"{rate * 0.997:.5f}",
+            "4. close": f"{rate:.5f}",
+        }
+    return {
+        "Meta Data": {"1. Information": "Forex Daily Prices (open, high, low, close)",
+                      "2. From Symbol": from_currency, "3. To Symbol": to_currency},
+        "Time Series FX (Daily)": series,
+    }
+
+def synthetic_treasury_yield(maturity: str, days: int = 250) -> Dict[str, Any]:
+    """Build a TREASURY_YIELD payload with a deterministic yield path for a maturity."""
+    rng = np.random.default_rng(_seed(maturity))
+    level = 3.5 + rng.random() * 1.5
+    data = []
+    for day in _business_days(days):
+        data.append({"date": day, "value": f"{level:.2f}"})
+        level = max(0.05, level + rng.normal(0, 0.03))
+    return {"name": f"{maturity} Treasury Yield", "interval": "daily", "unit": "percent", "data": data}
+
+def write_price_dump(path: str, symbols: List[str], days: int = 100) -> None:
+    """Write the synthetic daily series of several symbols as one bulk CSV dump."""
+    with open(path, "w") as f:
+        f.write("symbol,date,open,high,low,close,volume\n")
+        for symbol in symbols:
+            series = synthetic_daily_series(symbol, days)["Time Series (Daily)"]
+            for day, row in series.items():
+                f.write(f"{symbol},{day},{row['1. open']},{row['2. high']},{row['3. low']},"
+                        f"{row['4. close']},{row['5. volume']}\n")
+
+def synthetic_symbol_search(query: str) -> Dict[str, Any]:
+    """Build a SYMBOL_SEARCH payload whose best match is the query itself."""
+    symbol = query.upper().replace(" ", "")[:8]
+    return {"bestMatches": [{
+        "1. symbol": symbol,
+        "2. name": f"{query} Inc",
+        "3. type": "Equity",
+        "4. region": "United States",
+        "5. marketOpen": "09:30",
+        "6. marketClose": "16:00",
+        "7. timezone": "UTC-04",
+        "8. currency": "USD",
+        "9. matchScore": "1.0000",
+    }]}
+
+def synthetic_news(query: str, page_size: int) -> Dict[str, Any]:
+    """Build a NewsAPI /everything payload for a query."""
+    articles = []
+    for i, day in enumerate(_business_days(page_size)):
+        articles.append({
+            "source": {"id": None, "name": "Benchmark Wire"},
+            "title": f"{query} headline {i + 1}",
+            "description": f"Synthetic article {i + 1} about {query}.",
+            "url": f"https://example.com/{query}/{i + 1}",
+            "publishedAt": f"{day}T12:00:00Z",
+        })
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+class FakeUpstream(httpx.AsyncBaseTransport):
+    """
+    httpx transport that replays upstream payloads with injected latency and rate limiting.
+
+    Args:
+        latency: Base delay per request in seconds
+        jitter: Maximum extra random delay per request in seconds
+        rate_limit_rate: Probability that a request is answered with a rate-limit error
+        seed: Seed for the latency and error RNG
+        recordings_dir: Directory of recorded payloads
+    """
+    def __init__(self, latency: float = 0.02, jitter: float = 0.01, rate_limit_rate: float = 0.0,
+                 seed: int = 0, recordings_dir: str = RECORDINGS_DIR):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.recordings_dir = recordings_dir
+        self.calls = 0
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._bodies: Dict[Tuple[str, str], bytes] = {}
+        # Quotes requested per symbol, so that every request sees the price move
+        self._quote_ticks: Dict[str, int] = {}
+
+    def reset_counters(self) -> None:
+        """Reset the request and error counts."""
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _load(self, function: str, key: str) -> bytes:
+        """Get the serialized payload for (function, key), preferring a recording."""
+        cache_key = (function, key)
+        body = self._bodies.get(cache_key)
+        if body is not None:
+            return body
+
+        path = recording_path(function, key, self.recordings_dir)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                body = f.read()
+        else:
+            body = json.dumps(self._synthesize(function, key)).encode("utf-8")
+        self._bodies[cache_key] = body
+        return body
+
+    @staticmethod
+    def _synthesize(function: str, key: str) -> Dict[str, Any]:
+        if function == "TIME_SERIES_DAILY":
+            return synthetic_daily_series(key)
+        if function == "TIME_SERIES_INTRADAY":
+            return synthetic_intraday(key)
+        if function == "FX_DAILY":
+            return synthetic_fx_daily(key)
+        if function == "TREASURY_YIELD":
+            return synthetic_treasury_yield(key)
+        if function == "SYMBOL_SEARCH":
+            return synthetic_symbol_search(key)
+        if function == "NEWS":
+            query, _, page_size = key.partition(":")
+            return synthetic_news(query, int(page_size or 5))
+        return {"Error Message": f"Invalid API call. Unknown function {function}."}
+
+    def _rate_limit_response(self, host: str) -> httpx.Response:
+        self.rate_limited += 1
+        if host == NEWS_API_HOST:
+            return httpx.Response(429, json={
+                "status": "error", "code": "rateLimited",
+                "message": "You have made too many requests recently.",
+            })
+        # Alpha Vantage reports throttling with HTTP 200 and an informational note
+        return httpx.Response(200, json={
+            "Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day.",
+        })
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        rate_limited = self._rng.random() < self.rate_limit_rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        host = request.url.host
+        if rate_limited:
+            return self._rate_limit_response(host)
+
+        params = request.url.params
+        if host == ALPHA_VANTAGE_HOST:
+            function = params.get("function", "")
+            key = params.get("symbol") or params.get("maturity") or params.get("keywords") or ""
+            if function == "FX_DAILY":
+                key = f"{params.get('from_symbol', '')}/{params.get('to_symbol', '')}"
+            if function == "GLOBAL_QUOTE":
+                tick = self._quote_ticks[key] = self._quote_ticks.get(key, -1) + 1
+                body = json.dumps(synthetic_global_quote(key, tick)).encode("utf-8")
+            else:
+                body = self._load(function, key)
+        elif host == NEWS_API_HOST:
+            body = self._load("NEWS", f"{params.get('q', '')}:{params.get('pageSize', '5')}")
+        else:
+            return httpx.Response(404, json={"error": f"Unknown host {host}"})
+
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+def install(transport: Optional[FakeUpstream] = None, **options: Any) -> FakeUpstream:
+    """
+    Route the server's upstream requests through a FakeUpstream transport
+
+    Args:
+        transport: Transport to install; one is created from `options` when omitted
+        options: Keyword arguments for FakeUpstream
+
+    Returns:
+        The installed transport
+    """
+    from portfolio_server.api.http import set_transport
+
+    transport = transport or FakeUpstream(**options)
+    set_transport(transport)
+    return transport
@@ -0,0 +1,61 @@
+"""
+Record real upstream payloads for offline benchmark replay.
+
+Usage:
+    ALPHA_VANTAGE_API_KEY=... NEWS_API_KEY=... python -m benchmarks.record AAPL MSFT --treasury 10year
+
+Payloads are written to benchmarks/recordings and replayed by FakeUpstream
+in place of synthetic data. API keys are never written to disk.
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.fake_upstream import RECORDINGS_DIR, recording_path
+
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+async def _record(client: httpx.AsyncClient, url: str, params: dict, function: str, key: str) -> None:
+    response = await client.get(url, params=params)
+    payload = response.json()
+    if "Information" in payload or "Note" in payload or "Error Message" in payload:
+        print(f"Skipping {function} {key}: {next(iter(payload.values()))}", file=sys.stderr)
+        return
+    with open(recording_path(function, key), "w") as f:
+        json.dump(payload, f)
+    print(f"Recorded {function} {key}", file=sys.stderr)
+
+async def main(args: argparse.Namespace) -> None:
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    alpha_vantage_key = os.environ.get("ALPHA_VANTAGE_API_KEY", "demo")
+    news_api_key = os.environ.get("NEWS_API_KEY")
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        for symbol in args.symbols:
+            await _record(client, ALPHA_VANTAGE_URL,
+                          {"function": "TIME_SERIES_DAILY", "symbol": symbol, "apikey": alpha_vantage_key},
+                          "TIME_SERIES_DAILY", symbol)
+            await _record(client, ALPHA_VANTAGE_URL,
+                          {"function": "SYMBOL_SEARCH", "keywords": symbol, "apikey": alpha_vantage_key},
+                          "SYMBOL_SEARCH", symbol)
+            if news_api_key:
+                await _record(client, NEWS_API_URL,
+                              {"q": symbol, "apiKey": news_api_key, "sortBy": "publishedAt",
+                               "language": "en", "pageSize": 5},
+                              "NEWS", f"{symbol}:5")
+        for maturity in args.treasury:
+            await _record(client, ALPHA_VANTAGE_URL,
+                          {"function": "TREASURY_YIELD", "interval": "daily", "maturity": maturity,
+                           "apikey": alpha_vantage_key},
+                          "TREASURY_YIELD", maturity)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record upstream payloads for benchmark replay.")
+    parser.add_argument("symbols", nargs="*", help="Stock symbols to record")
+    parser.add_argument("--treasury", nargs="*", default=[], help="Treasury maturities to record (e.g. 10year)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,268 @@
+"""
+Offline benchmark harness.
+
+Runs server scenarios against FakeUpstream and writes p50/p99 latency,
+throughput and peak memory to benchmarks/results/<commit>.json so runs can
+be compared across commits with `python -m benchmarks.compare`.
+
+Usage:
+    python -m benchmarks.run                       # all scenarios
+    python -m benchmarks.run stock_prices_50 sse_clients --latency 0.05 --rate-limit 0.1
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import subprocess
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Scenario runners return (per-operation latencies in seconds, operation count)
+ScenarioResult = Tuple[List[float], int]
+
+def _symbols(count: int) -> List[str]:
+    return [f"SYM{i:03d}" for i in range(count)]
+
+def _stock_prices(count: int, warm: bool) -> Callable[[argparse.Namespace], Awaitable[ScenarioResult]]:
+    async def run(args: argparse.Namespace) -> ScenarioResult:
+        from portfolio_server.data.market_data import series_cache
+        from portfolio_server.tools.stock_tools import get_stock_prices
+
+        symbols = _symbols(count)
+        iterations = args.iterations or (20 if warm or count == 1 else max(2, 250 // count))
+        if warm:
+            await get_stock_prices(symbols)
+        latencies = []
+        for _ in range(iterations):
+            if not warm:
+                series_cache.invalidate()
+            started = time.perf_counter()
+            await get_stock_prices(symbols)
+            latencies.append(time.perf_counter() - started)
+        return latencies, iterations
+    return run
+
+def _local_stock_prices(count: int) -> Callable[[argparse.Namespace], Awaitable[ScenarioResult]]:
+    async def run(args: argparse.Namespace) -> ScenarioResult:
+        from benchmarks.fake_upstream import write_price_dump
+        from portfolio_server.data.market_data import series_cache
+        from portfolio_server.data.providers import LocalFileProvider, set_provider
+        from portfolio_server.tools.stock_tools import get_stock_prices
+
+        symbols = _symbols(count)
+        data_dir = tempfile.mkdtemp(prefix="portfolio-bench-dump-")
+        write_price_dump(os.path.join(data_dir, "prices.csv"), symbols)
+        provider = LocalFileProvider(data_dir)
+        # Compile the dump up front; the nightly build is not part of the request path
+        provider.store.refresh()
+        set_provider(provider)
+        latencies = []
+        try:
+            for _ in range(args.iterations or 5):
+                series_cache.invalidate()
+                started = time.perf_counter()
+                await get_stock_prices(symbols)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            set_provider(None)
+            series_cache.invalidate()
+        return latencies, len(latencies)
+    return run
+
+def _save_bench_portfolios(users: int) -> None:
+    from portfolio_server.data.storage import save_portfolio
+
+    pool = _symbols(50)
+    for i in range(users):
+        stocks = {pool[(i * 7 + j) % len(pool)]: 12.0 for j in range(5)}
+        save_portfolio(f"bench-user-{i}", {"stocks": stocks, "bonds": {"US10Y": 25.0, "CORP_AAA": 15.0}})
+
+async def _batch_reports(args: argparse.Namespace) -> ScenarioResult:
+    from portfolio_server.data.market_data import series_cache
+    from portfolio_server.tools.analysis_tools import generate_portfolio_report
+
+    users = args.users
+    _save_bench_portfolios(users)
+
+    latencies = []
+    for _ in range(args.iterations or 3):
+        series_cache.invalidate()
+        for i in range(users):
+            started = time.perf_counter()
+            await generate_portfolio_report(f"bench-user-{i}")
+            latencies.append(time.perf_counter() - started)
+    return latencies, len(latencies)
+
+async def _batch_charts(args: argparse.Namespace) -> ScenarioResult:
+    # One latency per batch run; the operation count is the number of charts written
+    from portfolio_server.charts.batch import render_portfolio_charts
+    from portfolio_server.data.market_data import series_cache
+
+    _save_bench_portfolios(args.users)
+    output_dir = tempfile.mkdtemp(prefix="portfolio-bench-charts-")
+    latencies, charts = [], 0
+    for _ in range(args.iterations or 2):
+        series_cache.invalidate()
+        started = time.perf_counter()
+        summary = await render_portfolio_charts(output_dir)
+        latencies.append(time.perf_counter() - started)
+        charts += summary["charts"]
+    return latencies, charts
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def _sse_clients(args: argparse.Namespace) -> ScenarioResult:
+    import uvicorn
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+    from portfolio_server.data.market_data import series_cache
+    from portfolio_server.sse import create_sse_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_sse_app(port), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    pool = _symbols(50)
+    latencies: List[float] = []
+
+    async def client(index: int) -> None:
+        async with sse_client(f"http://127.0.0.1:{port}/mcp/sse") as streams:
+            async with ClientSession(*streams) as session:
+                await session.initialize()
+                for call in range(args.calls):
+                    symbols = [pool[(index * 5 + call + j) % len(pool)] for j in range(5)]
+                    started = time.perf_counter()
+                    await session.call_tool("get_stock_prices", {"symbols": symbols})
+                    latencies.append(time.perf_counter() - started)
+
+    try:
+        series_cache.invalidate()
+        await asyncio.gather(*(client(i) for i in range(args.clients)))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    return latencies, len(latencies)
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace], Awaitable[ScenarioResult]]] = {
+    "stock_prices_1": _stock_prices(1, warm=False),
+    "stock_prices_50": _stock_prices(50, warm=False),
+    "stock_prices_500": _stock_prices(500, warm=False),
+    "stock_prices_50_warm": _stock_prices(50, warm=True),
+    "stock_prices_500_local": _local_stock_prices(500),
+    "batch_reports": _batch_reports,
+    "batch_charts": _batch_charts,
+    "sse_clients": _sse_clients,
+}
+
+def _run_scenario(name: str, args: argparse.Namespace, upstream) -> Dict[str, float]:
+    runner = SCENARIOS[name]
+    upstream.reset_counters()
+    started = time.perf_counter()
+    latencies, operations = asyncio.run(runner(args))
+    elapsed = time.perf_counter() - started
+    calls, rate_limited = upstream.calls, upstream.rate_limited
+
+    result = {
+        "operations": operations,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 3),
+        "throughput_ops_per_s": round(operations / elapsed, 3),
+        "upstream_calls": calls,
+        "upstream_rate_limited": rate_limited,
+    }
+
+    if args.memory:
+        # Measure memory in a separate pass so tracing overhead does not skew latency
+        tracemalloc.start()
+        asyncio.run(runner(args))
+        result["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 3)
+        tracemalloc.stop()
+    return result
+
+def _git(*command: str) -> str:
+    try:
+        return subprocess.run(["git", *command], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run offline benchmarks against a fake upstream.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=float, default=0.02, help="Upstream base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Upstream random extra latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Probability of an upstream rate-limit error")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for injected latency and errors")
+    parser.add_argument("--iterations", type=int, default=0, help="Iterations per scenario (default: per scenario)")
+    parser.add_argument("--users", type=int, default=50, help="Portfolios in the batch_reports and batch_charts scenarios")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent sessions in the sse_clients scenario")
+    parser.add_argument("--calls", type=int, default=5, help="Tool calls per session in the sse_clients scenario")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip peak memory measurement")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    # Keep benchmark portfolios out of the user's real data directory
+    os.environ["PORTFOLIO_DATA_DIR"] = tempfile.mkdtemp(prefix="portfolio-bench-")
+
+    from benchmarks.fake_upstream import install
+    upstream = install(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit, seed=args.seed)
+
+    # Import the server up front so import time is not charged to the first scenario
+    import portfolio_server.server  # noqa: F401
+
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = _run_scenario(name, args, upstream)
+        print(f"  {json.dumps(results[name])}", file=sys.stderr)
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "rate_limit": args.rate_limit,
+            "seed": args.seed,
+            "users": args.users,
+            "clients": args.clients,
+            "calls": args.calls,
+        },
+        "scenarios": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
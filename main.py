@@ -3,6 +3,7 @@ import signal
 import logging
 import time
 import socket
+from portfolio_server.profiling import configure_profiling
 from portfolio_server.server import create_mcp_server
 
 # Configure logging
@@ -51,17 +52,49 @@ def handle_shutdown_signal(signum, frame):
     is_shutting_down = True
     # Note: The actual shutdown happens in the main loop
 
-# Register signal handlers
-signal.signal(signal.SIGINT, handle_shutdown_signal)
-signal.signal(signal.SIGTERM, handle_shutdown_signal)
 
-# Create the MCP server at module level
-try:
-    mcp = create_mcp_server()
+def profile_from_args(args):
+    """Get the server profile requested on the command line, or None to use PORTFOLIO_SERVER_PROFILE."""
+    profile = None
+    for arg in args:
+        if arg == "--minimal":
+            profile = "minimal"
+        elif arg.startswith("--profile="):
+            profile = arg.split("=")[1]
+    return profile
+
+def profiling_from_args(args):
+    """Get the profiling mode requested on the command line, or None to use PORTFOLIO_PROFILING."""
+    mode = None
+    for arg in args:
+        if arg == "--profiling":
+            mode = "sample"
+        elif arg.startswith("--profiling="):
+            mode = arg.split("=")[1]
+    return mode
+
+def setup_profiling(args):
+    """Configure tool call profiling from the command line, exiting on an invalid mode."""
+    try:
+        # Profiling wraps tools as they are registered, so it is configured before any server is created
+        mode = configure_profiling(profiling_from_args(args))
+    except Exception as e:
+        logger.error(f"Failed to configure profiling: {e}")
+        sys.exit(1)
+    if mode != "off":
+        logger.info(f"Profiling tool calls in {mode} mode")
+
+def create_server(profile):
+    """Create the MCP server, exiting if it cannot be created."""
+    # Created here rather than at import time: worker processes started with the
+    # "spawn" method import this module again and must not build a server of their own
+    try:
+        mcp = create_mcp_server(profile)
+    except Exception as e:
+        logger.error(f"Failed to create MCP server: {e}")
+        sys.exit(1)
     logger.info("MCP server created successfully")
-except Exception as e:
-    logger.error(f"Failed to create MCP server: {e}")
-    sys.exit(1)
+    return mcp
 
 def validate_transport(transport_type):
     """Validate that the transport type is supported."""
@@ -100,7 +133,7 @@ def check_connection_status(transport_type, config=None):
         return False
 
 
-def run_server_with_retry(transport_type, config=None):
+def run_server_with_retry(mcp, transport_type, config=None):
     """Run the server with retry logic if the connection fails."""
     if config is None:
         config = {}
@@ -164,7 +197,13 @@ def run_server_with_retry(transport_type, config=None):
     return False
 
 if __name__ == "__main__":
+    # Register signal handlers
+    signal.signal(signal.SIGINT, handle_shutdown_signal)
+    signal.signal(signal.SIGTERM, handle_shutdown_signal)
+
     logger.info("Portfolio Manager MCP Server starting")
+    profile = profile_from_args(sys.argv[1:])
+    setup_profiling(sys.argv[1:])
 
     # Default
     transport = "stdio"
@@ -205,10 +244,10 @@ if __name__ == "__main__":
             port = config.get("port", TRANSPORT_CONFIG["sse"]["port"])
             host = "0.0.0.0"  # Default host
             logger.info(f"Starting SSE server on {host}:{port}")
-            run_sse_server(port=port, host=host)
+            run_sse_server(port=port, host=host, profile=profile)
         else:
             # For other transports, use the standard retry logic
-            success = run_server_with_retry(transport, config)
+            success = run_server_with_retry(create_server(profile), transport, config)
             if not success:
                 logger.error("Failed to start the server after all attempts.")
                 sys.exit(1)
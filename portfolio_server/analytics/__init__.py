@@ -0,0 +1 @@
+"""Numerical analytics for portfolio construction and risk."""
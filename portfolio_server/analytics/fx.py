@@ -0,0 +1,188 @@
+"""
+Currencies of listings and vectorized conversion between currencies.
+
+Exchange rates are fetched against a single pivot currency (USD), so one
+series per currency serves every base currency: the rate of currency C in
+base B is rate(C/USD) / rate(B/USD). An FxMatrix holds the rates of several
+currencies in one base currency on a shared date grid, one column per
+currency, and converts whole arrays of prices with one as-of lookup.
+
+The currency of a listing comes from the portfolio when it records one and
+is otherwise inferred from the Alpha Vantage exchange suffix ("SHOP.TRT" is
+listed in CAD); symbols without a suffix are taken to be US listings.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Currency every exchange rate series is quoted in
+PIVOT_CURRENCY = "USD"
+
+# Currency of the listings on each Alpha Vantage exchange suffix
+EXCHANGE_CURRENCIES = {
+    "LON": "GBX",
+    "TRT": "CAD",
+    "TRV": "CAD",
+    "DEX": "EUR",
+    "FRK": "EUR",
+    "PAR": "EUR",
+    "AMS": "EUR",
+    "BSE": "INR",
+    "NSE": "INR",
+    "SHH": "CNY",
+    "SHZ": "CNY",
+    "SAO": "BRL",
+}
+
+# Prices quoted in a fraction of a currency, as (currency, units per minor unit)
+MINOR_UNITS = {
+    "GBX": ("GBP", 0.01),
+    "ZAC": ("ZAR", 0.01),
+    "ILA": ("ILS", 0.01),
+}
+
+def major_currency(currency: str) -> Tuple[str, float]:
+    """
+    Get the currency a price is converted through and the factor to it
+
+    Args:
+        currency: Currency code, possibly a minor unit such as GBX (pence)
+
+    Returns:
+        Tuple of (currency code, units of that currency per unit of `currency`)
+    """
+    return MINOR_UNITS.get(currency, (currency, 1.0))
+
+def symbol_currency(symbol: str, overrides: Optional[Dict[str, str]] = None) -> str:
+    """
+    Get the currency a symbol is listed in
+
+    Args:
+        symbol: Stock symbol, optionally with an exchange suffix such as ".LON"
+        overrides: Currency per symbol recorded in the portfolio
+
+    Returns:
+        Currency code of the listing
+    """
+    if overrides and symbol in overrides:
+        return overrides[symbol]
+    _, separator, suffix = symbol.upper().rpartition(".")
+    if separator:
+        return EXCHANGE_CURRENCIES.get(suffix, PIVOT_CURRENCY)
+    return PIVOT_CURRENCY
+
+def required_fx_currencies(base: str, currencies: Sequence[str]) -> List[str]:
+    """
+    Get the currencies whose pivot rates are needed to convert into a base currency
+
+    Args:
+        base: Base currency
+        currencies: Currencies being converted
+
+    Returns:
+        Sorted major currencies other than the pivot
+    """
+    base_major = major_currency(base)[0]
+    needed = {major_currency(currency)[0] for currency in currencies} - {base_major}
+    if needed:
+        needed.add(base_major)
+    needed.discard(PIVOT_CURRENCY)
+    return sorted(needed)
+
+class FxMatrix:
+    """
+    Exchange rates of several currencies into one base currency, by date.
+
+    Args:
+        base: Currency the rates convert into
+        currencies: Currency of each column
+        dates: ISO dates of the rows, sorted ascending
+        rates: Array of shape (dates, currencies) with the base-currency value of
+            one unit of each column's currency; NaN where no rate is known
+    """
+    def __init__(self, base: str, currencies: List[str], dates: np.ndarray, rates: np.ndarray):
+        self.base = base
+        self.currencies = currencies
+        self.dates = dates
+        self.rates = rates
+        self._columns = {currency: i for i, currency in enumerate(currencies)}
+
+    def columns(self, currencies: Sequence[str]) -> np.ndarray:
+        """Get the column index of each of several currencies."""
+        return np.array([self._columns[currency] for currency in currencies], dtype=np.intp)
+
+    def rates_at(self, dates: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """
+        Look up the rates in effect on several dates at once
+
+        Each date uses the latest row on or before it, or the first row for
+        dates before the grid starts.
+
+        Args:
+            dates: ISO dates, any shape broadcastable with `columns`
+            columns: Column indexes from `columns()`
+
+        Returns:
+            Rates in the base currency, NaN where no rate is known
+        """
+        if not len(self.dates):
+            return np.full(np.broadcast(dates, columns).shape, np.nan)
+        rows = np.searchsorted(self.dates, dates, side="right") - 1
+        return self.rates[np.clip(rows, 0, len(self.dates) - 1), columns]
+
+    def latest(self, columns: np.ndarray) -> np.ndarray:
+        """Get the newest rates of several columns."""
+        if not len(self.dates):
+            return np.full(len(columns), np.nan)
+        return self.rates[-1, columns]
+
+def build_fx_matrix(base: str, currencies: Sequence[str],
+                    pivot_rates: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> FxMatrix:
+    """
+    Build the FX matrix of several currencies in a base currency
+
+    The rows are the union of the dates of every series used. A currency
+    without a fixing on a date keeps its previous rate (or takes its first
+    one at the start of the grid), as exchanges and FX markets close on
+    different holidays.
+
+    Args:
+        base: Currency to convert into
+        currencies: Currencies of the columns, minor units allowed
+        pivot_rates: (dates, rates) in the pivot currency per major currency;
+            a currency missing here gets NaN rates
+
+    Returns:
+        FxMatrix with one column per currency
+    """
+    currencies = list(dict.fromkeys(currencies))
+    dates = np.unique(np.concatenate([np.asarray(series_dates, dtype="<U10")
+                                      for series_dates, _ in pivot_rates.values()] or [np.array([], dtype="<U10")]))
+    if not len(dates):
+        # No rates are needed or known: one row that applies to every date
+        dates = np.array(["0001-01-01"])
+
+    def pivot_column(currency: str) -> np.ndarray:
+        # Value of one unit of `currency` in the pivot currency on every row
+        major, scale = major_currency(currency)
+        if major == PIVOT_CURRENCY:
+            return np.full(len(dates), scale)
+        series = pivot_rates.get(major)
+        if series is None or not len(series[0]):
+            return np.full(len(dates), np.nan)
+        series_dates, rates = series
+        rows = np.clip(np.searchsorted(series_dates, dates, side="right") - 1, 0, len(series_dates) - 1)
+        return rates[rows] * scale
+
+    def base_column(currency: str) -> np.ndarray:
+        major, scale = major_currency(currency)
+        base_major, base_scale = major_currency(base)
+        if major == base_major:
+            # Units of the same currency, such as pence in pounds, convert without a rate
+            return np.full(len(dates), scale / base_scale)
+        return pivot_column(currency) / pivot_column(base)
+
+    if not currencies:
+        return FxMatrix(base, [], dates, np.empty((len(dates), 0)))
+    rates = np.column_stack([base_column(currency) for currency in currencies])
+    return FxMatrix(base, currencies, dates, rates)
@@ -0,0 +1,221 @@
+"""
+Portfolio weight optimizers.
+
+All solvers work on fractional weights that sum to `total` with a per-asset
+upper bound, and accept an optional starting point so that re-solving after a
+small change converges in a handful of iterations.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+OPTIMIZATION_METHODS = ("mean_variance", "min_variance", "risk_parity")
+
+def project_capped_simplex(v: np.ndarray, total: float, upper: float) -> np.ndarray:
+    """
+    Project a vector onto {w : sum(w) = total, 0 <= w <= upper}.
+
+    Args:
+        v: Vector to project
+        total: Required sum of the projected weights
+        upper: Upper bound for every weight
+
+    Returns:
+        The closest feasible weight vector in Euclidean distance
+    """
+    if upper * len(v) < total - 1e-12:
+        raise ValueError(f"Infeasible bounds: {len(v)} assets capped at {upper:.4f} cannot sum to {total:.4f}")
+
+    # sum(clip(v - tau, 0, upper)) is non-increasing in tau, so bisect for the shift
+    low = np.min(v) - upper
+    high = np.max(v)
+    for _ in range(100):
+        tau = 0.5 * (low + high)
+        if np.clip(v - tau, 0.0, upper).sum() > total:
+            low = tau
+        else:
+            high = tau
+        if high - low < 1e-14:
+            break
+    return np.clip(v - 0.5 * (low + high), 0.0, upper)
+
+def _largest_eigenvalue(matrix: np.ndarray, iterations: int = 50) -> float:
+    """Estimate the largest eigenvalue of a symmetric PSD matrix by power iteration."""
+    x = np.ones(matrix.shape[0]) / np.sqrt(matrix.shape[0])
+    value = 0.0
+    for _ in range(iterations):
+        y = matrix @ x
+        norm = np.linalg.norm(y)
+        if norm == 0:
+            return 0.0
+        x = y / norm
+        if abs(norm - value) <= 1e-9 * norm:
+            break
+        value = norm
+    return float(norm)
+
+def _initial_weights(n: int, total: float, upper: float, w0: Optional[np.ndarray]) -> np.ndarray:
+    """Get a feasible starting point, preferring the warm start when one is given."""
+    if w0 is None:
+        w0 = np.full(n, total / n)
+    return project_capped_simplex(np.asarray(w0, dtype=float), total, upper)
+
+def _solve_quadratic(mu: np.ndarray, cov: np.ndarray, risk_aversion: float, total: float, upper: float,
+                     w0: Optional[np.ndarray], max_iter: int, tol: float) -> Tuple[np.ndarray, int]:
+    """
+    Minimize (risk_aversion / 2) w'Cw - mu'w over the capped simplex with accelerated projected gradient.
+    """
+    n = len(mu)
+    w = _initial_weights(n, total, upper, w0)
+    lipschitz = risk_aversion * _largest_eigenvalue(cov)
+    if lipschitz <= 0:
+        # Without curvature the problem is linear: fill the highest expected returns first
+        weights = np.zeros(n)
+        remaining = total
+        for i in np.argsort(-mu):
+            weights[i] = min(upper, remaining)
+            remaining -= weights[i]
+        return weights, 1
+    step = 1.0 / lipschitz
+
+    y = w.copy()
+    t = 1.0
+    for iteration in range(1, max_iter + 1):
+        gradient = risk_aversion * (cov @ y) - mu
+        w_next = project_capped_simplex(y - step * gradient, total, upper)
+        # Restart the momentum whenever it points uphill (O'Donoghue & Candes)
+        if gradient @ (w_next - w) > 0:
+            t = 1.0
+        t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+        y = w_next + ((t - 1.0) / t_next) * (w_next - w)
+        converged = np.max(np.abs(w_next - w)) < tol
+        w, t = w_next, t_next
+        if converged:
+            return w, iteration
+    return w, max_iter
+
+def solve_mean_variance(mu: np.ndarray, cov: np.ndarray, risk_aversion: float = 3.0, total: float = 1.0,
+                        upper: float = 1.0, w0: Optional[np.ndarray] = None,
+                        max_iter: int = 2000, tol: float = 1e-9) -> Tuple[np.ndarray, int]:
+    """
+    Find mean-variance optimal weights.
+
+    Args:
+        mu: Expected returns per asset
+        cov: Covariance matrix of returns
+        risk_aversion: Penalty applied to portfolio variance
+        total: Required sum of the weights
+        upper: Maximum weight of a single asset
+        w0: Optional warm-start weights
+        max_iter: Maximum number of solver iterations
+        tol: Convergence tolerance on the largest weight change
+
+    Returns:
+        Tuple of (weights, iterations used)
+    """
+    return _solve_quadratic(mu, cov, risk_aversion, total, upper, w0, max_iter, tol)
+
+def solve_min_variance(cov: np.ndarray, total: float = 1.0, upper: float = 1.0,
+                       w0: Optional[np.ndarray] = None,
+                       max_iter: int = 2000, tol: float = 1e-9) -> Tuple[np.ndarray, int]:
+    """
+    Find minimum-variance weights.
+
+    Args:
+        cov: Covariance matrix of returns
+        total: Required sum of the weights
+        upper: Maximum weight of a single asset
+        w0: Optional warm-start weights
+        max_iter: Maximum number of solver iterations
+        tol: Convergence tolerance on the largest weight change
+
+    Returns:
+        Tuple of (weights, iterations used)
+    """
+    return _solve_quadratic(np.zeros(cov.shape[0]), cov, 1.0, total, upper, w0, max_iter, tol)
+
+def solve_risk_parity(cov: np.ndarray, total: float = 1.0, upper: float = 1.0,
+                      w0: Optional[np.ndarray] = None,
+                      max_iter: int = 500, tol: float = 1e-9) -> Tuple[np.ndarray, int]:
+    """
+    Find equal-risk-contribution weights.
+
+    Uses cyclical coordinate descent on 0.5 y'Cy - sum(log y) / n, whose
+    normalized minimizer equalizes risk contributions. If the result breaks
+    the position cap it is projected back onto the feasible set.
+
+    Args:
+        cov: Covariance matrix of returns
+        total: Required sum of the weights
+        upper: Maximum weight of a single asset
+        w0: Optional warm-start weights
+        max_iter: Maximum number of coordinate sweeps
+        tol: Convergence tolerance on the largest weight change
+
+    Returns:
+        Tuple of (weights, sweeps used)
+    """
+    n = cov.shape[0]
+    diagonal = np.diag(cov).copy()
+    diagonal[diagonal <= 0] = 1e-12
+    budget = 1.0 / n
+
+    if w0 is None:
+        y = 1.0 / np.sqrt(diagonal)
+    else:
+        y = np.maximum(np.asarray(w0, dtype=float), 1e-8)
+    # Rescale the start so that y'Cy = 1, the optimum's natural scale
+    y /= np.sqrt(max(y @ cov @ y, 1e-18))
+
+    covariance_times_y = cov @ y
+    sweeps = max_iter
+    for sweep in range(1, max_iter + 1):
+        previous = y / y.sum()
+        for i in range(n):
+            off_diagonal = covariance_times_y[i] - diagonal[i] * y[i]
+            y_new = (-off_diagonal + np.sqrt(off_diagonal ** 2 + 4.0 * diagonal[i] * budget)) / (2.0 * diagonal[i])
+            covariance_times_y += cov[:, i] * (y_new - y[i])
+            y[i] = y_new
+        if np.max(np.abs(y / y.sum() - previous)) < tol:
+            sweeps = sweep
+            break
+
+    weights = total * y / y.sum()
+    if np.any(weights > upper + 1e-12):
+        weights = project_capped_simplex(weights, total, upper)
+    return weights, sweeps
+
+def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """Get each asset's fractional contribution to total portfolio variance."""
+    variance = weights @ cov @ weights
+    if variance <= 0:
+        return np.zeros_like(weights)
+    return weights * (cov @ weights) / variance
+
+class WarmStartCache:
+    """
+    Bounded LRU of recent solutions keyed by (user_id, method).
+
+    Solutions are stored per symbol, so a re-solve after adding, removing or
+    re-weighting a few holdings still starts next to the previous optimum.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._solutions: "OrderedDict[Tuple[str, str], Dict[str, float]]" = OrderedDict()
+
+    def initial_weights(self, key: Tuple[str, str], symbols: List[str], total: float) -> Optional[np.ndarray]:
+        """Get warm-start weights for the symbols, or None if there is no previous solution."""
+        previous = self._solutions.get(key)
+        if previous is None:
+            return None
+        self._solutions.move_to_end(key)
+        fallback = total / len(symbols)
+        return np.array([previous.get(symbol, fallback) for symbol in symbols])
+
+    def store(self, key: Tuple[str, str], symbols: List[str], weights: np.ndarray) -> None:
+        """Remember a solution for later warm starts."""
+        self._solutions[key] = dict(zip(symbols, weights.tolist()))
+        self._solutions.move_to_end(key)
+        while len(self._solutions) > self.max_entries:
+            self._solutions.popitem(last=False)
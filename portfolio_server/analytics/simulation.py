@@ -0,0 +1,126 @@
+"""
+Monte Carlo projection of portfolio value.
+
+Paths are simulated in fixed-size chunks, each with its own child seed
+spawned from the run seed, so a seeded run produces identical results
+whether the chunks are computed in-process or sharded across a process pool.
+
+The process pool is shared across calls (see portfolio_server.pools), so
+only the first sharded projection pays for starting the workers.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from portfolio_server.pools import SharedProcessPool
+
+SIMULATION_METHODS = ("bootstrap", "parametric")
+
+# Paths simulated per chunk; also the unit of work sent to pool workers
+CHUNK_PATHS = 5000
+
+TRADING_DAYS_PER_MONTH = 21
+
+# Limits on what one projection may ask for, so that a single call cannot
+# allocate an unbounded path matrix or start an unbounded number of processes
+MAX_SIMULATION_PATHS = int(os.environ.get("PORTFOLIO_MAX_SIMULATION_PATHS", "200000"))
+MAX_SIMULATION_WORKERS = int(os.environ.get("PORTFOLIO_MAX_SIMULATION_WORKERS", "0")) or os.cpu_count() or 1
+MAX_PROJECTION_YEARS = 100
+
+_pool = SharedProcessPool()
+
+def monthly_returns_from_daily(daily_returns: np.ndarray, window: int = TRADING_DAYS_PER_MONTH) -> np.ndarray:
+    """
+    Compound daily returns into overlapping monthly returns.
+
+    Args:
+        daily_returns: One-dimensional array of simple daily returns
+        window: Trading days per month
+
+    Returns:
+        Array of simple returns over every `window`-day span in the history
+    """
+    log_growth = np.concatenate(([0.0], np.cumsum(np.log1p(daily_returns))))
+    if len(log_growth) <= window:
+        # Too little history for a full month: scale the average daily growth instead
+        return np.array([np.expm1(log_growth[-1] / max(len(daily_returns), 1) * window)])
+    return np.expm1(log_growth[window:] - log_growth[:-window])
+
+def _simulate_chunk(args: Tuple) -> np.ndarray:
+    """
+    Simulate one chunk of paths and return values at the end of every year.
+
+    Kept at module level so it can be pickled for process-pool workers.
+    """
+    (seed_sequence, n_paths, months, initial_value, monthly_contribution,
+     method, sample, mu, sigma, fixed_return, risky_weight) = args
+    rng = np.random.default_rng(seed_sequence)
+
+    if method == "bootstrap":
+        risky = sample[rng.integers(0, len(sample), size=(n_paths, months))]
+    else:
+        risky = np.expm1(rng.normal(mu, sigma, size=(n_paths, months)))
+    growth = 1.0 + risky_weight * risky + (1.0 - risky_weight) * fixed_return
+
+    years = months // 12
+    values = np.full(n_paths, float(initial_value))
+    yearly = np.empty((years, n_paths))
+    for month in range(months):
+        values = values * growth[:, month] + monthly_contribution
+        if (month + 1) % 12 == 0:
+            yearly[(month + 1) // 12 - 1] = values
+    return yearly
+
+def simulate_yearly_values(initial_value: float, years: int, n_paths: int, method: str,
+                           monthly_contribution: float = 0.0,
+                           sample: Optional[np.ndarray] = None,
+                           mu: float = 0.0, sigma: float = 0.0,
+                           fixed_return: float = 0.0, risky_weight: float = 1.0,
+                           seed: Optional[int] = None, workers: int = 1) -> np.ndarray:
+    """
+    Simulate portfolio value paths with monthly compounding and contributions.
+
+    The risky sleeve draws monthly returns either by resampling `sample`
+    (bootstrap) or from a log-normal with monthly log mean `mu` and standard
+    deviation `sigma` (parametric). The rest of the portfolio earns the
+    deterministic monthly `fixed_return`.
+
+    Args:
+        initial_value: Starting portfolio value
+        years: Projection horizon in years
+        n_paths: Number of simulated paths
+        method: "bootstrap" or "parametric"
+        monthly_contribution: Amount added at the end of every month
+        sample: Historical monthly returns of the risky sleeve (bootstrap only)
+        mu: Monthly log-return mean of the risky sleeve (parametric only)
+        sigma: Monthly log-return standard deviation of the risky sleeve (parametric only)
+        fixed_return: Monthly return of the non-risky remainder
+        risky_weight: Fraction of the portfolio in the risky sleeve
+        seed: Seed for reproducible runs
+        workers: Number of processes to shard chunks across
+
+    Returns:
+        Array of shape (years, n_paths) with the value of every path at each year end
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method: {method}")
+    if method == "bootstrap" and (sample is None or len(sample) == 0):
+        raise ValueError("Bootstrap simulation requires a non-empty return sample")
+
+    months = years * 12
+    chunk_sizes = [CHUNK_PATHS] * (n_paths // CHUNK_PATHS)
+    if n_paths % CHUNK_PATHS:
+        chunk_sizes.append(n_paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [
+        (child, size, months, initial_value, monthly_contribution,
+         method, sample, mu, sigma, fixed_return, risky_weight)
+        for child, size in zip(seeds, chunk_sizes)
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        chunks = list(_pool.get(min(workers, len(tasks))).map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+    return np.concatenate(chunks, axis=1)
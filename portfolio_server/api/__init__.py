@@ -1,4 +1,19 @@
 """API clients for external services."""
 
-from portfolio_server.api.alpha_vantage import fetch_stock_data
+from portfolio_server.api.alpha_vantage import (
+    fetch_fx_daily,
+    fetch_global_quote,
+    fetch_intraday_data,
+    fetch_stock_data,
+    fetch_treasury_yield,
+)
 from portfolio_server.api.news_api import fetch_stock_news
+from portfolio_server.api.resilience import (
+    CircuitOpenError,
+    QuotaExceededError,
+    RateLimitedError,
+    UpstreamError,
+    UpstreamRequestError,
+    UpstreamTimeoutError,
+    UpstreamUnavailableError,
+)
@@ -2,11 +2,31 @@
 Alpha Vantage API client for fetching stock data.
 """
 import os
-import httpx
 from typing import Dict, Any, List
 
+from portfolio_server.api.http import get_json
+from portfolio_server.api.resilience import RateLimitedError, UpstreamRequestError
+
 ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "demo")
 
+def _check_payload(data: Any) -> None:
+    """
+    Raise for Alpha Vantage error notes, which are sent with HTTP 200
+    
+    "Note" and "Information" replace the requested data when the API key is
+    throttled or the endpoint needs a premium plan. "Error Message" (unknown
+    symbol) is left to callers, which treat it as missing data.
+    """
+    if not isinstance(data, dict):
+        return
+    message = data.get("Note") or data.get("Information")
+    if not message or len(data) > 1:
+        return
+    lowered = message.lower()
+    if "rate limit" in lowered or "call frequency" in lowered or "requests per" in lowered:
+        raise RateLimitedError("alpha_vantage", message)
+    raise UpstreamRequestError("alpha_vantage", message)
+
 async def fetch_stock_data(symbol: str) -> Dict[str, Any]:
     """
     Fetch stock data from Alpha Vantage API
@@ -19,10 +39,66 @@ async def fetch_stock_data(symbol: str) -> Dict[str, Any]:
     """
     url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        data = response.json()
-        return data
+    return await get_json(url, "alpha_vantage", "TIME_SERIES_DAILY", _check_payload)
+
+async def fetch_intraday_data(symbol: str, interval: str = "5min") -> Dict[str, Any]:
+    """
+    Fetch intraday price bars from Alpha Vantage API
+    
+    Args:
+        symbol: Stock symbol to fetch data for
+        interval: Bar length (1min, 5min, 15min, 30min or 60min)
+        
+    Returns:
+        Dictionary with the most recent intraday bars
+    """
+    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&apikey={ALPHA_VANTAGE_API_KEY}"
+    
+    return await get_json(url, "alpha_vantage", "TIME_SERIES_INTRADAY", _check_payload)
+
+async def fetch_global_quote(symbol: str) -> Dict[str, Any]:
+    """
+    Fetch the latest quote for a stock from Alpha Vantage API
+    
+    Args:
+        symbol: Stock symbol to fetch the quote for
+        
+    Returns:
+        Dictionary with the latest price and the previous close
+    """
+    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
+    
+    return await get_json(url, "alpha_vantage", "GLOBAL_QUOTE", _check_payload)
+
+async def fetch_fx_daily(from_currency: str, to_currency: str) -> Dict[str, Any]:
+    """
+    Fetch daily exchange rates from Alpha Vantage API
+    
+    Args:
+        from_currency: Currency being priced, e.g. EUR
+        to_currency: Currency the rate is quoted in, e.g. USD
+        
+    Returns:
+        Dictionary with daily open, high, low and close rates
+    """
+    url = f"https://www.alphavantage.co/query?function=FX_DAILY&from_symbol={from_currency}&to_symbol={to_currency}&apikey={ALPHA_VANTAGE_API_KEY}"
+    
+    return await get_json(url, "alpha_vantage", "FX_DAILY", _check_payload)
+
+async def fetch_treasury_yield(maturity: str, interval: str = "daily") -> Dict[str, Any]:
+    """
+    Fetch US treasury yield history from Alpha Vantage API
+    
+    Args:
+        maturity: Alpha Vantage maturity name (3month, 2year, 5year, 7year, 10year or 30year)
+        interval: Sampling interval (daily, weekly or monthly)
+        
+    Returns:
+        Dictionary with yield data, newest observation first
+    """
+    url = f"https://www.alphavantage.co/query?function=TREASURY_YIELD&interval={interval}&maturity={maturity}&apikey={ALPHA_VANTAGE_API_KEY}"
+    
+    return await get_json(url, "alpha_vantage", "TREASURY_YIELD", _check_payload)
 
 async def search_company(query: str) -> List[Dict[str, str]]:
     """
@@ -42,20 +118,18 @@ async def search_company(query: str) -> List[Dict[str, str]]:
     """
     url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={query}&apikey={ALPHA_VANTAGE_API_KEY}"
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        data = response.json()
-        
-        if "bestMatches" not in data:
-            return []
-            
-        results = []
-        for match in data["bestMatches"]:
-            results.append({
-                "symbol": match["1. symbol"],
-                "name": match["2. name"],
-                "type": match["3. type"],
-                "region": match["4. region"]
-            })
+    data = await get_json(url, "alpha_vantage", "SYMBOL_SEARCH", _check_payload)
+    
+    if "bestMatches" not in data:
+        return []
         
-        return results
+    results = []
+    for match in data["bestMatches"]:
+        results.append({
+            "symbol": match["1. symbol"],
+            "name": match["2. name"],
+            "type": match["3. type"],
+            "region": match["4. region"]
+        })
+    
+    return results
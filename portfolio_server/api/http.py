@@ -0,0 +1,112 @@
+"""
+Shared HTTP helper for upstream API clients.
+"""
+import time
+import httpx
+from typing import Any, Callable, Optional
+
+from portfolio_server.api.resilience import (
+    QuotaExceededError,
+    RateLimitedError,
+    UpstreamError,
+    UpstreamRequestError,
+    UpstreamTimeoutError,
+    UpstreamUnavailableError,
+    call_upstream,
+)
+from portfolio_server.metrics import UPSTREAM_CALLS, UPSTREAM_LATENCY, UPSTREAM_RESPONSE_BYTES
+from portfolio_server.profiling import record_upstream
+from portfolio_server.tenancy import charge_upstream, current_tenant
+
+# Transport used by every upstream client; None means real network access
+_transport: Optional[httpx.AsyncBaseTransport] = None
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """
+    Route all upstream requests through a custom httpx transport
+
+    Used to replay recorded responses in benchmarks and offline runs.
+
+    Args:
+        transport: Transport to use, or None to restore real network access
+    """
+    global _transport
+    _transport = transport
+
+def _error_message(response: httpx.Response) -> str:
+    """Get the provider's error message from a response, falling back to the status line."""
+    try:
+        data = response.json()
+        if isinstance(data, dict) and data.get("message"):
+            return str(data["message"])
+    except ValueError:
+        pass
+    return f"HTTP {response.status_code} {response.reason_phrase}"
+
+async def _request_json(url: str, provider: str, operation: str,
+                        validate: Optional[Callable[[Any], None]]) -> Any:
+    """Make a single request attempt, classify its outcome and record metrics."""
+    started = time.perf_counter()
+    # Stays "cancelled" only if the attempt is abandoned by a deadline or a faster hedge
+    status = "cancelled"
+    try:
+        async with httpx.AsyncClient(transport=_transport) as client:
+            response = await client.get(url)
+        UPSTREAM_RESPONSE_BYTES.observe(len(response.content), provider=provider, operation=operation)
+
+        if response.status_code == 429:
+            raise RateLimitedError(provider, _error_message(response))
+        if response.status_code >= 500:
+            raise UpstreamUnavailableError(provider, _error_message(response))
+        if response.status_code >= 400:
+            raise UpstreamRequestError(provider, _error_message(response))
+        try:
+            data = response.json()
+        except ValueError:
+            raise UpstreamUnavailableError(provider, f"{provider} returned a response that is not valid JSON")
+        if validate is not None:
+            validate(data)
+        status = "ok"
+        return data
+    except httpx.TimeoutException:
+        status = UpstreamTimeoutError.reason
+        raise UpstreamTimeoutError(provider, f"{provider} request timed out")
+    except httpx.TransportError as e:
+        status = UpstreamUnavailableError.reason
+        raise UpstreamUnavailableError(provider, f"Could not reach {provider}: {type(e).__name__}")
+    except UpstreamError as e:
+        status = e.reason
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_LATENCY.observe(elapsed, provider=provider, operation=operation)
+        UPSTREAM_CALLS.inc(provider=provider, operation=operation, status=status)
+        record_upstream(provider, operation, status, started, elapsed)
+
+async def get_json(url: str, provider: str, operation: str,
+                   validate: Optional[Callable[[Any], None]] = None) -> Any:
+    """
+    Fetch a URL and decode its JSON body under the upstream resilience policy
+
+    Each attempt is timed out, retried with jittered backoff if the failure is
+    retryable, and counted by the provider's circuit breaker. The call is
+    charged once, however many attempts it takes, to the current tenant's
+    upstream quota.
+
+    Args:
+        url: URL to fetch
+        provider: Upstream provider name used to label metrics (e.g. "alpha_vantage")
+        operation: Upstream operation name used to label metrics (e.g. "TIME_SERIES_DAILY")
+        validate: Optional check that raises an UpstreamError for error payloads sent with HTTP 200
+
+    Returns:
+        Decoded JSON response
+
+    Raises:
+        UpstreamError: When no attempt succeeds within the policy, or the tenant's quota is used up
+    """
+    wait = charge_upstream()
+    if wait is not None:
+        raise QuotaExceededError(provider, f"Upstream quota of tenant '{current_tenant.get()}' is used up; "
+                                           f"try again in {wait:.0f}s")
+    return await call_upstream(provider, lambda: _request_json(url, provider, operation, validate))
@@ -2,9 +2,11 @@
 News API client for fetching stock news.
 """
 import os
-import httpx
 from typing import Dict, Any, List
 
+from portfolio_server.api.http import get_json
+from portfolio_server.api.resilience import UpstreamError
+
 NEWS_API_KEY = os.environ.get("NEWS_API_KEY", "demo")
 
 async def fetch_stock_news(symbol: str, max_articles: int = 5) -> List[Dict[str, Any]]:
@@ -20,21 +22,22 @@ async def fetch_stock_news(symbol: str, max_articles: int = 5) -> List[Dict[str,
     """
     url = f"https://newsapi.org/v2/everything?q={symbol}&apiKey={NEWS_API_KEY}&sortBy=publishedAt&language=en&pageSize={max_articles}"
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        data = response.json()
+    try:
+        data = await get_json(url, "news_api", "everything")
+    except UpstreamError as e:
+        return [{"error": str(e)}]
+    
+    if data.get("status") != "ok":
+        return [{"error": data.get("message", "Unknown error")}]
+        
+    articles = []
+    for article in data.get("articles", [])[:max_articles]:
+        articles.append({
+            "title": article.get("title"),
+            "source": article.get("source", {}).get("name"),
+            "url": article.get("url"),
+            "published_at": article.get("publishedAt"),
+            "description": article.get("description")
+        })
         
-        if data.get("status") != "ok":
-            return [{"error": data.get("message", "Unknown error")}]
-            
-        articles = []
-        for article in data.get("articles", [])[:max_articles]:
-            articles.append({
-                "title": article.get("title"),
-                "source": article.get("source", {}).get("name"),
-                "url": article.get("url"),
-                "published_at": article.get("publishedAt"),
-                "description": article.get("description")
-            })
-            
-        return articles
+    return articles
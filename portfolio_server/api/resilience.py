@@ -0,0 +1,243 @@
+"""
+Resilience policies for upstream API calls.
+
+Every upstream request runs under a per-call deadline, is retried with
+jittered exponential backoff when the failure is retryable, and passes
+through a per-provider circuit breaker that fails fast while the provider
+is unhealthy. Requests can optionally be hedged: if the first attempt has
+not answered within `hedge_after` seconds, a duplicate is sent and the
+first successful response wins.
+"""
+import os
+import time
+import random
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from portfolio_server.metrics import CIRCUIT_STATE, UPSTREAM_HEDGES, UPSTREAM_RETRIES
+
+T = TypeVar("T")
+
+class UpstreamError(Exception):
+    """Base class for classified upstream failures."""
+    retryable = False
+    reason = "error"
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(message)
+        self.provider = provider
+
+class RateLimitedError(UpstreamError):
+    """The provider throttled the request."""
+    retryable = True
+    reason = "rate_limited"
+
+class UpstreamTimeoutError(UpstreamError):
+    """The request did not complete within its timeout or deadline."""
+    retryable = True
+    reason = "timeout"
+
+class UpstreamUnavailableError(UpstreamError):
+    """Connection failure, server error or unreadable response."""
+    retryable = True
+    reason = "unavailable"
+
+class UpstreamRequestError(UpstreamError):
+    """The provider rejected the request itself; retrying will not help."""
+    reason = "client_error"
+
+class CircuitOpenError(UpstreamError):
+    """The provider's circuit breaker is open and the request was not sent."""
+    reason = "circuit_open"
+
+class QuotaExceededError(UpstreamError):
+    """The calling tenant has used up its upstream call budget and the request was not sent."""
+    reason = "quota_exceeded"
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one provider.
+
+    After `failure_threshold` retryable failures in a row the breaker opens
+    and rejects calls for `reset_timeout` seconds. It then lets a single
+    probe through (half-open); success closes it, failure reopens it.
+    """
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(self._STATE_VALUES[state], provider=self.provider)
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._set_state(self.HALF_OPEN)
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Record a request that reached a healthy provider."""
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def release(self) -> None:
+        """Give back a probe slot whose request was abandoned without an outcome."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a retryable failure."""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+class ResiliencePolicy:
+    """
+    Timeouts, retries and hedging applied to upstream calls.
+
+    Args:
+        timeout: Maximum time for a single attempt in seconds
+        deadline: Maximum total time for a call including retries in seconds
+        max_retries: Retries after the first attempt for retryable failures
+        backoff_base: Backoff ceiling for the first retry in seconds; doubles per retry
+        backoff_max: Largest backoff ceiling in seconds
+        hedge_after: Send a duplicate request if no response arrives within this many seconds
+        failure_threshold: Consecutive failures that open a provider's circuit breaker
+        reset_timeout: Seconds an open breaker waits before letting a probe through
+    """
+    def __init__(self, timeout: float = 10.0, deadline: float = 20.0, max_retries: int = 2,
+                 backoff_base: float = 0.25, backoff_max: float = 2.0, hedge_after: Optional[float] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_env(cls) -> 'ResiliencePolicy':
+        """Create a policy from PORTFOLIO_UPSTREAM_* environment variables."""
+        hedge_after = float(os.environ.get("PORTFOLIO_UPSTREAM_HEDGE_AFTER", "0"))
+        return cls(
+            timeout=float(os.environ.get("PORTFOLIO_UPSTREAM_TIMEOUT", "10")),
+            deadline=float(os.environ.get("PORTFOLIO_UPSTREAM_DEADLINE", "20")),
+            max_retries=int(os.environ.get("PORTFOLIO_UPSTREAM_RETRIES", "2")),
+            hedge_after=hedge_after if hedge_after > 0 else None,
+            failure_threshold=int(os.environ.get("PORTFOLIO_UPSTREAM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.environ.get("PORTFOLIO_UPSTREAM_BREAKER_RESET", "30")),
+        )
+
+policy = ResiliencePolicy.from_env()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Get the circuit breaker for a provider, creating it on first use."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = _breakers[provider] = CircuitBreaker(provider, policy.failure_threshold, policy.reset_timeout)
+    return breaker
+
+async def _hedged(provider: str, request: Callable[[], Awaitable[T]], hedge_after: Optional[float]) -> T:
+    """Run a request, sending a duplicate if the first one is slow."""
+    if hedge_after is None:
+        return await request()
+
+    tasks = [asyncio.ensure_future(request())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            UPSTREAM_HEDGES.inc(provider=provider)
+            tasks.append(asyncio.ensure_future(request()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def call_upstream(provider: str, request: Callable[[], Awaitable[T]],
+                        call_policy: Optional[ResiliencePolicy] = None) -> T:
+    """
+    Run an upstream request under the resilience policy
+
+    Args:
+        provider: Provider name, used to select the circuit breaker
+        request: Factory returning a new awaitable for each attempt
+        call_policy: Policy to apply instead of the module default
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        UpstreamError: When the call cannot succeed within the policy
+    """
+    call_policy = call_policy or policy
+    breaker = get_breaker(provider)
+    deadline_at = time.monotonic() + call_policy.deadline
+
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(provider, f"{provider} is temporarily unavailable (circuit open)")
+
+        remaining = deadline_at - time.monotonic()
+        try:
+            result = await asyncio.wait_for(_hedged(provider, request, call_policy.hedge_after),
+                                            timeout=min(call_policy.timeout, remaining))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            error: UpstreamError = UpstreamTimeoutError(provider, f"{provider} did not respond in time")
+        except UpstreamError as e:
+            error = e
+        else:
+            breaker.record_success()
+            return result
+
+        if not error.retryable:
+            # The provider answered, so it is healthy even though the request failed
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+
+        attempt += 1
+        delay = random.uniform(0, min(call_policy.backoff_max, call_policy.backoff_base * 2 ** (attempt - 1)))
+        if attempt > call_policy.max_retries or time.monotonic() + delay >= deadline_at:
+            raise error
+        UPSTREAM_RETRIES.inc(provider=provider, reason=error.reason)
+        await asyncio.sleep(delay)
@@ -0,0 +1 @@
+"""Chart rendering and batch chart generation."""
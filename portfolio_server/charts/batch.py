@@ -0,0 +1,192 @@
+"""
+Batch chart generation for many portfolios.
+
+Rendering a chart is CPU-bound matplotlib work that holds the GIL, so the
+batch renderer spreads it over a pool of worker processes. The parent reads
+every portfolio, fetches the union of their symbols once through the series
+cache, and turns each portfolio into arrays; workers only import the
+renderers, draw, and write files. Jobs are submitted as soon as each
+portfolio's inputs are ready, so fetching and rendering overlap.
+
+The worker pool is shared across batches (see portfolio_server.pools), so
+a server rendering charts repeatedly starts its workers only once.
+
+Usage:
+    python -m portfolio_server.charts.batch OUTPUT_DIR [--format svg] [--dpi 80] [--workers 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.charts.data import CHART_KINDS, portfolio_chart_data
+from portfolio_server.charts.render import chart_options, render_to_file
+from portfolio_server.data.market_data import get_daily_series
+from portfolio_server.data.storage import PORTFOLIO_DIR, get_portfolio_path, list_portfolio_users, load_portfolio
+from portfolio_server.pools import SharedProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Worker processes rendering charts (default: one per CPU)
+CHART_WORKERS = int(os.environ.get("PORTFOLIO_CHART_WORKERS", "0")) or os.cpu_count() or 1
+
+# Directory the render_charts tool writes into; the command line may write anywhere
+CHART_OUTPUT_DIR = os.environ.get("PORTFOLIO_CHART_OUTPUT_DIR", os.path.join(PORTFOLIO_DIR, "charts"))
+
+# Charts rendered per portfolio when a batch does not choose
+DEFAULT_BATCH_CHARTS = ("allocation", "drawdown", "correlation")
+
+# Trading days of history in the price-based charts
+DEFAULT_CHART_DAYS = 365
+
+# Series fetched at once while warming the cache
+BATCH_FETCH_CONCURRENCY = 8
+
+def _init_worker() -> None:
+    # Pay for the matplotlib import and font cache once per worker, not in the first job
+    from matplotlib.figure import Figure
+    Figure().savefig(os.devnull, format="png")
+
+_pool = SharedProcessPool(initializer=_init_worker)
+
+# A single worker renders in a thread of this process and skips the process start-up
+_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+
+def _executor(workers: int) -> Executor:
+    return _thread if workers <= 1 else _pool.get(workers)
+
+async def _warm_series(symbols: Sequence[str]) -> None:
+    """Fetch every symbol's series into the cache, a bounded number at a time."""
+    semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+
+    async def fetch(symbol: str) -> None:
+        async with semaphore:
+            await get_daily_series(symbol)
+
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, UpstreamError):
+            raise result
+
+def _load_portfolios(user_ids: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+    portfolios = {}
+    for user_id in user_ids if user_ids is not None else list_portfolio_users():
+        if not os.path.exists(get_portfolio_path(user_id)):
+            continue
+        try:
+            portfolios[user_id] = load_portfolio(user_id)
+        except (OSError, ValueError):
+            # A damaged file should not abort the whole batch
+            logger.warning("Skipping unreadable portfolio of %s", user_id)
+    return portfolios
+
+async def render_portfolio_charts(output_dir: str,
+                                  user_ids: Optional[List[str]] = None,
+                                  charts: Optional[Sequence[str]] = None,
+                                  format: Optional[str] = None,
+                                  dpi: Optional[int] = None,
+                                  days: int = DEFAULT_CHART_DAYS,
+                                  workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Render charts of many users' portfolios into files
+
+    Files are named {user_id}_{chart}.{format} and overwrite earlier runs.
+
+    Args:
+        output_dir: Directory to write the charts into, created if missing
+        user_ids: Users to chart (default: every saved portfolio)
+        charts: Chart kinds from CHART_KINDS (default: DEFAULT_BATCH_CHARTS)
+        format: "png" or "svg" (default: PORTFOLIO_CHART_FORMAT)
+        dpi: PNG resolution (default: PORTFOLIO_CHART_DPI)
+        days: Trading days of history in the price-based charts
+        workers: Rendering processes (default: PORTFOLIO_CHART_WORKERS)
+
+    Returns:
+        Summary with the numbers of users, charts written, charts skipped for
+        lack of price data and failures, the bytes written and the elapsed seconds
+
+    Raises:
+        ValueError: If a chart kind, the format or the DPI is invalid
+    """
+    started = time.perf_counter()
+    kinds = list(dict.fromkeys(charts or DEFAULT_BATCH_CHARTS))
+    unknown = [kind for kind in kinds if kind not in CHART_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown chart(s) {', '.join(unknown)}. Valid options are: {', '.join(CHART_KINDS)}")
+    format, dpi = chart_options(format, dpi)
+    workers = workers or CHART_WORKERS
+    os.makedirs(output_dir, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    portfolios = await loop.run_in_executor(None, _load_portfolios, user_ids)
+    if kinds != ["allocation"]:
+        await _warm_series(sorted({symbol for portfolio in portfolios.values()
+                                   for symbol in portfolio.get("stocks", {})}))
+
+    skipped = 0
+    pending = []
+    executor = _executor(workers)
+    try:
+        for user_id, portfolio in portfolios.items():
+            try:
+                data = await portfolio_chart_data(user_id, portfolio, kinds, days)
+            except UpstreamError as e:
+                logger.warning("Skipping charts of %s: %s", user_id, e)
+                skipped += len(kinds)
+                continue
+            for kind, chart_data in data.items():
+                if chart_data is None:
+                    skipped += 1
+                    continue
+                path = os.path.join(output_dir, f"{user_id}_{kind}.{format}")
+                pending.append(loop.run_in_executor(executor, render_to_file, (path, kind, chart_data, format, dpi)))
+        results = await asyncio.gather(*pending)
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+
+    failures = [(path, error) for path, _, error in results if error]
+    for path, error in failures[:10]:
+        logger.warning("Rendering %s failed: %s", path, error)
+    return {
+        "users": len(portfolios),
+        "charts": len(results) - len(failures),
+        "skipped": skipped,
+        "failed": len(failures),
+        "bytes": sum(size for _, size, _ in results),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+        "failures": [{"path": path, "error": error} for path, error in failures[:10]],
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Render charts of every saved portfolio.")
+    parser.add_argument("output_dir", help="Directory to write the charts into")
+    parser.add_argument("--users", nargs="*", help="Users to chart (default: all)")
+    parser.add_argument("--charts", nargs="*", help=f"Charts per user: {', '.join(CHART_KINDS)} "
+                                                    f"(default: {', '.join(DEFAULT_BATCH_CHARTS)})")
+    parser.add_argument("--format", choices=["png", "svg"], help="Output format (default: PORTFOLIO_CHART_FORMAT)")
+    parser.add_argument("--dpi", type=int, help="PNG resolution (default: PORTFOLIO_CHART_DPI)")
+    parser.add_argument("--days", type=int, default=DEFAULT_CHART_DAYS, help="Trading days of history")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default: PORTFOLIO_CHART_WORKERS)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    try:
+        summary = asyncio.run(render_portfolio_charts(args.output_dir, args.users, args.charts,
+                                                      args.format, args.dpi, args.days, args.workers))
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Rendered {summary['charts']:,} charts for {summary['users']:,} users in {summary['seconds']}s "
+          f"({summary['skipped']:,} skipped, {summary['failed']:,} failed, {summary['bytes'] / 2 ** 20:.1f} MB)",
+          file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Chart inputs gathered from the cached series.
+
+Each function returns the keyword arguments of one renderer in render.py,
+or None when there is too little price data to draw the chart. Prices are
+read through the shared series cache, so charts of portfolios that hold the
+same symbols fetch each series once.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from portfolio_server.data.market_data import get_close_matrix, portfolio_currencies
+
+CHART_KINDS = ("allocation", "price_history", "drawdown", "correlation")
+
+def allocation_data(user_id: str, portfolio: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the inputs of a portfolio's allocation pie chart."""
+    return {
+        "stocks": dict(portfolio.get("stocks", {})),
+        "bonds": dict(portfolio.get("bonds", {})),
+        "title": f"Portfolio Allocation for User {user_id}",
+    }
+
+async def price_history_data(symbols: Sequence[str], days: int, title: Optional[str] = None,
+                             base: Optional[str] = None,
+                             currencies: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get the inputs of a price history chart
+
+    Args:
+        symbols: Stock symbols to draw
+        days: Trading days of history
+        title: Chart title (default: lists the symbols)
+        base: Currency to convert prices into (default: as listed)
+        currencies: Currency per symbol; others are inferred from the symbol
+    """
+    priced, dates, closes = await get_close_matrix(list(symbols), days, base, currencies)
+    if len(dates) < 2:
+        return None
+    return {
+        "symbols": priced,
+        "dates": dates,
+        "closes": closes,
+        "title": title or f"Price History: {', '.join(priced)}",
+    }
+
+def _weighted_values(symbols: List[str], closes: np.ndarray, stocks: Dict[str, float]) -> np.ndarray:
+    """Get the value of buying the stocks at their allocation weights on the first date and holding them."""
+    weights = np.array([stocks[symbol] for symbol in symbols], dtype=float)
+    weights /= weights.sum()
+    return (closes / closes[0]) @ weights * 100
+
+async def portfolio_chart_data(user_id: str, portfolio: Dict[str, Any], kinds: Sequence[str],
+                               days: int) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Get the inputs of several charts of one portfolio
+
+    The price-based charts cover the portfolio's stocks in its base currency
+    and share one close matrix. Bonds are left out of them, as there are no
+    bond price series.
+
+    Args:
+        user_id: Unique identifier for the user
+        portfolio: The user's portfolio
+        kinds: Charts to prepare, from CHART_KINDS
+        days: Trading days of history for the price-based charts
+
+    Returns:
+        Inputs per chart kind; None for charts without enough price data
+    """
+    data: Dict[str, Optional[Dict[str, Any]]] = {}
+    if "allocation" in kinds:
+        data["allocation"] = allocation_data(user_id, portfolio)
+    priced_kinds = [kind for kind in kinds if kind != "allocation"]
+    if not priced_kinds:
+        return data
+
+    stocks = {symbol: allocation for symbol, allocation in portfolio.get("stocks", {}).items() if allocation > 0}
+    base, currencies = portfolio_currencies(portfolio)
+    symbols, dates, closes = await get_close_matrix(list(stocks), days + 1, base, currencies)
+    enough = len(symbols) > 0 and len(dates) > 2
+    for kind in priced_kinds:
+        if not enough:
+            data[kind] = None
+        elif kind == "price_history":
+            data[kind] = {"symbols": symbols, "dates": dates, "closes": closes,
+                          "title": f"Price History for User {user_id} ({base})"}
+        elif kind == "drawdown":
+            data[kind] = {"dates": dates, "values": _weighted_values(symbols, closes, stocks),
+                          "title": f"Stock Holdings Value and Drawdown for User {user_id} ({base})"}
+        elif kind == "correlation":
+            data[kind] = {"symbols": symbols, "returns": closes[1:] / closes[:-1] - 1.0,
+                          "title": f"Daily Return Correlations for User {user_id}"}
+    return data
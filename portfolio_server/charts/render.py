@@ -0,0 +1,295 @@
+"""
+Chart rendering from plain arrays.
+
+Every chart is drawn on its own matplotlib Figure with the Agg canvas,
+never through pyplot, so no global figure state is shared between
+concurrent tool calls or kept alive between renders. The functions take
+arrays rather than portfolios so that they can run in worker processes of
+the batch renderer with cheaply pickled arguments.
+
+Charts are returned as PNG at a configurable DPI or as SVG. SVG text is
+kept as text rather than converted to paths, and long series are thinned
+to at most MAX_POINTS points, which keeps payloads small.
+"""
+import os
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.figure import Figure
+
+# Keep SVG text as <text> elements rather than one path per glyph. Set once
+# here: rc_context would change the global settings under concurrent renders.
+matplotlib.rcParams["svg.fonttype"] = "none"
+
+CHART_FORMATS = ("png", "svg")
+
+# Output format and PNG resolution used when a request does not choose one
+CHART_FORMAT = os.environ.get("PORTFOLIO_CHART_FORMAT", "png").strip().lower()
+CHART_DPI = int(os.environ.get("PORTFOLIO_CHART_DPI", "100"))
+
+# Highest resolution a request may ask for
+MAX_CHART_DPI = 300
+
+# Points drawn per line; longer series are thinned evenly
+MAX_POINTS = 500
+
+# Symbols whose correlations are written into the heatmap cells
+MAX_ANNOTATED_SYMBOLS = 12
+
+# Labelled dates along the time axis
+DATE_TICKS = 6
+
+CHART_SIZES = {
+    "allocation": (10, 7),
+    "price_history": (10, 5),
+    "drawdown": (10, 5),
+    "correlation": (8, 7),
+}
+
+# Fixed margins as fractions of the figure. Fitting them to the drawn
+# content (bbox_inches="tight" or a layout engine) costs an extra draw.
+CHART_MARGINS = {
+    "allocation": dict(left=0.05, right=0.95, bottom=0.05, top=0.92),
+    "price_history": dict(left=0.08, right=0.95, bottom=0.1, top=0.92),
+    "drawdown": dict(left=0.08, right=0.95, bottom=0.1, top=0.92, hspace=0.08),
+    "correlation": dict(left=0.14, right=0.9, bottom=0.14, top=0.93),
+}
+
+# MIME type of each output format
+MIME_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+def chart_options(format: Optional[str] = None, dpi: Optional[int] = None) -> tuple:
+    """
+    Resolve and validate a requested output format and DPI
+
+    Args:
+        format: "png" or "svg" (default: PORTFOLIO_CHART_FORMAT)
+        dpi: PNG resolution (default: PORTFOLIO_CHART_DPI)
+
+    Returns:
+        Tuple of (format, dpi)
+
+    Raises:
+        ValueError: If the format is unknown or the DPI out of range
+    """
+    format = (format or CHART_FORMAT).strip().lower()
+    if format not in CHART_FORMATS:
+        raise ValueError(f"Unknown chart format '{format}'. Valid options are: {', '.join(CHART_FORMATS)}")
+    dpi = CHART_DPI if dpi is None else int(dpi)
+    if not 20 <= dpi <= MAX_CHART_DPI:
+        raise ValueError(f"Chart DPI must be between 20 and {MAX_CHART_DPI}")
+    return format, dpi
+
+def _figure(kind: str) -> Figure:
+    figure = Figure(figsize=CHART_SIZES[kind])
+    figure.subplots_adjust(**CHART_MARGINS[kind])
+    return figure
+
+def _save(figure: Figure, format: str, dpi: int) -> bytes:
+    buf = BytesIO()
+    figure.savefig(buf, format=format, dpi=dpi)
+    return buf.getvalue()
+
+def _thin(length: int) -> np.ndarray:
+    """Get the indexes of at most MAX_POINTS evenly spaced points, always keeping the last one."""
+    if length <= MAX_POINTS:
+        return np.arange(length)
+    return np.unique(np.linspace(0, length - 1, MAX_POINTS).round().astype(np.intp))
+
+def _date_axis(axes, dates: np.ndarray) -> None:
+    """
+    Label a time axis whose x values are row positions in `dates`
+
+    Plotting against positions with a few fixed labels avoids matplotlib's
+    date locators, which dominate the drawing time of a time series.
+    """
+    ticks = np.unique(np.linspace(0, len(dates) - 1, min(DATE_TICKS, len(dates))).round().astype(np.intp))
+    axes.set_xticks(ticks, labels=[str(dates[i]) for i in ticks])
+    if len(dates) > 1:
+        axes.set_xlim(0, len(dates) - 1)
+
+def render_allocation(stocks: Dict[str, float], bonds: Dict[str, float], title: str,
+                      format: str = "png", dpi: int = CHART_DPI) -> bytes:
+    """
+    Render a pie chart of portfolio allocations
+
+    Args:
+        stocks: Allocation percentage per stock, drawn in blue shades
+        bonds: Allocation percentage per bond, drawn in green shades
+        title: Chart title
+        format: "png" or "svg"
+        dpi: PNG resolution
+
+    Returns:
+        Encoded chart
+    """
+    labels, sizes, colors = [], [], []
+    for i, (symbol, allocation) in enumerate(stocks.items()):
+        labels.append(f"{symbol} ({allocation}%)")
+        sizes.append(allocation)
+        colors.append((0, 0, min(0.8, 0.3 + (i * 0.1))))
+    for i, (bond_id, allocation) in enumerate(bonds.items()):
+        labels.append(f"{bond_id} ({allocation}%)")
+        sizes.append(allocation)
+        colors.append((0, min(0.8, 0.3 + (i * 0.1)), 0))
+
+    figure = _figure("allocation")
+    axes = figure.subplots()
+    if sizes:
+        axes.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
+    axes.axis('equal')  # Equal aspect ratio ensures the pie chart is circular
+    axes.set_title(title)
+    return _save(figure, format, dpi)
+
+def render_price_history(symbols: Sequence[str], dates: np.ndarray, closes: np.ndarray, title: str,
+                         format: str = "png", dpi: int = CHART_DPI) -> bytes:
+    """
+    Render closing prices of several symbols, rebased to 100 at the first date
+
+    Args:
+        symbols: Symbol of each column
+        dates: ISO dates, oldest first
+        closes: Array of shape (dates, symbols)
+        title: Chart title
+        format: "png" or "svg"
+        dpi: PNG resolution
+
+    Returns:
+        Encoded chart
+    """
+    keep = _thin(len(dates))
+    rebased = closes[keep] / closes[0] * 100
+
+    figure = _figure("price_history")
+    axes = figure.subplots()
+    for j, symbol in enumerate(symbols):
+        axes.plot(keep, rebased[:, j], linewidth=1.2, label=symbol)
+    axes.axhline(100, color="grey", linewidth=0.8, linestyle="--")
+    axes.set_ylabel("Value of 100 invested")
+    axes.set_title(title)
+    axes.grid(True, alpha=0.3)
+    if len(symbols) <= 15:
+        axes.legend(loc="upper left", fontsize="small", ncol=max(1, len(symbols) // 8 + 1))
+    _date_axis(axes, dates)
+    return _save(figure, format, dpi)
+
+def drawdowns(values: np.ndarray) -> np.ndarray:
+    """Get the fall of a value series from its running peak, as a negative fraction."""
+    peaks = np.maximum.accumulate(values)
+    return values / peaks - 1.0
+
+def render_drawdown(dates: np.ndarray, values: np.ndarray, title: str,
+                    format: str = "png", dpi: int = CHART_DPI) -> bytes:
+    """
+    Render a value series above its drawdown from the running peak
+
+    Args:
+        dates: ISO dates, oldest first
+        values: Portfolio value on each date
+        title: Chart title
+        format: "png" or "svg"
+        dpi: PNG resolution
+
+    Returns:
+        Encoded chart
+    """
+    drawdown = drawdowns(values) * 100
+    keep = _thin(len(dates))
+    # The deepest point is always drawn, even when thinning would skip it
+    keep = np.union1d(keep, [int(np.argmin(drawdown))]) if len(drawdown) else keep
+
+    figure = _figure("drawdown")
+    value_axes, drawdown_axes = figure.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios": [2, 1]})
+    value_axes.plot(keep, values[keep] / values[0] * 100, color="navy", linewidth=1.2)
+    value_axes.set_ylabel("Value of 100 invested")
+    value_axes.set_title(title)
+    value_axes.grid(True, alpha=0.3)
+    drawdown_axes.fill_between(keep, drawdown[keep], 0, color="firebrick", alpha=0.4, linewidth=0)
+    drawdown_axes.plot(keep, drawdown[keep], color="firebrick", linewidth=0.8)
+    drawdown_axes.set_ylabel("Drawdown (%)")
+    drawdown_axes.grid(True, alpha=0.3)
+    if len(drawdown):
+        deepest = int(np.argmin(drawdown))
+        drawdown_axes.annotate(f"{drawdown[deepest]:.1f}%",
+                               (deepest, drawdown[deepest]),
+                               textcoords="offset points", xytext=(-6, 0), ha="right", va="center", fontsize="small")
+    _date_axis(drawdown_axes, dates)
+    return _save(figure, format, dpi)
+
+def render_correlation(symbols: List[str], returns: np.ndarray, title: str,
+                       format: str = "png", dpi: int = CHART_DPI) -> bytes:
+    """
+    Render a heatmap of the correlations between several symbols' daily returns
+
+    Args:
+        symbols: Symbol of each column
+        returns: Daily returns of shape (days, symbols)
+        title: Chart title
+        format: "png" or "svg"
+        dpi: PNG resolution
+
+    Returns:
+        Encoded chart
+    """
+    correlation = np.atleast_2d(np.corrcoef(returns, rowvar=False)) if len(symbols) > 1 else np.ones((1, 1))
+    n = len(symbols)
+
+    figure = _figure("correlation")
+    axes = figure.subplots()
+    image = axes.imshow(correlation, cmap="RdBu_r", vmin=-1, vmax=1)
+    figure.colorbar(image, ax=axes, fraction=0.046, pad=0.04, label="Correlation")
+    axes.set_xticks(range(n), labels=symbols, rotation=90 if n > 8 else 45, ha="right" if n <= 8 else "center",
+                    fontsize="small")
+    axes.set_yticks(range(n), labels=symbols, fontsize="small")
+    if n <= MAX_ANNOTATED_SYMBOLS:
+        for i in range(n):
+            for j in range(n):
+                axes.text(j, i, f"{correlation[i, j]:.2f}", ha="center", va="center", fontsize="x-small",
+                          color="white" if abs(correlation[i, j]) > 0.6 else "black")
+    axes.set_title(title)
+    return _save(figure, format, dpi)
+
+RENDERERS = {
+    "allocation": render_allocation,
+    "price_history": render_price_history,
+    "drawdown": render_drawdown,
+    "correlation": render_correlation,
+}
+
+def render_chart(kind: str, data: Dict[str, Any], format: str = "png", dpi: int = CHART_DPI) -> bytes:
+    """
+    Render a chart of any kind
+
+    Args:
+        kind: Key of RENDERERS
+        data: Keyword arguments of the renderer, other than format and dpi
+        format: "png" or "svg"
+        dpi: PNG resolution
+
+    Returns:
+        Encoded chart
+    """
+    return RENDERERS[kind](**data, format=format, dpi=dpi)
+
+def render_to_file(job: Tuple[str, str, Dict[str, Any], str, int]) -> Tuple[str, int, Optional[str]]:
+    """
+    Render a chart into a file, for the batch renderer's worker processes
+
+    Args:
+        job: Tuple of (path, kind, data, format, dpi)
+
+    Returns:
+        Tuple of (path, bytes written, error message or None)
+    """
+    path, kind, data, format, dpi = job
+    try:
+        content = render_chart(kind, data, format, dpi)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path, len(content), None
+    except Exception as e:
+        # One bad chart should not fail the rest of the worker's chunk
+        return path, 0, f"{type(e).__name__}: {e}"
@@ -2,6 +2,11 @@
 
 from portfolio_server.data.storage import (
     get_portfolio_path,
+    list_portfolio_users,
     load_portfolio,
     save_portfolio,
+    save_portfolios,
 )
+
+# Record every saved portfolio in its user's history log
+from portfolio_server.data import history
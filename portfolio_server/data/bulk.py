@@ -0,0 +1,273 @@
+"""
+Streaming import and export of many portfolios in CSV or JSON Lines files.
+
+CSV files hold one row per investment, for example a broker export:
+
+    user_id,asset_type,symbol,allocation
+    alice,stock,AAPL,30
+    alice,bond,US10Y,70
+
+JSON Lines files hold one portfolio per line:
+
+    {"user_id": "alice", "stocks": {"AAPL": 30}, "bonds": {"US10Y": 70}}
+
+Rows for the same user may appear anywhere in the file and are merged.
+Files ending in .gz are compressed and decompressed on the fly.
+
+The import and export tools only read and write files in TRANSFER_DIR, so
+a client cannot reach other files on the server.
+"""
+import os
+import io
+import csv
+import gzip
+import json
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from portfolio_server.data.storage import PORTFOLIO_DIR, confined_path
+
+BULK_FORMATS = ("csv", "jsonl")
+
+# Directory that bulk files are imported from and exported to
+TRANSFER_DIR = os.environ.get("PORTFOLIO_TRANSFER_DIR", os.path.join(PORTFOLIO_DIR, "transfers"))
+
+# File names accepted for bulk files
+BULK_SUFFIXES = (".csv", ".jsonl", ".ndjson", ".csv.gz", ".jsonl.gz", ".ndjson.gz")
+
+CSV_COLUMNS = ("user_id", "asset_type", "symbol", "allocation")
+
+# Asset type names accepted in CSV files and the portfolio section they map to
+ASSET_TYPES = {"stock": "stocks", "stocks": "stocks", "equity": "stocks",
+               "bond": "bonds", "bonds": "bonds", "fixed_income": "bonds"}
+
+# Total allocation range accepted for a portfolio, as in update_portfolio
+MIN_TOTAL_ALLOCATION = 95.0
+MAX_TOTAL_ALLOCATION = 105.0
+
+# Allocations parsed per user: {"stocks": {...}, "bonds": {...}}
+Allocations = Dict[str, Dict[str, float]]
+
+# Parsed row: (line, user id, section, symbol, allocation or the error that rejected the row)
+Row = Tuple[int, str, str, str, Union[float, ValueError]]
+
+def detect_format(path: str, format: Optional[str] = None) -> str:
+    """
+    Get the bulk file format from an explicit name or the file extension
+
+    Args:
+        path: File path
+        format: "csv" or "jsonl", or None to use the extension
+
+    Returns:
+        Format name
+    """
+    if format:
+        format = format.lower()
+        if format not in BULK_FORMATS:
+            raise ValueError(f"Unsupported format '{format}'. Use one of: {', '.join(BULK_FORMATS)}")
+        return format
+    name = path.lower()[:-3] if path.lower().endswith(".gz") else path.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of '{path}'. Pass format='csv' or format='jsonl'.")
+
+def transfer_path(path: str) -> str:
+    """
+    Resolve a client-supplied bulk file path inside TRANSFER_DIR
+
+    Args:
+        path: File name, or path relative to or inside TRANSFER_DIR
+
+    Returns:
+        Absolute path of the file
+
+    Raises:
+        ValueError: If the path leaves TRANSFER_DIR or is not a bulk file name
+    """
+    if not path.lower().endswith(BULK_SUFFIXES):
+        raise ValueError(f"'{path}' is not a bulk file. Use one of: {', '.join(BULK_SUFFIXES)}")
+    os.makedirs(TRANSFER_DIR, exist_ok=True)
+    return confined_path(TRANSFER_DIR, path)
+
+def check_user_ids(user_ids: Iterable[Any]) -> List[str]:
+    """
+    Validate user ids given by a client
+
+    Raises:
+        ValueError: If an id is empty or would escape the portfolio directory
+    """
+    return [_check_user_id(user_id) for user_id in user_ids]
+
+def _open_text(path: str, mode: str, compressed: Optional[bool] = None) -> io.TextIOBase:
+    if compressed is None:
+        compressed = path.lower().endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _check_user_id(user_id: Any) -> str:
+    """Reject user ids that are empty or would escape the portfolio directory."""
+    user_id = str(user_id or "").strip()
+    if not user_id or user_id.startswith(".") or "/" in user_id or "\\" in user_id:
+        raise ValueError(f"invalid user_id '{user_id}'")
+    return user_id
+
+def _check_allocation(symbol: str, value: Any) -> float:
+    try:
+        allocation = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"allocation for {symbol} is not a number: {value!r}")
+    if not 0 <= allocation <= 100:
+        raise ValueError(f"allocation for {symbol} must be between 0 and 100, got {allocation}")
+    return allocation
+
+def _csv_rows(f: io.TextIOBase) -> Iterator[Row]:
+    reader = csv.reader(f)
+    header = [column.strip().lower() for column in next(reader, [])]
+    missing = [column for column in CSV_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    positions = [header.index(column) for column in CSV_COLUMNS]
+    for line, row in enumerate(reader, start=2):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        try:
+            user_id, asset_type, symbol, allocation = (row[i] if i < len(row) else "" for i in positions)
+            section = ASSET_TYPES.get(asset_type.strip().lower())
+            if section is None:
+                raise ValueError(f"unknown asset_type '{asset_type}'")
+            symbol = symbol.strip().upper()
+            if not symbol:
+                raise ValueError("empty symbol")
+            yield line, _check_user_id(user_id), section, symbol, _check_allocation(symbol, allocation)
+        except ValueError as e:
+            yield line, (row[positions[0]] if positions[0] < len(row) else "").strip(), "", "", e
+
+def _jsonl_rows(f: io.TextIOBase) -> Iterator[Row]:
+    for line, text in enumerate(f, start=1):
+        if not text.strip():
+            continue
+        user_id = ""
+        try:
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"invalid JSON: {e.msg}")
+            if not isinstance(record, dict):
+                raise ValueError("line is not a JSON object")
+            user_id = str(record.get("user_id") or "").strip()
+            user_id = _check_user_id(user_id)
+            holdings = []
+            for section in ("stocks", "bonds"):
+                allocations = record.get(section) or {}
+                if not isinstance(allocations, dict):
+                    raise ValueError(f"'{section}' must be an object mapping symbols to allocations")
+                holdings.extend((section, str(symbol).strip().upper(), _check_allocation(symbol, value))
+                                for symbol, value in allocations.items())
+        except ValueError as e:
+            yield line, user_id, "", "", e
+            continue
+        if not holdings:
+            # A portfolio with no investments still creates (or clears) the user
+            yield line, user_id, "", "", 0.0
+        for section, symbol, allocation in holdings:
+            yield line, user_id, section, symbol, allocation
+
+def read_allocations(path: str, format: Optional[str] = None,
+                     max_errors: int = 20) -> Tuple[Dict[str, Allocations], Dict[str, str], int]:
+    """
+    Stream-parse a bulk portfolio file
+
+    The file is read line by line, so only the parsed allocations are held in
+    memory, not the file itself. A user with any invalid row is rejected as
+    a whole rather than imported with part of their portfolio.
+
+    Args:
+        path: CSV or JSON Lines file to read
+        format: "csv" or "jsonl", or None to use the file extension
+        max_errors: Rejected users whose error message is kept
+
+    Returns:
+        Tuple of (allocations by user id, error message by rejected user id, lines read)
+    """
+    format = detect_format(path, format)
+    users: Dict[str, Allocations] = {}
+    errors: Dict[str, str] = {}
+    rows, last_line = 0, 0
+    with _open_text(path, "r") as f:
+        parsed = _csv_rows(f) if format == "csv" else _jsonl_rows(f)
+        for line, user_id, section, symbol, allocation in parsed:
+            if line != last_line:
+                rows, last_line = rows + 1, line
+            if isinstance(allocation, ValueError):
+                key = user_id or f"<line {line}>"
+                if key not in errors:
+                    # Every rejected user is counted; only the first few keep a message
+                    errors[key] = f"line {line}: {allocation}" if len(errors) < max_errors else ""
+                users.pop(user_id, None)
+                continue
+            if user_id in errors:
+                continue
+            portfolio = users.get(user_id)
+            if portfolio is None:
+                portfolio = users[user_id] = {"stocks": {}, "bonds": {}}
+            if section:
+                portfolio[section][symbol] = allocation
+    return users, errors, rows
+
+def total_allocation(portfolio: Dict[str, Any]) -> float:
+    """Get the total percentage allocated in a portfolio."""
+    return sum(portfolio.get("stocks", {}).values()) + sum(portfolio.get("bonds", {}).values())
+
+def allocation_error(portfolio: Dict[str, Any]) -> Optional[str]:
+    """Describe why a portfolio's total allocation is invalid, or None if it is valid."""
+    total = total_allocation(portfolio)
+    if not MIN_TOTAL_ALLOCATION <= total <= MAX_TOTAL_ALLOCATION:
+        return f"total allocation is {total:g}%, which is not close to 100%"
+    return None
+
+def write_allocations(path: str, portfolios: Iterable[Tuple[str, Dict[str, Any]]],
+                      format: Optional[str] = None) -> int:
+    """
+    Stream portfolios to a CSV or JSON Lines file
+
+    Each portfolio is written as soon as it is produced, so memory use does
+    not grow with the number of users. The file is written under a temporary
+    name and moved into place when complete.
+
+    Args:
+        path: File to write
+        portfolios: Iterable of (user id, portfolio data) pairs
+        format: "csv" or "jsonl", or None to use the file extension
+
+    Returns:
+        Number of portfolios written
+    """
+    format = detect_format(path, format)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    count = 0
+    try:
+        with _open_text(temporary, "w", compressed=path.lower().endswith(".gz")) as f:
+            writer = csv.writer(f) if format == "csv" else None
+            if writer is not None:
+                writer.writerow(CSV_COLUMNS)
+            for user_id, portfolio in portfolios:
+                if writer is not None:
+                    for section, asset_type in (("stocks", "stock"), ("bonds", "bond")):
+                        for symbol, allocation in portfolio.get(section, {}).items():
+                            writer.writerow((user_id, asset_type, symbol, allocation))
+                else:
+                    record = {"user_id": user_id, "stocks": portfolio.get("stocks", {}),
+                              "bonds": portfolio.get("bonds", {})}
+                    f.write(json.dumps(record) + "\n")
+                count += 1
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return count
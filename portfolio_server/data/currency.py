@@ -0,0 +1,27 @@
+"""
+Currency code validation.
+
+Kept apart from the FX analytics so that saving a portfolio's currency
+settings does not import numpy.
+"""
+import re
+
+_CURRENCY_PATTERN = re.compile(r"^[A-Z]{3}$")
+
+def normalize_currency(code: str) -> str:
+    """
+    Normalize an ISO 4217 currency code
+
+    Args:
+        code: Currency code such as "eur" or "GBX"
+
+    Returns:
+        Upper-case three-letter code
+
+    Raises:
+        ValueError: If the code is not three letters
+    """
+    normalized = str(code or "").strip().upper()
+    if not _CURRENCY_PATTERN.match(normalized):
+        raise ValueError(f"'{code}' is not a three-letter currency code")
+    return normalized
@@ -0,0 +1,300 @@
+"""
+Append-only portfolio history with delta compression.
+
+Every save appends one JSON line to the user's history log. Most lines are
+deltas against the previous snapshot: the values that were set, the keys
+that were removed and the items appended to lists (such as new holding
+lots), so a line grows with the size of the change rather than with the
+portfolio. Every CHECKPOINT_INTERVAL entries, or when a delta would be
+larger than the portfolio itself, a full checkpoint is written instead and
+its byte offset is added to a small index file.
+
+A point-in-time lookup finds the last checkpoint before the requested time
+in the index, seeks straight to it and replays at most CHECKPOINT_INTERVAL
+deltas.
+
+    {"seq": 0, "t": "2025-01-02T10:00:00", "full": {"stocks": {"AAPL": 60}, "bonds": {"US10Y": 40}}}
+    {"seq": 1, "t": "2025-01-09T10:00:00", "set": [[["stocks", "MSFT"], 10]], "unset": [], "append": []}
+"""
+import os
+import json
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from portfolio_server.data.storage import PORTFOLIO_DIR, add_save_listener
+
+HISTORY_DIR = os.path.join(PORTFOLIO_DIR, "history")
+
+# Deltas written between two full checkpoints
+CHECKPOINT_INTERVAL = int(os.environ.get("PORTFOLIO_HISTORY_CHECKPOINT_INTERVAL", "50"))
+
+# Users whose latest snapshot is kept in memory to diff the next save against
+STATE_CACHE_SIZE = 1024
+
+# Keys that change on every save and are recorded as the entry time instead
+_IGNORED_KEYS = ("last_updated",)
+
+Path = List[str]
+
+def _log_path(user_id: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{user_id}.jsonl")
+
+def _index_path(user_id: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{user_id}.idx")
+
+def _strip(portfolio: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in portfolio.items() if key not in _IGNORED_KEYS}
+
+def diff(old: Any, new: Any, path: Optional[Path] = None,
+         changes: Optional[Dict[str, list]] = None) -> Dict[str, list]:
+    """
+    Compute the changes that turn one JSON value into another
+
+    Args:
+        old: Previous value
+        new: New value
+        path: Key path of the values being compared
+
+    Returns:
+        Dictionary with "set" ([path, value] pairs), "unset" (paths) and
+        "append" ([path, items] pairs for lists that only grew at the end)
+    """
+    path = path or []
+    changes = changes if changes is not None else {"set": [], "unset": [], "append": []}
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                changes["unset"].append(path + [key])
+        for key, value in new.items():
+            if key not in old:
+                changes["set"].append([path + [key], value])
+            elif old[key] != value:
+                diff(old[key], value, path + [key], changes)
+    elif isinstance(old, list) and isinstance(new, list) and len(new) > len(old) and new[:len(old)] == old:
+        changes["append"].append([path, new[len(old):]])
+    else:
+        changes["set"].append([path, new])
+    return changes
+
+def apply_delta(state: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply one history delta to a snapshot in place and return it."""
+    def parent(path: Path) -> Dict[str, Any]:
+        node = state
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        return node
+
+    for path, value in entry.get("set", []):
+        parent(path)[path[-1]] = value
+    for path in entry.get("unset", []):
+        parent(path).pop(path[-1], None)
+    for path, items in entry.get("append", []):
+        parent(path).setdefault(path[-1], []).extend(items)
+    return state
+
+def local_time(when: datetime) -> datetime:
+    """Convert a time to naive local time, as snapshot times are recorded; naive times are kept as they are."""
+    if when.tzinfo is not None:
+        return when.astimezone().replace(tzinfo=None)
+    return when
+
+def _parse_time(value: str) -> datetime:
+    return local_time(datetime.fromisoformat(value))
+
+class HistoryLog:
+    """
+    History log of one user: the JSONL entries plus the checkpoint index.
+    """
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.path = _log_path(user_id)
+        self.index_path = _index_path(user_id)
+
+    def exists(self) -> bool:
+        """Check whether the user has any history."""
+        return os.path.exists(self.path)
+
+    def checkpoints(self) -> List[Tuple[datetime, int, int]]:
+        """Get (time, seq, byte offset) of every checkpoint, rebuilding the index if it is missing."""
+        if not self.exists():
+            return []
+        if not os.path.exists(self.index_path):
+            self._rebuild_index()
+        checkpoints = []
+        with open(self.index_path) as f:
+            for line in f:
+                try:
+                    t, seq, offset = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                checkpoints.append((_parse_time(t), seq, offset))
+        return checkpoints
+
+    def _rebuild_index(self) -> None:
+        lines = []
+        with open(self.path, "rb") as f:
+            offset = 0
+            for raw in f:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    entry = None
+                if entry is not None and "full" in entry:
+                    lines.append(json.dumps([entry["t"], entry["seq"], offset]) + "\n")
+                offset += len(raw)
+        with open(self.index_path, "w") as f:
+            f.writelines(lines)
+
+    def entries(self, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Read entries from a byte offset, skipping any torn final line."""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                try:
+                    yield json.loads(raw)
+                except ValueError:
+                    continue
+
+    def replay(self, since: Optional[datetime] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Replay snapshots, starting at the last checkpoint at or before `since`
+
+        Yields:
+            (entry, snapshot) pairs; the snapshot is updated in place, so copy it to keep it
+        """
+        checkpoints = self.checkpoints()
+        if not checkpoints:
+            return
+        position = 0
+        if since is not None:
+            position = max(bisect.bisect_right([t for t, _, _ in checkpoints], local_time(since)) - 1, 0)
+        state: Dict[str, Any] = {}
+        for entry in self.entries(checkpoints[position][2]):
+            if "full" in entry:
+                state = json.loads(json.dumps(entry["full"]))
+            else:
+                apply_delta(state, entry)
+            yield entry, state
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        """Append an entry, indexing it if it is a checkpoint, and return the new log size."""
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        line = json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n"
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+        if "full" in entry:
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps([entry["t"], entry["seq"], offset]) + "\n")
+        return offset + len(line)
+
+# user id -> (log size, latest snapshot, last seq, deltas since the last checkpoint)
+_latest: "OrderedDict[str, Tuple[int, Dict[str, Any], int, int]]" = OrderedDict()
+_lock = threading.Lock()
+
+def _latest_state(log: HistoryLog) -> Optional[Tuple[Dict[str, Any], int, int]]:
+    cached = _latest.get(log.user_id)
+    size = os.path.getsize(log.path) if log.exists() else 0
+    # A size mismatch means another process appended since this one last wrote
+    if cached is not None and cached[0] == size:
+        _latest.move_to_end(log.user_id)
+        return cached[1:]
+    latest = None
+    for entry, state in log.replay(since=datetime.max):
+        deltas = 0 if "full" in entry else latest[2] + 1
+        latest = (state, entry["seq"], deltas)
+    return latest
+
+def record_snapshot(user_id: str, portfolio: Dict[str, Any]) -> bool:
+    """
+    Append a saved portfolio to the user's history
+
+    Args:
+        user_id: Unique identifier for the user
+        portfolio: Portfolio as saved, including last_updated
+
+    Returns:
+        True if an entry was written, False if nothing changed
+    """
+    snapshot = json.loads(json.dumps(_strip(portfolio)))
+    timestamp = portfolio.get("last_updated") or datetime.now().isoformat()
+    log = HistoryLog(user_id)
+    with _lock:
+        latest = _latest_state(log)
+        if latest is None:
+            entry = {"seq": 0, "t": timestamp, "full": snapshot}
+            deltas = 0
+        else:
+            state, seq, deltas = latest
+            changes = diff(state, snapshot)
+            if not any(changes.values()):
+                return False
+            entry = {"seq": seq + 1, "t": timestamp, **changes}
+            deltas += 1
+            # A checkpoint bounds replay length, and is cheaper than a delta touching most keys
+            if deltas >= CHECKPOINT_INTERVAL or len(json.dumps(changes)) >= len(json.dumps(snapshot)):
+                entry = {"seq": seq + 1, "t": timestamp, "full": snapshot}
+                deltas = 0
+        size = log.append(entry)
+        _latest[user_id] = (size, snapshot, entry["seq"], deltas)
+        _latest.move_to_end(user_id)
+        while len(_latest) > STATE_CACHE_SIZE:
+            _latest.popitem(last=False)
+    return True
+
+def _record_saved(portfolios: Dict[str, Dict[str, Any]]) -> None:
+    for user_id, portfolio in portfolios.items():
+        record_snapshot(user_id, portfolio)
+
+def snapshot_at(user_id: str, when: datetime) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Reconstruct a user's portfolio as it was at a point in time
+
+    Args:
+        user_id: Unique identifier for the user
+        when: Point in time to reconstruct; naive times are local time
+
+    Returns:
+        Tuple of (time of the snapshot in effect, portfolio), or None if there is no history that early
+    """
+    when = local_time(when)
+    found = None
+    for entry, state in HistoryLog(user_id).replay(since=when):
+        if _parse_time(entry["t"]) > when:
+            break
+        found = (entry["t"], state)
+    if found is None:
+        return None
+    return found[0], json.loads(json.dumps(found[1]))
+
+def snapshots_between(user_id: str, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Iterate over the changes to a user's portfolio within a time range
+
+    Args:
+        user_id: Unique identifier for the user
+        start: Earliest change to include (default: the beginning of the history)
+        end: Latest change to include (default: now)
+
+    Yields:
+        (time, previous portfolio, new portfolio) for each change in the range
+    """
+    start = local_time(start) if start is not None else None
+    end = local_time(end) if end is not None else None
+    previous: Dict[str, Any] = {}
+    # Start at a checkpoint strictly before `start`, so the first change in the range has its previous portfolio
+    since = start - timedelta(microseconds=1) if start is not None else None
+    for entry, state in HistoryLog(user_id).replay(since=since):
+        t = _parse_time(entry["t"])
+        if end is not None and t > end:
+            break
+        current = json.loads(json.dumps(state))
+        if start is None or t >= start:
+            yield entry["t"], previous, current
+        previous = current
+
+add_save_listener(_record_saved)
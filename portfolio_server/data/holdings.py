@@ -0,0 +1,172 @@
+"""
+Position-level holdings stored as parallel NumPy arrays.
+
+Each lot is a row of three columns (symbol index, quantity, cost basis),
+and symbols are interned once in a list, so thousands of lots cost a few
+bytes each and a valuation is a handful of array operations. Target weights
+are kept per symbol. In the portfolio file the columns are stored as JSON
+lists under "holdings":
+
+    {"symbols": ["AAPL", "MSFT"],
+     "lots": {"symbol": [0, 0, 1], "quantity": [10, 5, 8], "cost_basis": [1500, 900, 2400]},
+     "targets": {"AAPL": 60.0, "MSFT": 40.0}}
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+class Holdings:
+    """
+    Lots held by one user plus their target weights.
+
+    Args:
+        symbols: Interned symbols; lots refer to them by position
+        symbol_index: Symbol position of each lot
+        quantity: Units held in each lot
+        cost_basis: Total amount paid for each lot
+        targets: Target weight percentage per symbol
+    """
+    def __init__(self, symbols: Optional[List[str]] = None, symbol_index: Optional[np.ndarray] = None,
+                 quantity: Optional[np.ndarray] = None, cost_basis: Optional[np.ndarray] = None,
+                 targets: Optional[Dict[str, float]] = None):
+        self.symbols = list(symbols or [])
+        self.symbol_index = np.asarray(symbol_index if symbol_index is not None else [], dtype=np.int32)
+        self.quantity = np.asarray(quantity if quantity is not None else [], dtype=np.float64)
+        self.cost_basis = np.asarray(cost_basis if cost_basis is not None else [], dtype=np.float64)
+        self.targets = dict(targets or {})
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __len__(self) -> int:
+        """Get the number of lots."""
+        return len(self.quantity)
+
+    def _intern(self, symbol: str) -> int:
+        position = self._positions.get(symbol)
+        if position is None:
+            position = self._positions[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return position
+
+    def add_lots(self, symbols: Sequence[str], quantity: Sequence[float], cost_basis: Sequence[float]) -> None:
+        """Append lots given as parallel sequences."""
+        index = np.fromiter((self._intern(symbol) for symbol in symbols), dtype=np.int32, count=len(symbols))
+        self.symbol_index = np.concatenate([self.symbol_index, index])
+        self.quantity = np.concatenate([self.quantity, np.asarray(quantity, dtype=np.float64)])
+        self.cost_basis = np.concatenate([self.cost_basis, np.asarray(cost_basis, dtype=np.float64)])
+
+    def remove_symbols(self, symbols: Sequence[str]) -> int:
+        """Drop every lot and target of the given symbols, returning the number of lots removed."""
+        positions = [self._positions[symbol] for symbol in symbols if symbol in self._positions]
+        for symbol in symbols:
+            self.targets.pop(symbol, None)
+        keep = ~np.isin(self.symbol_index, positions)
+        removed = int(len(keep) - keep.sum())
+        self.symbol_index, self.quantity, self.cost_basis = \
+            self.symbol_index[keep], self.quantity[keep], self.cost_basis[keep]
+        self.compact()
+        return removed
+
+    def compact(self) -> None:
+        """Drop symbols that have neither lots nor a target and renumber the rest."""
+        used = np.zeros(len(self.symbols), dtype=bool)
+        used[self.symbol_index] = True
+        for symbol in self.targets:
+            if symbol in self._positions:
+                used[self._positions[symbol]] = True
+        if used.all():
+            return
+        renumber = np.cumsum(used) - 1
+        self.symbol_index = renumber[self.symbol_index].astype(np.int32)
+        self.symbols = [symbol for symbol, keep in zip(self.symbols, used) if keep]
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def all_symbols(self) -> List[str]:
+        """Get every symbol with lots or a target, in interned order."""
+        return self.symbols + [symbol for symbol in self.targets if symbol not in self._positions]
+
+    def positions(self) -> Dict[str, np.ndarray]:
+        """
+        Aggregate lots into one position per symbol
+
+        Returns:
+            Dictionary of per-symbol arrays aligned with all_symbols():
+            quantity, cost_basis, lots and target (percent, 0 when unset)
+        """
+        symbols = self.all_symbols()
+        n = len(symbols)
+        return {
+            "quantity": np.bincount(self.symbol_index, weights=self.quantity, minlength=n),
+            "cost_basis": np.bincount(self.symbol_index, weights=self.cost_basis, minlength=n),
+            "lots": np.bincount(self.symbol_index, minlength=n),
+            "target": np.array([self.targets.get(symbol, 0.0) for symbol in symbols]),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert holdings to their columnar dictionary representation."""
+        return {
+            "symbols": list(self.symbols),
+            "lots": {
+                "symbol": self.symbol_index.tolist(),
+                "quantity": self.quantity.tolist(),
+                "cost_basis": self.cost_basis.tolist(),
+            },
+            "targets": dict(self.targets),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'Holdings':
+        """Create Holdings from their columnar dictionary representation."""
+        if not data:
+            return cls()
+        lots = data.get("lots", {})
+        return cls(
+            symbols=data.get("symbols", []),
+            symbol_index=np.array(lots.get("symbol", []), dtype=np.int32),
+            quantity=np.array(lots.get("quantity", []), dtype=np.float64),
+            cost_basis=np.array(lots.get("cost_basis", []), dtype=np.float64),
+            targets=data.get("targets", {}),
+        )
+
+def value_holdings(holdings: Holdings, prices: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Value every position of a holdings set in one vectorized pass
+
+    Positions without a price are left out of market value and weights and
+    reported with NaN values.
+
+    Args:
+        holdings: Holdings to value
+        prices: Latest price per symbol
+
+    Returns:
+        Dictionary with per-symbol arrays aligned with `symbols` (quantity,
+        cost_basis, lots, price, market_value, unrealized_pnl, weight, target,
+        drift, all weights in percent) and portfolio totals (market_value,
+        cost_basis, unrealized_pnl)
+    """
+    symbols = holdings.all_symbols()
+    positions = holdings.positions()
+    price = np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+    priced = ~np.isnan(price)
+
+    market_value = positions["quantity"] * price
+    unrealized_pnl = market_value - positions["cost_basis"]
+    total_value = float(market_value[priced].sum())
+    weight = market_value / total_value * 100 if total_value > 0 else np.full(len(symbols), np.nan)
+    # Unpriced symbols with a target still show how far they are from it
+    drift = np.where(np.isnan(weight), 0.0, weight) - positions["target"]
+
+    return {
+        "symbols": symbols,
+        **positions,
+        "price": price,
+        "market_value": market_value,
+        "unrealized_pnl": unrealized_pnl,
+        "weight": weight,
+        "drift": drift,
+        "totals": {
+            "market_value": total_value,
+            "cost_basis": float(positions["cost_basis"][priced].sum()),
+            "unrealized_pnl": float(unrealized_pnl[priced].sum()),
+        },
+    }
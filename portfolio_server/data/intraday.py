@@ -0,0 +1,267 @@
+"""
+Intraday bars and real-time quotes in fixed-size ring buffers.
+
+Each symbol gets a preallocated ring of INTRADAY_BARS bars (six columns of
+8 bytes each, about 19 KB at the default of 390), so memory per symbol stays
+fixed however long the server runs: once a ring is full, every new bar
+overwrites the oldest. Rings are kept for at most INTRADAY_SYMBOLS symbols,
+least recently used first out. Next to its ring, each symbol keeps its latest
+quote.
+
+Bars and quotes are fetched through the shared series cache, which
+deduplicates concurrent requests, and merged into the store. The store
+calls its listeners with the symbols whose latest price changed.
+"""
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.data.market_data import series_cache
+from portfolio_server.data.providers import get_provider
+from portfolio_server.data.series import IntradayBars, Quote
+
+logger = logging.getLogger(__name__)
+
+# Bar length requested from the provider
+INTRADAY_INTERVAL = os.environ.get("PORTFOLIO_INTRADAY_INTERVAL", "5min")
+
+# Bars kept per symbol
+INTRADAY_BARS = int(os.environ.get("PORTFOLIO_INTRADAY_BARS", "390"))
+
+# Symbols whose bars and quote are kept
+INTRADAY_SYMBOLS = int(os.environ.get("PORTFOLIO_INTRADAY_SYMBOLS", "1000"))
+
+# Seconds fetched bars and quotes are reused before asking the provider again
+INTRADAY_TTL_SECONDS = 60
+QUOTE_TTL_SECONDS = float(os.environ.get("PORTFOLIO_QUOTE_TTL", "15"))
+
+BAR_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+class BarRing:
+    """
+    Fixed-capacity ring buffer of OHLCV bars, oldest overwritten first.
+
+    Args:
+        capacity: Number of bars kept
+    """
+    def __init__(self, capacity: int = INTRADAY_BARS):
+        self.capacity = capacity
+        self.columns = {
+            "timestamp": np.zeros(capacity, dtype=np.int64),
+            "open": np.zeros(capacity),
+            "high": np.zeros(capacity),
+            "low": np.zeros(capacity),
+            "close": np.zeros(capacity),
+            "volume": np.zeros(capacity, dtype=np.int64),
+        }
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _position(self, offset: int) -> int:
+        return (self._start + offset) % self.capacity
+
+    def last(self, column: str) -> Optional[float]:
+        """Get a column of the newest bar, or None if the ring is empty."""
+        if not self._size:
+            return None
+        return self.columns[column][self._position(self._size - 1)]
+
+    def merge(self, bars: IntradayBars) -> int:
+        """
+        Add the bars newer than the newest one held, replacing that one if it was revised
+
+        Args:
+            bars: Bars sorted oldest-first
+
+        Returns:
+            Number of bars added or revised
+        """
+        if not len(bars):
+            return 0
+        incoming = {"timestamp": bars.timestamps, "open": bars.open, "high": bars.high,
+                    "low": bars.low, "close": bars.close, "volume": bars.volume}
+        changed = 0
+        last = self.last("timestamp")
+        if last is not None:
+            # The newest held bar may still have been forming when it was fetched
+            revised = np.flatnonzero(bars.timestamps == last)
+            if len(revised):
+                position = self._position(self._size - 1)
+                i = revised[-1]
+                if any(self.columns[column][position] != incoming[column][i] for column in BAR_COLUMNS):
+                    for column in BAR_COLUMNS:
+                        self.columns[column][position] = incoming[column][i]
+                    changed += 1
+            new = bars.timestamps > last
+        else:
+            new = np.ones(len(bars), dtype=bool)
+
+        count = int(new.sum())
+        if not count:
+            return changed
+        # More new bars than fit: only the newest `capacity` are kept
+        take = min(count, self.capacity)
+        positions = self._position(self._size + np.arange(count - take, count))
+        for column in BAR_COLUMNS:
+            self.columns[column][positions] = incoming[column][new][-take:]
+        overflow = max(self._size + count - self.capacity, 0)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+        return changed + count
+
+    def window(self, count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Get copies of the newest `count` bars (all by default), oldest-first."""
+        count = self._size if count is None else min(count, self._size)
+        positions = self._position(np.arange(self._size - count, self._size))
+        return {column: values[positions] for column, values in self.columns.items()}
+
+class IntradayStore:
+    """
+    Ring buffers and latest quotes of recently used symbols.
+
+    Args:
+        capacity: Bars kept per symbol
+        max_symbols: Symbols kept before the least recently used is dropped
+    """
+    def __init__(self, capacity: int = INTRADAY_BARS, max_symbols: int = INTRADAY_SYMBOLS):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        # symbol -> [bar ring or None, latest quote or None]
+        self._symbols: "OrderedDict[str, list]" = OrderedDict()
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Register a callback run with the symbols whose latest price changed."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _entry(self, symbol: str) -> list:
+        entry = self._symbols.get(symbol)
+        if entry is None:
+            entry = self._symbols[symbol] = [None, None]
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+        self._symbols.move_to_end(symbol)
+        return entry
+
+    def add_bars(self, symbol: str, bars: IntradayBars) -> int:
+        """Merge fetched bars into a symbol's ring, returning the number of bars added or revised."""
+        with self._lock:
+            entry = self._entry(symbol)
+            if entry[0] is None:
+                entry[0] = BarRing(self.capacity)
+            before = entry[0].last("close")
+            changed = entry[0].merge(bars)
+            moved = entry[1] is None and entry[0].last("close") != before
+        if moved:
+            self._notify([symbol])
+        return changed
+
+    def set_quote(self, quote: Quote) -> bool:
+        """Store a symbol's latest quote, returning whether its price changed."""
+        with self._lock:
+            entry = self._entry(quote.symbol)
+            previous = entry[1]
+            entry[1] = quote
+        changed = previous is None or previous.fingerprint() != quote.fingerprint()
+        if changed:
+            self._notify([quote.symbol])
+        return changed
+
+    def bars(self, symbol: str, count: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Get a symbol's newest bars oldest-first, or None if none are held."""
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is None or entry[0] is None:
+                return None
+            return entry[0].window(count)
+
+    def latest(self, symbol: str) -> Optional[Tuple[float, Optional[float]]]:
+        """
+        Get a symbol's latest price and previous close
+
+        The quote is used when there is one, as it is the most recent trade;
+        otherwise the close of the newest bar, with an unknown previous close.
+        """
+        entry = self._symbols.get(symbol)
+        if entry is None:
+            return None
+        ring, quote = entry
+        if quote is not None:
+            return quote.price, quote.previous_close or None
+        if ring is not None and len(ring):
+            return float(ring.last("close")), None
+        return None
+
+    def _notify(self, symbols: List[str]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(symbols)
+            except Exception:
+                logger.exception("Intraday store listener %r failed", listener)
+
+intraday_store = IntradayStore()
+
+async def get_intraday_bars(symbol: str, count: Optional[int] = None,
+                            refresh: bool = False) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Get a symbol's intraday bars, fetching new ones when the cached fetch is stale
+
+    Args:
+        symbol: Stock symbol
+        count: Newest bars to return (default: all held)
+        refresh: Fetch from the provider even if the last fetch is still fresh
+
+    Returns:
+        Dictionary of bar columns oldest-first (timestamp, open, high, low, close,
+        volume), or None if there are no bars for the symbol
+    """
+    bars = await series_cache.get_or_fetch(("TIME_SERIES_INTRADAY", symbol),
+                                           lambda: get_provider().get_intraday_bars(symbol, INTRADAY_INTERVAL),
+                                           INTRADAY_TTL_SECONDS, refresh=refresh)
+    if bars is not None:
+        intraday_store.add_bars(symbol, bars)
+    return intraday_store.bars(symbol, count)
+
+async def get_quotes(symbols: List[str], refresh: bool = False, max_concurrency: int = 8) -> Dict[str, Quote]:
+    """
+    Get the latest quotes of several symbols and store them
+
+    Args:
+        symbols: Stock symbols to quote
+        refresh: Fetch from the provider even if a cached quote is still fresh
+        max_concurrency: Maximum number of quotes fetched at once
+
+    Returns:
+        Quote per symbol; symbols without a quote are left out
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(symbol: str) -> Optional[Quote]:
+        async with semaphore:
+            return await series_cache.get_or_fetch(("GLOBAL_QUOTE", symbol),
+                                                   lambda: get_provider().get_quote(symbol),
+                                                   QUOTE_TTL_SECONDS, refresh=refresh)
+
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    quotes = {}
+    for symbol, quote in zip(symbols, results):
+        if isinstance(quote, BaseException) and not isinstance(quote, UpstreamError):
+            raise quote
+        if isinstance(quote, Quote):
+            intraday_store.set_quote(quote)
+            quotes[symbol] = quote
+    return quotes
@@ -0,0 +1,318 @@
+"""
+Live portfolio P&L, updated incrementally from changed prices.
+
+A LivePortfolio holds one row per symbol of a user's portfolio (quantity
+and cost basis from the holdings, allocation percentage from the stocks)
+and the row's contribution to each running total. When prices change, only
+the rows of the changed symbols are recomputed and the totals adjusted by
+the difference, so a quote for one symbol costs the same however large the
+portfolio is. Totals are re-summed from the rows every RESUM_INTERVAL
+updates so that rounding errors cannot accumulate.
+
+Values are in the portfolio's base currency: each row's price is converted
+at the latest daily exchange rate of its listing currency, and rows whose
+rate is unknown are left out of the totals like unpriced ones.
+
+The tracked portfolios are kept current by a storage save listener. Price
+changes arrive from the intraday store, and the users whose live values
+moved are passed to the tracker's listeners.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from portfolio_server.data.holdings import Holdings
+from portfolio_server.data.intraday import get_quotes, intraday_store
+from portfolio_server.data.market_data import get_fx_matrix, portfolio_currencies
+from portfolio_server.data.storage import add_save_listener, load_portfolio
+
+logger = logging.getLogger(__name__)
+
+# Incremental updates between two full re-summations of the totals
+RESUM_INTERVAL = 1000
+
+# Rows of LivePortfolio.terms, each summed into one total
+TERMS = ("market_value", "cost_basis", "day_pnl", "day_change")
+
+class LivePortfolio:
+    """
+    Running valuation of one portfolio.
+
+    Args:
+        portfolio: Portfolio data including stocks and holdings
+        fx_rates: Base-currency value of one unit of each symbol's price, for
+            symbols listed in another currency than the base
+    """
+    def __init__(self, portfolio: Dict[str, Any], fx_rates: Optional[Dict[str, float]] = None):
+        holdings = Holdings.from_dict(portfolio.get("holdings"))
+        held = holdings.all_symbols()
+        allocations = portfolio.get("stocks", {})
+        held_set = set(held)
+        self.symbols = held + [symbol for symbol in allocations if symbol not in held_set]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+
+        positions = holdings.positions()
+        self.quantity = np.zeros(n)
+        self.quantity[:len(held)] = positions["quantity"]
+        self.cost_basis = np.zeros(n)
+        self.cost_basis[:len(held)] = positions["cost_basis"]
+        self.allocation = np.array([float(allocations.get(symbol, 0.0)) for symbol in self.symbols])
+
+        self.base, currencies = portfolio_currencies(portfolio)
+        self.fx_rates = dict(fx_rates or {})
+        self.fx = np.array([1.0 if currencies[symbol] == self.base else self.fx_rates.get(symbol, np.nan)
+                            for symbol in self.symbols])
+
+        self.price = np.full(n, np.nan)
+        self.previous_close = np.full(n, np.nan)
+        # Contribution of every symbol to each total, zero until it is priced
+        self.terms = np.zeros((len(TERMS), n))
+        self.totals = np.zeros(len(TERMS))
+        self.updated_at: Optional[str] = None
+        self._updates = 0
+
+    def update(self, prices: Dict[str, Tuple[float, Optional[float]]]) -> int:
+        """
+        Apply new prices, recomputing only the rows of the symbols given
+
+        Args:
+            prices: (latest price, previous close or None) per symbol
+
+        Returns:
+            Number of held symbols that were updated
+        """
+        rows = [(self.index[symbol], price, previous) for symbol, (price, previous) in prices.items()
+                if symbol in self.index]
+        if not rows:
+            return 0
+        i = np.array([row[0] for row in rows])
+        price = np.array([row[1] for row in rows], dtype=np.float64)
+        previous = np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64)
+        # A bar without a previous close keeps the one from the last quote
+        previous = np.where(np.isnan(previous), self.previous_close[i], previous)
+
+        self.price[i] = price
+        self.previous_close[i] = previous
+        known = ~np.isnan(previous) & (previous > 0)
+        ratio = np.divide(price, previous, out=np.ones_like(price), where=known)
+        fx = self.fx[i]
+        new_terms = np.stack([
+            self.quantity[i] * price * fx,
+            self.cost_basis[i],
+            np.where(known, self.quantity[i] * (price - previous) * fx, 0.0),
+            # Percentage points the symbol adds to an allocation-weighted portfolio today
+            np.where(known, self.allocation[i] * (ratio - 1.0), 0.0),
+        ])
+        # Without an exchange rate a row stays out of the totals
+        new_terms[:, np.isnan(fx)] = 0.0
+        self.totals += (new_terms - self.terms[:, i]).sum(axis=1)
+        self.terms[:, i] = new_terms
+
+        self._updates += 1
+        if self._updates % RESUM_INTERVAL == 0:
+            self.totals = self.terms.sum(axis=1)
+        self.updated_at = datetime.now().isoformat()
+        return len(rows)
+
+    def unpriced(self) -> List[str]:
+        """Get the symbols no price, or no exchange rate, has been received for."""
+        return [symbol for symbol, i in self.index.items() if np.isnan(self.price[i]) or np.isnan(self.fx[i])]
+
+    def summary(self) -> Dict[str, Any]:
+        """Get the running totals and per-symbol values, in the base currency."""
+        totals = dict(zip(TERMS, (float(value) for value in self.totals)))
+        priced = ~np.isnan(self.price) & ~np.isnan(self.fx)
+        symbols = {}
+        for symbol, i in self.index.items():
+            row = {"allocation": float(self.allocation[i]), "quantity": float(self.quantity[i])}
+            if priced[i]:
+                row["price"] = float(self.price[i] * self.fx[i])
+                row["market_value"] = float(self.terms[0, i])
+                row["day_pnl"] = float(self.terms[2, i])
+                if not np.isnan(self.previous_close[i]) and self.previous_close[i] > 0:
+                    row["change_percent"] = round(float((self.price[i] / self.previous_close[i] - 1) * 100), 4)
+            symbols[symbol] = row
+        return {
+            "base_currency": self.base,
+            "updated_at": self.updated_at,
+            "market_value": totals["market_value"],
+            "unrealized_pnl": totals["market_value"] - totals["cost_basis"],
+            "day_pnl": totals["day_pnl"],
+            # Change of the allocation percentages' value since the previous close, in percent
+            "day_change_percent": round(totals["day_change"], 4),
+            "unpriced": [symbol for symbol, i in self.index.items() if not priced[i]],
+            "symbols": symbols,
+        }
+
+class LivePnL:
+    """
+    Live portfolios of the users being tracked, fed by the intraday store.
+    """
+    def __init__(self):
+        self._portfolios: Dict[str, LivePortfolio] = {}
+        # symbol -> users whose live portfolio holds it
+        self._holders: Dict[str, Set[str]] = {}
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Register a callback run with the users whose live values changed."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def tracked(self) -> List[str]:
+        """Get the users being tracked."""
+        return list(self._portfolios)
+
+    def symbols(self) -> Set[str]:
+        """Get every symbol held by a tracked user."""
+        return set(self._holders)
+
+    def holders(self, symbol: str) -> Set[str]:
+        """Get the tracked users holding a symbol."""
+        return set(self._holders.get(symbol, ()))
+
+    def get(self, user_id: str, fx_rates: Optional[Dict[str, float]] = None) -> LivePortfolio:
+        """Get a user's live portfolio: the tracked one, or else one valued at the prices held now."""
+        live = self._portfolios.get(user_id)
+        if live is None:
+            live = self._priced(load_portfolio(user_id), fx_rates)
+        return live
+
+    def track(self, user_id: str, fx_rates: Optional[Dict[str, float]] = None) -> LivePortfolio:
+        """
+        Start keeping a user's live portfolio current, returning it
+
+        Args:
+            user_id: Unique identifier for the user
+            fx_rates: Exchange rate per foreign-currency symbol; a tracked
+                portfolio is rebuilt when they differ from the ones it uses
+        """
+        live = self._portfolios.get(user_id)
+        if live is None or (fx_rates is not None and fx_rates != live.fx_rates):
+            live = self._build(user_id, load_portfolio(user_id), fx_rates)
+        return live
+
+    @staticmethod
+    def _priced(portfolio: Dict[str, Any], fx_rates: Optional[Dict[str, float]] = None) -> LivePortfolio:
+        live = LivePortfolio(portfolio, fx_rates)
+        prices = {}
+        for symbol in live.symbols:
+            latest = intraday_store.latest(symbol)
+            if latest is not None:
+                prices[symbol] = latest
+        live.update(prices)
+        return live
+
+    def _build(self, user_id: str, portfolio: Dict[str, Any],
+               fx_rates: Optional[Dict[str, float]] = None) -> LivePortfolio:
+        live = self._priced(portfolio, fx_rates)
+        with self._lock:
+            self._untrack(user_id)
+            self._portfolios[user_id] = live
+            for symbol in live.symbols:
+                self._holders.setdefault(symbol, set()).add(user_id)
+        return live
+
+    def _untrack(self, user_id: str) -> None:
+        previous = self._portfolios.pop(user_id, None)
+        if previous is None:
+            return
+        for symbol in previous.symbols:
+            holders = self._holders.get(symbol)
+            if holders is not None:
+                holders.discard(user_id)
+                if not holders:
+                    del self._holders[symbol]
+
+    def forget(self, user_id: str) -> None:
+        """Stop tracking a user."""
+        with self._lock:
+            self._untrack(user_id)
+
+    def portfolios_saved(self, portfolios: Dict[str, Dict[str, Any]]) -> None:
+        """Storage save listener: rebuild the live portfolios of tracked users that were saved."""
+        users = [user_id for user_id in portfolios if user_id in self._portfolios]
+        for user_id in users:
+            # Rates of currencies new to the portfolio arrive with the next get_live_portfolio
+            self._build(user_id, portfolios[user_id], self._portfolios[user_id].fx_rates)
+        if users:
+            self._notify(users)
+
+    def prices_changed(self, symbols: Iterable[str]) -> None:
+        """Intraday store listener: update the live portfolios holding the changed symbols."""
+        changed: Dict[str, Dict[str, Tuple[float, Optional[float]]]] = {}
+        for symbol in symbols:
+            latest = intraday_store.latest(symbol)
+            if latest is None:
+                continue
+            for user_id in self._holders.get(symbol, ()):
+                changed.setdefault(user_id, {})[symbol] = latest
+        users = [user_id for user_id, prices in changed.items()
+                 if user_id in self._portfolios and self._portfolios[user_id].update(prices)]
+        if users:
+            self._notify(users)
+
+    def _notify(self, users: List[str]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(users)
+            except Exception:
+                logger.exception("Live P&L listener %r failed", listener)
+
+live_pnl = LivePnL()
+
+add_save_listener(live_pnl.portfolios_saved)
+intraday_store.add_listener(live_pnl.prices_changed)
+
+async def get_fx_rates(portfolio: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Get the latest exchange rate into the base currency of each foreign-currency symbol of a portfolio
+
+    Args:
+        portfolio: Portfolio data including stocks and holdings
+
+    Returns:
+        Rate per symbol listed in another currency than the base; symbols
+        without a known rate are left out
+    """
+    base, currencies = portfolio_currencies(portfolio)
+    foreign = [symbol for symbol, currency in currencies.items() if currency != base]
+    if not foreign:
+        return {}
+    listed = [currencies[symbol] for symbol in foreign]
+    matrix = await get_fx_matrix(base, listed)
+    rates = matrix.latest(matrix.columns(listed))
+    return {symbol: float(rate) for symbol, rate in zip(foreign, rates) if not np.isnan(rate)}
+
+async def track_live_portfolio(user_id: str) -> LivePortfolio:
+    """
+    Start keeping a user's live portfolio current, with up-to-date exchange rates
+
+    Args:
+        user_id: Unique identifier for the user
+    """
+    return live_pnl.track(user_id, await get_fx_rates(load_portfolio(user_id)))
+
+async def get_live_portfolio(user_id: str) -> LivePortfolio:
+    """
+    Get a user's live portfolio, fetching quotes for the symbols not priced yet
+
+    Args:
+        user_id: Unique identifier for the user
+    """
+    fx_rates = await get_fx_rates(load_portfolio(user_id))
+    if user_id in live_pnl.tracked():
+        live = live_pnl.track(user_id, fx_rates)
+    else:
+        live = live_pnl.get(user_id, fx_rates)
+    missing = [symbol for symbol in live.unpriced() if np.isnan(live.price[live.index[symbol]])]
+    if missing:
+        # Stored quotes reach tracked portfolios through the store listener
+        await get_quotes(missing)
+        live = live_pnl.get(user_id, fx_rates)
+    return live
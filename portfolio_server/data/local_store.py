@@ -0,0 +1,245 @@
+"""
+Memory-mapped columnar store compiled from bulk market data dumps.
+
+Vendor dumps are long-format CSV or Parquet tables with one row per symbol
+(or treasury maturity) and date. They are compiled once into one .npy file
+per column, sorted by key and date, with an offsets index giving each key's
+row range. Reads memory-map the columns, so a lookup only touches the pages
+holding that key's rows and thousands of symbols need no per-symbol parsing.
+
+Price dumps need `symbol`, `date` and `close` columns and may add `open`,
+`high`, `low` and `volume`. Yield dumps need `maturity`, `date` and `value`
+(or `yield`) columns, with values in percent. The compiled store is rebuilt
+whenever a dump file is added, removed or modified.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File extensions recognized as dumps
+DUMP_EXTENSIONS = (".csv", ".csv.gz", ".parquet")
+
+# Directory inside the data directory holding compiled stores
+STORE_DIRNAME = ".columns"
+
+# Column names accepted as aliases in dump headers
+COLUMN_ALIASES = {"ticker": "symbol", "timestamp": "date", "yield": "value", "adj_close": "close"}
+
+# Key column and value columns of each kind of dump
+KINDS = {
+    "prices": ("symbol", ("open", "high", "low", "close", "volume")),
+    "yields": ("maturity", ("value",)),
+}
+
+def _dump_files(source_dir: str) -> List[str]:
+    """List dump files in a directory, in name order so later files win on duplicates."""
+    try:
+        names = sorted(os.listdir(source_dir))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(source_dir, name) for name in names
+            if name.lower().endswith(DUMP_EXTENSIONS) and os.path.isfile(os.path.join(source_dir, name))]
+
+def dump_signature(source_dir: str) -> str:
+    """Hash the names, sizes and modification times of the dumps in a directory."""
+    digest = hashlib.sha1()
+    for path in _dump_files(source_dir):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def _read_dump(path: str):
+    """Read one dump file into a DataFrame with normalized column names."""
+    import pandas as pd
+
+    if path.lower().endswith(".parquet"):
+        try:
+            frame = pd.read_parquet(path)
+        except ImportError as e:
+            raise ImportError(f"Reading Parquet dump {path} requires pyarrow: pip install pyarrow") from e
+    else:
+        frame = pd.read_csv(path)
+    frame.columns = [COLUMN_ALIASES.get(name, name) for name in
+                     (str(column).strip().lower().replace(" ", "_") for column in frame.columns)]
+    return frame
+
+def _compile_kind(frames: list, key_column: str, value_columns: Tuple[str, ...],
+                  output_dir: str, kind: str) -> int:
+    """Sort, deduplicate and write one kind of dump as columnar .npy files."""
+    import pandas as pd
+
+    frame = pd.concat(frames, ignore_index=True)
+    frame[key_column] = frame[key_column].astype(str).str.strip().str.upper()
+    if key_column == "maturity":
+        frame[key_column] = frame[key_column].str.lower()
+    frame["date"] = pd.to_datetime(frame["date"]).dt.normalize()
+    reference = "close" if kind == "prices" else "value"
+    frame[reference] = pd.to_numeric(frame[reference], errors="coerce")
+    frame = frame.dropna(subset=[reference])
+    # Later rows come from later files, so they replace earlier ones for the same day
+    frame = frame.drop_duplicates(subset=[key_column, "date"], keep="last")
+    frame = frame.sort_values([key_column, "date"], kind="stable")
+
+    keys = frame[key_column].to_numpy(dtype=str)
+    unique_keys, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+
+    np.save(os.path.join(output_dir, f"{kind}_keys.npy"), unique_keys)
+    np.save(os.path.join(output_dir, f"{kind}_offsets.npy"), offsets)
+    np.save(os.path.join(output_dir, f"{kind}_date.npy"), frame["date"].to_numpy().astype("datetime64[D]"))
+    for column in value_columns:
+        if column == "volume":
+            values = pd.to_numeric(frame[column], errors="coerce").fillna(0).to_numpy(dtype=np.int64) \
+                if column in frame else np.zeros(len(frame), dtype=np.int64)
+        elif column in frame:
+            # Missing open/high/low values fall back to the close
+            values = pd.to_numeric(frame[column], errors="coerce").fillna(frame[reference]).to_numpy(dtype=np.float64)
+        else:
+            values = frame[reference].to_numpy(dtype=np.float64)
+        np.save(os.path.join(output_dir, f"{kind}_{column}.npy"), values)
+    return len(unique_keys)
+
+def compile_store(source_dir: str, output_dir: str) -> Dict[str, int]:
+    """
+    Compile the dumps in a directory into a columnar store
+
+    Args:
+        source_dir: Directory holding CSV/Parquet dumps
+        output_dir: Directory to write the .npy columns to (must not exist)
+
+    Returns:
+        Number of keys compiled per kind
+    """
+    frames: Dict[str, list] = {kind: [] for kind in KINDS}
+    for path in _dump_files(source_dir):
+        frame = _read_dump(path)
+        for kind, (key_column, _) in KINDS.items():
+            required = {key_column, "date", "close" if kind == "prices" else "value"}
+            if required <= set(frame.columns):
+                frames[kind].append(frame)
+                break
+        else:
+            logger.warning("Skipping market data dump %s: unrecognized columns %s", path, list(frame.columns))
+
+    os.makedirs(output_dir)
+    counts = {}
+    for kind, (key_column, value_columns) in KINDS.items():
+        if frames[kind]:
+            counts[kind] = _compile_kind(frames[kind], key_column, value_columns, output_dir, kind)
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump({"counts": counts, "compiled_at": time.time()}, f)
+    return counts
+
+class ColumnStore:
+    """
+    Read-only view of a compiled store, with every column memory-mapped.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.counts: Dict[str, int] = json.load(f)["counts"]
+        self._columns: Dict[str, Dict[str, np.ndarray]] = {}
+        self._index: Dict[str, Dict[str, int]] = {}
+        for kind, (_, value_columns) in KINDS.items():
+            if kind not in self.counts:
+                continue
+            self._columns[kind] = {
+                column: np.load(os.path.join(path, f"{kind}_{column}.npy"), mmap_mode="r")
+                for column in ("date", "offsets") + value_columns
+            }
+            keys = np.load(os.path.join(path, f"{kind}_keys.npy"))
+            self._columns[kind]["keys"] = keys
+            self._index[kind] = {str(key): i for i, key in enumerate(keys)}
+
+    def keys(self, kind: str) -> np.ndarray:
+        """Get the sorted keys of one kind."""
+        columns = self._columns.get(kind)
+        return columns["keys"] if columns else np.empty(0, dtype=str)
+
+    def rows(self, kind: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Get zero-copy views of one key's rows, oldest first, or None if the key is unknown."""
+        position = self._index.get(kind, {}).get(key)
+        if position is None:
+            return None
+        columns = self._columns[kind]
+        start, end = int(columns["offsets"][position]), int(columns["offsets"][position + 1])
+        return {column: values[start:end] for column, values in columns.items()
+                if column not in ("keys", "offsets")}
+
+class LocalMarketDataStore:
+    """
+    Compiled store for a dump directory, rebuilt when the dumps change.
+
+    The directory is checked for changes at most every `check_interval`
+    seconds; callers use `needs_refresh` to run the (possibly slow) rebuild
+    off the event loop. Dumps that fail to compile are logged and the
+    previous store, if any, stays in use until the dumps change again.
+    """
+    def __init__(self, source_dir: str, check_interval: float = 60.0):
+        self.source_dir = source_dir
+        self.check_interval = check_interval
+        self._store: Optional[ColumnStore] = None
+        self._signature: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        """Check whether the next read must look for changed dumps first."""
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def refresh(self) -> Optional[ColumnStore]:
+        """Open the store for the current dumps, compiling it if needed."""
+        with self._lock:
+            if not self.needs_refresh():
+                return self._store
+            signature = dump_signature(self.source_dir)
+            if signature != self._signature:
+                try:
+                    self._store = self._open(signature)
+                except Exception:
+                    # A malformed dump must not break reads: keep serving the previous
+                    # store, and do not retry until the dumps change again
+                    logger.exception("Cannot compile market data dumps in %s; keeping the previous store",
+                                     self.source_dir)
+                self._signature = signature
+            self._checked_at = time.monotonic()
+            return self._store
+
+    def current(self) -> Optional[ColumnStore]:
+        """Get the store, refreshing it first if the check interval has passed."""
+        return self.refresh() if self.needs_refresh() else self._store
+
+    def _open(self, signature: str) -> Optional[ColumnStore]:
+        if not _dump_files(self.source_dir):
+            return None
+        root = os.path.join(self.source_dir, STORE_DIRNAME)
+        path = os.path.join(root, signature)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            started = time.perf_counter()
+            building = f"{path}.{os.getpid()}.tmp"
+            shutil.rmtree(building, ignore_errors=True)
+            try:
+                counts = compile_store(self.source_dir, building)
+            except BaseException:
+                shutil.rmtree(building, ignore_errors=True)
+                raise
+            try:
+                os.rename(building, path)
+            except OSError:
+                # Another process compiled the same dumps first
+                shutil.rmtree(building, ignore_errors=True)
+            logger.info("Compiled market data dumps in %s (%s) in %.2fs",
+                        self.source_dir, counts, time.perf_counter() - started)
+            for name in os.listdir(root):
+                if name != signature and not name.endswith(".tmp"):
+                    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        return ColumnStore(path)
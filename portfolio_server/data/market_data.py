@@ -0,0 +1,599 @@
+"""
+Cached market data shared by the stock and analysis tools.
+
+Series come from the configured provider (see providers.py) and are kept
+in a shared TTL cache. Exchange rates are cached the same way, one series
+per currency against the pivot currency, and combined into an FX matrix
+that is rebuilt only when one of its series changes, so converting a whole
+portfolio into its base currency costs one request per currency at most.
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from portfolio_server.analytics.bonds import (
+    duration_convexity,
+    estimate_price_change,
+    interpolate_yields,
+    parse_bond_identifier,
+    required_curve_points,
+)
+from portfolio_server.analytics.fx import (
+    PIVOT_CURRENCY,
+    FxMatrix,
+    build_fx_matrix,
+    required_fx_currencies,
+    symbol_currency,
+)
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.data.currency import normalize_currency
+from portfolio_server.data.providers import get_provider
+from portfolio_server.data.holdings import Holdings
+from portfolio_server.data.series import DailySeries, FxSeries, YieldSeries
+from portfolio_server.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# How long fetched series stay fresh before the next read goes upstream
+CACHE_TTL_SECONDS = float(os.environ.get("PORTFOLIO_CACHE_TTL", "900"))
+
+# Treasury yields are published once a day, so they can be cached much longer
+TREASURY_CACHE_TTL_SECONDS = float(os.environ.get("PORTFOLIO_TREASURY_CACHE_TTL", "21600"))
+
+# Exchange rates are published once a day as well
+FX_CACHE_TTL_SECONDS = float(os.environ.get("PORTFOLIO_FX_CACHE_TTL", "21600"))
+
+# Currency returns and valuations are reported in for portfolios that do not set one
+BASE_CURRENCY = normalize_currency(os.environ.get("PORTFOLIO_BASE_CURRENCY", PIVOT_CURRENCY))
+
+# FX matrices kept for reuse, one per base currency and set of currencies
+FX_MATRIX_CACHE_SIZE = 64
+
+# Trading days used to annualize daily return statistics
+TRADING_DAYS_PER_YEAR = 252
+
+class TimeSeriesCache:
+    """
+    In-memory TTL cache for upstream time series, keyed by (function, symbol).
+
+    Concurrent misses for the same key share a single upstream request.
+    Listeners are told about keys whose data changed when it was re-fetched.
+    """
+    def __init__(self, name: str = "series", ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], Tuple[float, float, Any]] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._listeners: List[Callable[[Tuple[str, str]], None]] = []
+        # Bumped whenever a key is stored with data that differs from what it replaces
+        self._versions: Dict[Tuple[str, str], int] = {}
+
+    def add_listener(self, listener: Callable[[Tuple[str, str]], None]) -> None:
+        """Register a callback run with the key whenever a stored value differs from the one it replaces."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def get(self, key: Tuple[str, str], allow_stale: bool = False) -> Optional[Any]:
+        """Get a cached value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, ttl_seconds, value = entry
+        if not allow_stale and time.monotonic() - stored_at > ttl_seconds:
+            return None
+        return value
+
+    def put(self, key: Tuple[str, str], value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value in the cache, optionally with its own time-to-live."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        previous = self._entries.get(key)
+        self._entries[key] = (time.monotonic(), ttl_seconds, value)
+        if previous is not None and _same_data(previous[2], value):
+            return
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if previous is not None:
+            for listener in list(self._listeners):
+                try:
+                    listener(key)
+                except Exception:
+                    logger.exception("Series cache listener %r failed", listener)
+
+    def snapshot(self, keys: List[Tuple[str, str]]) -> Optional[Tuple[int, ...]]:
+        """
+        Get the data versions of several keys, or None if any of them is missing or expired.
+
+        Two equal snapshots mean the same data is cached for every key, so a
+        result computed from those keys is still current.
+        """
+        now = time.monotonic()
+        versions = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > entry[1]:
+                return None
+            versions.append(self._versions[key])
+        return tuple(versions)
+
+    def invalidate(self, key: Optional[Tuple[str, str]] = None) -> None:
+        """Drop one entry, or every entry when no key is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key: Tuple[str, str],
+                           fetch: Callable[[], Awaitable[Optional[Any]]],
+                           ttl_seconds: Optional[float] = None, refresh: bool = False) -> Optional[Any]:
+        """
+        Get a fresh cached value or fetch it, sharing the fetch between concurrent callers.
+
+        Fetches returning None are not cached so that transient upstream errors are retried.
+        If the upstream call fails, an expired entry is served instead when one exists.
+        With `refresh`, the value is fetched even if the cached one is still fresh.
+        """
+        value = None if refresh else self.get(key)
+        if value is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                value = await fetch()
+            except UpstreamError:
+                value = self.get(key, allow_stale=True)
+                if value is None:
+                    raise
+                CACHE_REQUESTS.inc(cache=self.name, result="stale")
+            else:
+                if value is not None:
+                    self.put(key, value, ttl_seconds)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+def _same_data(old: Any, new: Any) -> bool:
+    """Check whether a re-fetched value carries the same data as the cached one."""
+    if hasattr(old, "fingerprint") and hasattr(new, "fingerprint"):
+        return old.fingerprint() == new.fingerprint()
+    return old is new
+
+series_cache = TimeSeriesCache()
+
+async def get_daily_series(symbol: str, refresh: bool = False) -> Optional[DailySeries]:
+    """
+    Get the daily price history for a symbol, using the shared cache
+
+    Args:
+        symbol: Stock symbol to fetch data for
+        refresh: Fetch from the provider even if the cached series is still fresh
+
+    Returns:
+        DailySeries for the symbol, or None if no price data is available
+    """
+    return await series_cache.get_or_fetch(("TIME_SERIES_DAILY", symbol),
+                                           lambda: get_provider().get_daily_series(symbol),
+                                           refresh=refresh)
+
+async def get_treasury_series(maturity: str, refresh: bool = False) -> Optional[YieldSeries]:
+    """
+    Get the daily yield history for a treasury maturity, using the shared cache
+
+    Args:
+        maturity: Alpha Vantage maturity name (3month, 2year, 5year, 7year, 10year or 30year)
+        refresh: Fetch from the provider even if the cached series is still fresh
+
+    Returns:
+        YieldSeries for the maturity, or None if no yield data is available
+    """
+    return await series_cache.get_or_fetch(("TREASURY_YIELD", maturity),
+                                           lambda: get_provider().get_treasury_series(maturity),
+                                           TREASURY_CACHE_TTL_SECONDS, refresh=refresh)
+
+async def get_fx_series(currency: str, refresh: bool = False) -> Optional[FxSeries]:
+    """
+    Get the daily exchange rates of a currency in the pivot currency, using the shared cache
+
+    Args:
+        currency: Currency code such as EUR
+        refresh: Fetch from the provider even if the cached series is still fresh
+
+    Returns:
+        FxSeries of the currency, or None if no rates are available
+    """
+    return await series_cache.get_or_fetch(("FX_DAILY", currency),
+                                           lambda: get_provider().get_fx_series(currency, PIVOT_CURRENCY),
+                                           FX_CACHE_TTL_SECONDS, refresh=refresh)
+
+# (base currency, column currencies) -> (series snapshot, matrix)
+_fx_matrices: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[Tuple[int, ...], FxMatrix]]" = OrderedDict()
+
+def fx_series_keys(base: str, currencies: Iterable[str]) -> List[Tuple[str, str]]:
+    """Get the cache keys of the exchange rate series needed to convert currencies into a base currency."""
+    return [("FX_DAILY", currency) for currency in required_fx_currencies(base, list(currencies))]
+
+async def get_fx_matrix(base: str, currencies: Iterable[str]) -> FxMatrix:
+    """
+    Get the FX matrix converting several currencies into a base currency
+
+    Each needed currency's series is fetched once through the shared cache,
+    and the matrix is reused until one of those series changes.
+
+    Args:
+        base: Currency to convert into
+        currencies: Currencies to convert from
+
+    Returns:
+        FxMatrix with one column per currency; currencies whose rates are
+        unavailable get NaN rates
+    """
+    columns = tuple(sorted(set(currencies)))
+    needed = required_fx_currencies(base, columns)
+    series_list = await asyncio.gather(*(get_fx_series(currency) for currency in needed), return_exceptions=True)
+    for series in series_list:
+        if isinstance(series, BaseException) and not isinstance(series, UpstreamError):
+            raise series
+
+    cache_key = (base, columns)
+    snapshot = series_cache.snapshot([("FX_DAILY", currency) for currency in needed])
+    cached = _fx_matrices.get(cache_key)
+    if cached is not None and snapshot is not None and cached[0] == snapshot:
+        _fx_matrices.move_to_end(cache_key)
+        CACHE_REQUESTS.inc(cache="fx_matrix", result="hit")
+        return cached[1]
+
+    CACHE_REQUESTS.inc(cache="fx_matrix", result="miss")
+    pivot_rates = {series.currency: (series.dates, series.rates) for series in series_list
+                   if isinstance(series, FxSeries) and len(series)}
+    matrix = build_fx_matrix(base, columns, pivot_rates)
+    # A matrix built while a series was unavailable is not kept, so the next call retries it
+    if snapshot is not None and len(pivot_rates) == len(needed):
+        _fx_matrices[cache_key] = (snapshot, matrix)
+        _fx_matrices.move_to_end(cache_key)
+        while len(_fx_matrices) > FX_MATRIX_CACHE_SIZE:
+            _fx_matrices.popitem(last=False)
+    return matrix
+
+def portfolio_currencies(portfolio: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+    """
+    Get a portfolio's base currency and the currency of each of its stocks
+
+    Args:
+        portfolio: Portfolio data including stocks, holdings and optionally
+            base_currency and currencies (currency per symbol)
+
+    Returns:
+        Tuple of (base currency, currency per stock and holding symbol)
+    """
+    base = portfolio.get("base_currency") or BASE_CURRENCY
+    overrides = portfolio.get("currencies") or {}
+    symbols = list(portfolio.get("stocks", {})) + Holdings.from_dict(portfolio.get("holdings")).all_symbols()
+    return base, {symbol: symbol_currency(symbol, overrides) for symbol in symbols}
+
+async def _fetch_daily_series(symbols: List[str], max_concurrency: int) -> Dict[str, DailySeries]:
+    """Get the daily series of several symbols, leaving out those without data."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(symbol: str) -> Optional[DailySeries]:
+        async with semaphore:
+            return await get_daily_series(symbol)
+
+    series_list = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    available = {}
+    for symbol, series in zip(symbols, series_list):
+        if isinstance(series, BaseException) and not isinstance(series, UpstreamError):
+            raise series
+        if isinstance(series, DailySeries) and len(series):
+            available[symbol] = series
+    return available
+
+async def get_latest_prices(symbols: List[str], max_concurrency: int = 8, base: Optional[str] = None,
+                            currencies: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """
+    Get the latest closing price of several symbols, using the shared cache
+
+    Args:
+        symbols: Stock symbols to price
+        max_concurrency: Maximum number of series fetched at once
+        base: Currency to convert the prices into, at the rate of each close's
+            date (default: leave them in the currency they are listed in)
+        currencies: Currency per symbol; others are inferred from the symbol
+
+    Returns:
+        Latest close per symbol; symbols without price data, or without an
+        exchange rate when converting, are left out
+    """
+    available = await _fetch_daily_series(symbols, max_concurrency)
+    prices = {symbol: series.latest_close for symbol, series in available.items()}
+    if base is None or not prices:
+        return prices
+
+    priced = list(prices)
+    listed = [(currencies or {}).get(symbol) or symbol_currency(symbol) for symbol in priced]
+    matrix = await get_fx_matrix(base, listed)
+    dates = np.array([str(available[symbol].dates[-1]) for symbol in priced])
+    converted = np.array([prices[symbol] for symbol in priced]) * matrix.rates_at(dates, matrix.columns(listed))
+    return {symbol: float(value) for symbol, value in zip(priced, converted) if not np.isnan(value)}
+
+async def get_price_changes(symbols: List[str], days: int, max_concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the change of several symbols' closing prices over their most recent days
+
+    Args:
+        symbols: Stock symbols
+        days: Number of daily closes to measure the change over
+        max_concurrency: Maximum number of series fetched at once
+
+    Returns:
+        Per symbol with price data: percent_change in the listing currency,
+        and the dates it was measured between (from, as_of)
+    """
+    available = await _fetch_daily_series(symbols, max_concurrency)
+    changes = {}
+    for symbol, series in available.items():
+        first = len(series) - min(days, len(series))
+        change = (series.latest_close / float(series.close[first]) - 1.0) * 100 if len(series) - first >= 2 else 0.0
+        changes[symbol] = {
+            "percent_change": round(change, 2),
+            "from": str(series.dates[first]),
+            "as_of": str(series.dates[-1]),
+        }
+    return changes
+
+async def fetch_bond_data(bond_ids: List[str], days: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Estimate the recent performance of bonds from cached treasury curves
+
+    Args:
+        bond_ids: Bond identifiers to evaluate
+        days: Number of daily curve observations to measure the change over
+
+    Returns:
+        Per bond: yield, yield change, duration, convexity and percent_change
+        between the dates it was measured (from, as_of), or an error message
+    """
+    result = {}
+    parsed = {}
+    for bond_id in bond_ids:
+        terms = parse_bond_identifier(bond_id)
+        if terms is None:
+            result[bond_id] = {"error": f"Unrecognized bond identifier '{bond_id}'. Use forms like US10Y or CORP_AAA."}
+        else:
+            parsed[bond_id] = terms
+    if not parsed:
+        return result
+
+    ids = list(parsed)
+    maturities = np.array([parsed[bond_id][0] for bond_id in ids])
+    spreads = np.array([parsed[bond_id][1] for bond_id in ids])
+
+    # Fetch only the curve points needed for interpolation; the cache makes repeats free
+    points = required_curve_points(maturities)
+    series_list = await asyncio.gather(*(get_treasury_series(name) for name in points), return_exceptions=True)
+    for series in series_list:
+        if isinstance(series, BaseException) and not isinstance(series, UpstreamError):
+            raise series
+    available = [(points[series.maturity], series) for series in series_list if isinstance(series, YieldSeries)]
+    if not available:
+        for bond_id in ids:
+            result[bond_id] = {"error": "Treasury yield data is currently unavailable."}
+        return result
+
+    common_dates = available[0][1].dates
+    for _, series in available[1:]:
+        common_dates = np.intersect1d(common_dates, series.dates, assume_unique=True)
+    window = common_dates[-max(days, 1):]
+    if len(window) == 0:
+        for bond_id in ids:
+            result[bond_id] = {"error": "Treasury yield curves have no dates in common."}
+        return result
+
+    curve_years = np.array([years for years, _ in available])
+    curve = np.column_stack([
+        series.yields[np.searchsorted(series.dates, window[[0, -1]])] for _, series in available
+    ])
+    start_yields, end_yields = (interpolate_yields(curve_years, curve, maturities) + spreads) / 100
+
+    # Price each holding as a par bond at the start of the window
+    _, modified, convexity = duration_convexity(start_yields, start_yields, maturities)
+    price_change = estimate_price_change(modified, convexity, end_yields - start_yields)
+    elapsed_years = (date.fromisoformat(str(window[-1])) - date.fromisoformat(str(window[0]))).days / 365
+    total_return = price_change + start_yields * elapsed_years
+
+    for i, bond_id in enumerate(ids):
+        result[bond_id] = {
+            "maturity_years": round(float(maturities[i]), 2),
+            "yield": round(float(end_yields[i]) * 100, 3),
+            "yield_change_bp": round(float(end_yields[i] - start_yields[i]) * 10000, 1),
+            "modified_duration": round(float(modified[i]), 3),
+            "convexity": round(float(convexity[i]), 3),
+            "price_change_percent": round(float(price_change[i]) * 100, 2),
+            "percent_change": round(float(total_return[i]) * 100, 2),
+            "from": str(window[0]),
+            "as_of": str(window[-1]),
+        }
+    return result
+
+async def convert_changes(changes: Dict[str, Dict[str, Any]], base: str,
+                          currencies: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Restate percent changes in a base currency, in place
+
+    Every entry with a percent_change, from and as_of date gains its listing
+    currency; when that differs from the base, also the change in the listing
+    currency (local_percent_change) and of the currency against the base
+    (fx_percent_change), while percent_change becomes the change in the base
+    currency. All entries are converted with one lookup in a shared FX matrix.
+
+    Args:
+        changes: Changes keyed by symbol or bond identifier, as returned by
+            get_price_changes or the bond tools
+        base: Currency to restate the changes in
+        currencies: Currency per key; others are inferred from the key
+
+    Returns:
+        The same dictionary
+    """
+    keys = [key for key, entry in changes.items()
+            if "percent_change" in entry and "from" in entry and "as_of" in entry]
+    if not keys:
+        return changes
+    listed = [(currencies or {}).get(key) or symbol_currency(key) for key in keys]
+    matrix = await get_fx_matrix(base, listed)
+    columns = matrix.columns(listed)
+    start = matrix.rates_at(np.array([changes[key]["from"] for key in keys]), columns)
+    end = matrix.rates_at(np.array([changes[key]["as_of"] for key in keys]), columns)
+    local = np.array([changes[key]["percent_change"] for key in keys], dtype=np.float64)
+    fx_change = end / start - 1.0
+    converted = ((1 + local / 100) * (1 + fx_change) - 1.0) * 100
+
+    for i, key in enumerate(keys):
+        entry = changes[key]
+        entry["currency"] = listed[i]
+        if listed[i] == base:
+            continue
+        entry["local_percent_change"] = entry["percent_change"]
+        if np.isnan(converted[i]):
+            # Without an exchange rate the change cannot be stated in the base currency
+            del entry["percent_change"]
+            entry["error"] = f"No {listed[i]}/{base} exchange rate available"
+        else:
+            entry["fx_percent_change"] = round(float(fx_change[i]) * 100, 2)
+            entry["percent_change"] = round(float(converted[i]), 2)
+    return changes
+
+async def search_symbols(query: str) -> List[Dict[str, str]]:
+    """
+    Search for companies by name or symbol with the configured provider
+
+    Args:
+        query: Company name or symbol to search for
+
+    Returns:
+        List of matches with symbol, name, type and region
+    """
+    return await get_provider().search(query)
+
+def portfolio_series_keys(portfolio: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Get the cache keys of the series a portfolio's performance is computed from
+
+    Args:
+        portfolio: Portfolio data including stocks and bonds
+
+    Returns:
+        Daily series keys of the stocks, treasury keys of the curve points used
+        to price the bonds, then exchange rate keys of the currencies that
+        differ from the base currency
+    """
+    keys = [("TIME_SERIES_DAILY", symbol) for symbol in portfolio.get("stocks", {})]
+    terms = [parse_bond_identifier(bond_id) for bond_id in portfolio.get("bonds", {})]
+    maturities = np.array([maturity for maturity, _ in filter(None, terms)])
+    if len(maturities):
+        keys.extend(("TREASURY_YIELD", name) for name in required_curve_points(maturities))
+    base, currencies = portfolio_currencies(portfolio)
+    listed = [currencies[symbol] for symbol in portfolio.get("stocks", {})]
+    if portfolio.get("bonds"):
+        # Bonds are priced from the US treasury curve
+        listed.append(PIVOT_CURRENCY)
+    keys.extend(fx_series_keys(base, listed))
+    return keys
+
+async def get_close_matrix(symbols: List[str], days: int, base: Optional[str] = None,
+                           currencies: Optional[Dict[str, str]] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Get aligned closing prices for several symbols over their common trading dates
+
+    Args:
+        symbols: Stock symbols to include
+        days: Maximum number of most recent common dates to keep
+        base: Currency to convert the prices into, at each date's exchange
+            rate (default: leave them in the currency they are listed in)
+        currencies: Currency per symbol; others are inferred from the symbol
+
+    Returns:
+        Tuple of (symbols with price data, ISO dates, closes array of shape (dates, symbols))
+    """
+    series_list = await asyncio.gather(*(get_daily_series(symbol) for symbol in symbols), return_exceptions=True)
+    for series in series_list:
+        if isinstance(series, BaseException) and not isinstance(series, UpstreamError):
+            raise series
+    # Symbols whose data is unavailable upstream are left out like unknown symbols
+    available = [series for series in series_list
+                 if isinstance(series, DailySeries) and len(series) > 1]
+    if not available:
+        return [], np.array([], dtype="<U10"), np.empty((0, 0))
+
+    common_dates = available[0].dates
+    for series in available[1:]:
+        common_dates = np.intersect1d(common_dates, series.dates, assume_unique=True)
+    common_dates = common_dates[-days:]
+
+    closes = np.column_stack([
+        series.close[np.searchsorted(series.dates, common_dates)] for series in available
+    ])
+    priced = [series.symbol for series in available]
+    if base is not None and len(common_dates):
+        listed = [(currencies or {}).get(symbol) or symbol_currency(symbol) for symbol in priced]
+        matrix = await get_fx_matrix(base, listed)
+        closes = closes * matrix.rates_at(common_dates[:, None], matrix.columns(listed)[None, :])
+        # Symbols without exchange rates cannot be stated in the base currency
+        converted = ~np.isnan(closes).any(axis=0)
+        priced = [symbol for symbol, keep in zip(priced, converted) if keep]
+        closes = closes[:, converted]
+    return priced, common_dates, closes
+
+async def get_return_matrix(symbols: List[str], lookback_days: int) -> Tuple[List[str], np.ndarray]:
+    """
+    Get aligned daily returns for several symbols over their common trading dates
+
+    Args:
+        symbols: Stock symbols to include
+        lookback_days: Maximum number of daily returns to keep per symbol
+
+    Returns:
+        Tuple of (symbols with price data, returns array of shape (days, symbols))
+    """
+    priced, _, closes = await get_close_matrix(symbols, lookback_days + 1)
+    if not priced:
+        return [], np.empty((0, 0))
+    returns = closes[1:] / closes[:-1] - 1.0
+    return priced, returns
+
+def estimate_moments(returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimate annualized expected returns and covariance from daily returns
+
+    Args:
+        returns: Daily returns array of shape (days, assets)
+
+    Returns:
+        Tuple of (expected returns, covariance matrix)
+    """
+    mu = returns.mean(axis=0) * TRADING_DAYS_PER_YEAR
+    cov = np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS_PER_YEAR
+    return mu, cov
@@ -0,0 +1,98 @@
+"""
+Memoized results of per-user computations over a portfolio and its prices.
+
+A result is keyed by the user and stays valid while both of its inputs are
+unchanged:
+
+- the portfolio version, taken from one stat of the portfolio file
+- the price snapshot: the data version of every cached series the
+  portfolio depends on (see TimeSeriesCache.snapshot)
+
+A repeated read for an unchanged portfolio therefore costs a stat and a
+dictionary lookup. Saving the portfolio, a refresh that stores different
+prices or an expired series entry makes the next read recompute.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from portfolio_server.data.market_data import portfolio_series_keys, series_cache
+from portfolio_server.data.storage import load_portfolio, portfolio_version
+from portfolio_server.metrics import CACHE_REQUESTS
+
+# Results kept per memo before the least recently used are evicted
+RESULT_CACHE_SIZE = int(os.environ.get("PORTFOLIO_RESULT_CACHE_SIZE", "256"))
+
+class ResultMemo:
+    """
+    Bounded LRU of results computed from a user's portfolio.
+
+    Args:
+        name: Name reported in cache metrics
+        max_entries: Users whose latest result is kept
+    """
+    def __init__(self, name: str, max_entries: int = RESULT_CACHE_SIZE):
+        self.name = name
+        self.max_entries = max_entries
+        # user id -> (portfolio version, series keys, price snapshot, result)
+        self._entries: "OrderedDict[str, Tuple[Any, List[Tuple[str, str]], Tuple[int, ...], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, user_id: str) -> Optional[str]:
+        """Get a user's memoized result if its portfolio and prices are unchanged, else None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        version, keys, snapshot, result = entry
+        if version != portfolio_version(user_id):
+            return None
+        # The portfolio is unchanged, so the series it depends on are too
+        if series_cache.snapshot(keys) != snapshot:
+            return None
+        with self._lock:
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+        return result
+
+    async def get_or_compute(self, user_id: str,
+                             compute: Callable[[Dict[str, Any]], Awaitable[str]]) -> str:
+        """
+        Get a user's result, computing it from their portfolio on a miss
+
+        Args:
+            user_id: Unique identifier for the user
+            compute: Coroutine function producing the result from the portfolio
+
+        Returns:
+            The memoized or freshly computed result
+        """
+        result = self.lookup(user_id)
+        if result is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return result
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+
+        version = portfolio_version(user_id)
+        portfolio = load_portfolio(user_id)
+        result = await compute(portfolio)
+
+        keys = portfolio_series_keys(portfolio)
+        snapshot = series_cache.snapshot(keys)
+        # Results built on failed fetches or a portfolio saved meanwhile are not kept
+        if version is not None and snapshot is not None and version == portfolio_version(user_id):
+            with self._lock:
+                self._entries[user_id] = (version, keys, snapshot, result)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """Drop every memoized result."""
+        with self._lock:
+            self._entries.clear()
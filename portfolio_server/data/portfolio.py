@@ -3,13 +3,17 @@ Portfolio data models and business logic.
 """
 from typing import Dict, List, Optional, Union
 
+from portfolio_server.data.holdings import Holdings
+
 class Portfolio:
     """
     Represents a user's investment portfolio.
     """
-    def __init__(self, stocks: Dict[str, float] = None, bonds: Dict[str, float] = None):
+    def __init__(self, stocks: Dict[str, float] = None, bonds: Dict[str, float] = None,
+                 holdings: Optional[Holdings] = None):
         self.stocks = stocks or {}
         self.bonds = bonds or {}
+        self.holdings = holdings or Holdings()
     
     @property
     def stock_allocation(self) -> float:
@@ -32,15 +36,19 @@ class Portfolio:
     
     def to_dict(self) -> Dict:
         """Convert portfolio to a dictionary representation."""
-        return {
+        data = {
             "stocks": self.stocks,
             "bonds": self.bonds,
         }
+        if len(self.holdings) or self.holdings.targets:
+            data["holdings"] = self.holdings.to_dict()
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Portfolio':
         """Create a Portfolio instance from a dictionary."""
         return cls(
             stocks=data.get("stocks", {}),
-            bonds=data.get("bonds", {})
+            bonds=data.get("bonds", {}),
+            holdings=Holdings.from_dict(data.get("holdings"))
         )
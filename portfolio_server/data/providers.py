@@ -0,0 +1,231 @@
+"""
+Market data providers.
+
+A provider turns a stock symbol or treasury maturity into a DailySeries or
+YieldSeries and resolves company searches. Providers with real-time data
+also supply IntradayBars and Quotes, and providers with currency data
+FxSeries; the others return None for them. Tools reach the configured
+provider through the shared cache in market_data. It is selected with the
+PORTFOLIO_MARKET_DATA_PROVIDER environment variable:
+
+- "alpha_vantage" (default): per-symbol requests to the Alpha Vantage API
+- "local": bulk CSV/Parquet dumps in PORTFOLIO_MARKET_DATA_DIR, read
+  through a memory-mapped columnar store
+- a comma-separated list such as "local,alpha_vantage", which asks each
+  provider in turn and uses the first one that has the data
+"""
+import os
+import asyncio
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from portfolio_server.api.alpha_vantage import (
+    fetch_fx_daily,
+    fetch_global_quote,
+    fetch_intraday_data,
+    fetch_stock_data,
+    fetch_treasury_yield,
+    search_company,
+)
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.data.local_store import LocalMarketDataStore
+from portfolio_server.data.series import DailySeries, FxSeries, IntradayBars, Quote, YieldSeries
+from portfolio_server.data.storage import PORTFOLIO_DIR
+
+# Directory holding bulk market data dumps for the local provider
+MARKET_DATA_DIR = os.environ.get("PORTFOLIO_MARKET_DATA_DIR", os.path.join(PORTFOLIO_DIR, "market-data"))
+
+# Seconds between checks of the dump directory for new or changed files
+MARKET_DATA_CHECK_INTERVAL = float(os.environ.get("PORTFOLIO_MARKET_DATA_CHECK_INTERVAL", "60"))
+
+# Maximum results returned by a local symbol search
+MAX_SEARCH_RESULTS = 10
+
+class MarketDataProvider:
+    """Source of daily price and treasury yield histories."""
+    name = ""
+
+    async def get_daily_series(self, symbol: str) -> Optional[DailySeries]:
+        """Get the daily price history for a symbol, or None if it is unknown."""
+        raise NotImplementedError
+
+    async def get_treasury_series(self, maturity: str) -> Optional[YieldSeries]:
+        """Get the daily yield history for a treasury maturity, or None if it is unknown."""
+        raise NotImplementedError
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        """Search for companies by name or symbol."""
+        raise NotImplementedError
+
+    async def get_intraday_bars(self, symbol: str, interval: str) -> Optional[IntradayBars]:
+        """Get the most recent intraday bars for a symbol, or None if the provider has none."""
+        return None
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Get the latest quote for a symbol, or None if the provider has none."""
+        return None
+
+    async def get_fx_series(self, currency: str, quote_currency: str) -> Optional[FxSeries]:
+        """Get the daily exchange rates of a currency, or None if the provider has none."""
+        return None
+
+class AlphaVantageProvider(MarketDataProvider):
+    """Per-symbol requests to the Alpha Vantage API."""
+    name = "alpha_vantage"
+
+    async def get_daily_series(self, symbol: str) -> Optional[DailySeries]:
+        return DailySeries.from_alpha_vantage(symbol, await fetch_stock_data(symbol))
+
+    async def get_treasury_series(self, maturity: str) -> Optional[YieldSeries]:
+        return YieldSeries.from_alpha_vantage(maturity, await fetch_treasury_yield(maturity))
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        return await search_company(query)
+
+    async def get_intraday_bars(self, symbol: str, interval: str) -> Optional[IntradayBars]:
+        return IntradayBars.from_alpha_vantage(symbol, await fetch_intraday_data(symbol, interval))
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        return Quote.from_alpha_vantage(symbol, await fetch_global_quote(symbol))
+
+    async def get_fx_series(self, currency: str, quote_currency: str) -> Optional[FxSeries]:
+        return FxSeries.from_alpha_vantage(currency, quote_currency,
+                                           await fetch_fx_daily(currency, quote_currency))
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    Bulk vendor dumps on local disk, served from a memory-mapped columnar store.
+
+    Args:
+        data_dir: Directory holding the CSV/Parquet dumps
+        check_interval: Seconds between checks for changed dumps
+    """
+    name = "local"
+
+    def __init__(self, data_dir: str = MARKET_DATA_DIR, check_interval: float = MARKET_DATA_CHECK_INTERVAL):
+        self.store = LocalMarketDataStore(data_dir, check_interval)
+
+    async def _rows(self, kind: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+        # Compiling changed dumps can take a while, so it runs off the event loop
+        store = await asyncio.to_thread(self.store.refresh) if self.store.needs_refresh() else self.store.current()
+        return store.rows(kind, key) if store is not None else None
+
+    async def get_daily_series(self, symbol: str) -> Optional[DailySeries]:
+        rows = await self._rows("prices", symbol.strip().upper())
+        if rows is None or not len(rows["date"]):
+            return None
+        return DailySeries(
+            symbol=symbol,
+            dates=np.datetime_as_string(rows["date"], unit="D"),
+            open_=rows["open"],
+            high=rows["high"],
+            low=rows["low"],
+            close=rows["close"],
+            volume=rows["volume"],
+        )
+
+    async def get_treasury_series(self, maturity: str) -> Optional[YieldSeries]:
+        rows = await self._rows("yields", maturity.strip().lower())
+        if rows is None or not len(rows["date"]):
+            return None
+        return YieldSeries(maturity, np.datetime_as_string(rows["date"], unit="D"), rows["value"])
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        store = await asyncio.to_thread(self.store.refresh) if self.store.needs_refresh() else self.store.current()
+        if store is None or not query.strip():
+            return []
+        needle = query.strip().upper()
+        symbols = [str(symbol) for symbol in store.keys("prices")]
+        # Exact and prefix matches rank ahead of other substring matches
+        matches = sorted((symbol for symbol in symbols if needle in symbol),
+                         key=lambda symbol: (symbol != needle, not symbol.startswith(needle), symbol))
+        return [{"symbol": symbol, "name": symbol, "type": "Equity", "region": "Local"}
+                for symbol in matches[:MAX_SEARCH_RESULTS]]
+
+class FallbackProvider(MarketDataProvider):
+    """
+    Chain of providers asked in order until one has the data.
+
+    An upstream failure in one provider moves on to the next; it is raised
+    only if no later provider has the data either.
+    """
+    def __init__(self, providers: List[MarketDataProvider]):
+        self.providers = providers
+        self.name = ",".join(provider.name for provider in providers)
+
+    async def _first(self, method: str, *args):
+        error: Optional[UpstreamError] = None
+        for provider in self.providers:
+            try:
+                result = await getattr(provider, method)(*args)
+            except UpstreamError as e:
+                error = e
+                continue
+            if result:
+                return result
+        if error is not None:
+            raise error
+        return [] if method == "search" else None
+
+    async def get_daily_series(self, symbol: str) -> Optional[DailySeries]:
+        return await self._first("get_daily_series", symbol)
+
+    async def get_treasury_series(self, maturity: str) -> Optional[YieldSeries]:
+        return await self._first("get_treasury_series", maturity)
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        return await self._first("search", query)
+
+    async def get_intraday_bars(self, symbol: str, interval: str) -> Optional[IntradayBars]:
+        return await self._first("get_intraday_bars", symbol, interval)
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        return await self._first("get_quote", symbol)
+
+    async def get_fx_series(self, currency: str, quote_currency: str) -> Optional[FxSeries]:
+        return await self._first("get_fx_series", currency, quote_currency)
+
+PROVIDERS = {
+    AlphaVantageProvider.name: AlphaVantageProvider,
+    LocalFileProvider.name: LocalFileProvider,
+}
+
+def create_provider(spec: str) -> MarketDataProvider:
+    """
+    Create a provider from a name or comma-separated list of names
+
+    Args:
+        spec: Provider name ("alpha_vantage" or "local"), or several names separated by commas
+
+    Returns:
+        The provider, or a FallbackProvider chaining several
+    """
+    names = [name.strip().lower() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROVIDERS]
+    if not names or unknown:
+        raise ValueError(f"Unknown market data provider '{spec}'. Available providers: {', '.join(PROVIDERS)}")
+    providers = [PROVIDERS[name]() for name in names]
+    return providers[0] if len(providers) == 1 else FallbackProvider(providers)
+
+_provider: Optional[MarketDataProvider] = None
+
+def get_provider() -> MarketDataProvider:
+    """Get the configured market data provider, creating it on first use."""
+    global _provider
+    if _provider is None:
+        _provider = create_provider(os.environ.get("PORTFOLIO_MARKET_DATA_PROVIDER", AlphaVantageProvider.name))
+    return _provider
+
+def set_provider(provider: Optional[MarketDataProvider]) -> None:
+    """
+    Replace the market data provider
+
+    Series already cached from the previous provider are kept; invalidate
+    market_data.series_cache to drop them.
+
+    Args:
+        provider: Provider to use, or None to recreate it from the environment
+    """
+    global _provider
+    _provider = provider
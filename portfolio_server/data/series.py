@@ -0,0 +1,207 @@
+"""
+Array-backed price, yield and exchange rate histories, intraday bars and quotes.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+class DailySeries:
+    """
+    Daily OHLCV history for one symbol, stored oldest-first as NumPy arrays.
+    """
+    def __init__(self, symbol: str, dates: np.ndarray, open_: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.symbol = symbol
+        self.dates = dates
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def fingerprint(self) -> tuple:
+        """Get a cheap summary that changes whenever a new or revised bar arrives."""
+        if not len(self):
+            return (0,)
+        return (len(self), str(self.dates[-1]), float(self.close[-1]), int(self.volume[-1]))
+
+    @property
+    def latest_close(self) -> float:
+        """Get the most recent closing price."""
+        return float(self.close[-1])
+
+    def returns(self) -> np.ndarray:
+        """Get simple daily returns computed from closing prices."""
+        return self.close[1:] / self.close[:-1] - 1.0
+
+    @classmethod
+    def from_alpha_vantage(cls, symbol: str, payload: Dict[str, Any]) -> Optional['DailySeries']:
+        """Create a DailySeries from a TIME_SERIES_DAILY payload, or None if it holds no prices."""
+        time_series = payload.get("Time Series (Daily)")
+        if not time_series:
+            return None
+
+        dates = sorted(time_series.keys())
+        rows = [time_series[date] for date in dates]
+        return cls(
+            symbol=symbol,
+            dates=np.array(dates),
+            open_=np.array([float(row["1. open"]) for row in rows]),
+            high=np.array([float(row["2. high"]) for row in rows]),
+            low=np.array([float(row["3. low"]) for row in rows]),
+            close=np.array([float(row["4. close"]) for row in rows]),
+            volume=np.array([int(row["5. volume"]) for row in rows], dtype=np.int64),
+        )
+
+class YieldSeries:
+    """
+    Daily yield history for one treasury maturity, stored oldest-first in percent.
+    """
+    def __init__(self, maturity: str, dates: np.ndarray, yields: np.ndarray):
+        self.maturity = maturity
+        self.dates = dates
+        self.yields = yields
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def fingerprint(self) -> tuple:
+        """Get a cheap summary that changes whenever a new or revised observation arrives."""
+        if not len(self):
+            return (0,)
+        return (len(self), str(self.dates[-1]), float(self.yields[-1]))
+
+    @classmethod
+    def from_alpha_vantage(cls, maturity: str, payload: Dict[str, Any]) -> Optional['YieldSeries']:
+        """Create a YieldSeries from a TREASURY_YIELD payload, or None if it holds no yields."""
+        # Holidays are reported with a "." placeholder instead of a value
+        rows = [row for row in payload.get("data", []) if row.get("value") not in (None, "", ".")]
+        if not rows:
+            return None
+
+        rows.sort(key=lambda row: row["date"])
+        return cls(
+            maturity=maturity,
+            dates=np.array([row["date"] for row in rows]),
+            yields=np.array([float(row["value"]) for row in rows]),
+        )
+
+class FxSeries:
+    """
+    Daily closing exchange rates of one currency, stored oldest-first.
+
+    Each rate is the price of one unit of `currency` in `quote_currency`.
+    """
+    def __init__(self, currency: str, quote_currency: str, dates: np.ndarray, rates: np.ndarray):
+        self.currency = currency
+        self.quote_currency = quote_currency
+        self.dates = dates
+        self.rates = rates
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def fingerprint(self) -> tuple:
+        """Get a cheap summary that changes whenever a new or revised fixing arrives."""
+        if not len(self):
+            return (0,)
+        return (len(self), str(self.dates[-1]), float(self.rates[-1]))
+
+    @classmethod
+    def from_alpha_vantage(cls, currency: str, quote_currency: str,
+                           payload: Dict[str, Any]) -> Optional['FxSeries']:
+        """Create an FxSeries from an FX_DAILY payload, or None if it holds no rates."""
+        time_series = payload.get("Time Series FX (Daily)")
+        if not time_series:
+            return None
+
+        dates = sorted(time_series.keys())
+        return cls(
+            currency=currency,
+            quote_currency=quote_currency,
+            dates=np.array(dates),
+            rates=np.array([float(time_series[date]["4. close"]) for date in dates]),
+        )
+
+class IntradayBars:
+    """
+    Intraday OHLCV bars for one symbol, stored oldest-first as NumPy arrays.
+
+    Timestamps are seconds since the epoch of the bar's exchange-local time,
+    as reported by the provider.
+    """
+    def __init__(self, symbol: str, timestamps: np.ndarray, open_: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.symbol = symbol
+        self.timestamps = timestamps
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def fingerprint(self) -> tuple:
+        """Get a cheap summary that changes whenever a new or revised bar arrives."""
+        if not len(self):
+            return (0,)
+        return (len(self), int(self.timestamps[-1]), float(self.close[-1]), int(self.volume[-1]))
+
+    @classmethod
+    def from_alpha_vantage(cls, symbol: str, payload: Dict[str, Any]) -> Optional['IntradayBars']:
+        """Create IntradayBars from a TIME_SERIES_INTRADAY payload, or None if it holds no bars."""
+        # The key names the interval, e.g. "Time Series (5min)"
+        key = next((key for key in payload if key.startswith("Time Series (")), None)
+        time_series = payload.get(key) if key else None
+        if not time_series:
+            return None
+
+        times = sorted(time_series.keys())
+        rows = [time_series[t] for t in times]
+        return cls(
+            symbol=symbol,
+            timestamps=np.array(times, dtype="datetime64[s]").astype(np.int64),
+            open_=np.array([float(row["1. open"]) for row in rows]),
+            high=np.array([float(row["2. high"]) for row in rows]),
+            low=np.array([float(row["3. low"]) for row in rows]),
+            close=np.array([float(row["4. close"]) for row in rows]),
+            volume=np.array([int(row["5. volume"]) for row in rows], dtype=np.int64),
+        )
+
+class Quote:
+    """
+    Latest traded price of one symbol together with the previous session's close.
+    """
+    def __init__(self, symbol: str, price: float, previous_close: float, trading_day: str):
+        self.symbol = symbol
+        self.price = price
+        self.previous_close = previous_close
+        self.trading_day = trading_day
+
+    def fingerprint(self) -> tuple:
+        """Get a cheap summary that changes whenever the price moves."""
+        return (self.price, self.previous_close, self.trading_day)
+
+    @property
+    def change_percent(self) -> float:
+        """Get the change from the previous close in percent."""
+        return (self.price / self.previous_close - 1.0) * 100 if self.previous_close else 0.0
+
+    @classmethod
+    def from_alpha_vantage(cls, symbol: str, payload: Dict[str, Any]) -> Optional['Quote']:
+        """Create a Quote from a GLOBAL_QUOTE payload, or None if it holds no price."""
+        quote = payload.get("Global Quote") or {}
+        try:
+            return cls(
+                symbol=symbol,
+                price=float(quote["05. price"]),
+                previous_close=float(quote.get("08. previous close") or 0.0),
+                trading_day=str(quote.get("07. latest trading day", "")),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
@@ -3,13 +3,89 @@ Storage utilities for portfolio data.
 """
 import os
 import json
+import logging
+import tempfile
 from datetime import datetime
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Setup storage paths
-PORTFOLIO_DIR = os.path.expanduser("~/.portfolio-manager")
+PORTFOLIO_DIR = os.environ.get("PORTFOLIO_DATA_DIR", os.path.expanduser("~/.portfolio-manager"))
 os.makedirs(PORTFOLIO_DIR, exist_ok=True)
 
+PORTFOLIO_SUFFIX = "_portfolio.json"
+
+# Callbacks run after portfolios are saved, with the saved portfolios keyed by user id
+_save_listeners: List[Callable[[Dict[str, Dict[str, Any]]], None]] = []
+
+def add_save_listener(listener: Callable[[Dict[str, Dict[str, Any]]], None]) -> None:
+    """
+    Register a callback to run after portfolios are saved.
+    
+    The callback receives the saved portfolios keyed by user id, once per
+    save_portfolio call or once per save_portfolios batch. Errors it raises
+    are logged and do not affect the save.
+    
+    Args:
+        listener: Callback to register
+    """
+    if listener not in _save_listeners:
+        _save_listeners.append(listener)
+
+# Saves made by this process per user, so versions change even within one mtime tick
+_save_counts: Dict[str, int] = {}
+
+def portfolio_version(user_id: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Get a version of a user's portfolio file that changes whenever it is rewritten.
+    
+    Combines this process's save count with the file's inode, modification
+    time and size, so writes by other processes are noticed as well. Costs
+    one stat call; the file is not read.
+    
+    Args:
+        user_id: Unique identifier for the user
+        
+    Returns:
+        Version tuple, or None if the user has no saved portfolio
+    """
+    try:
+        stat = os.stat(get_portfolio_path(user_id))
+    except FileNotFoundError:
+        return None
+    return (_save_counts.get(user_id, 0), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _notify_saved(portfolios: Dict[str, Dict[str, Any]]) -> None:
+    for listener in list(_save_listeners):
+        try:
+            listener(portfolios)
+        except Exception:
+            logger.exception("Portfolio save listener %r failed", listener)
+
+def confined_path(root: str, path: str) -> str:
+    """
+    Resolve a client-supplied path inside a server directory.
+    
+    Relative paths are taken relative to the directory, and symbolic links
+    are resolved before checking that the result stays inside it.
+    
+    Args:
+        root: Directory the path must stay in
+        path: Path given by the client
+        
+    Returns:
+        Absolute, resolved path
+        
+    Raises:
+        ValueError: If the path leads outside the directory
+    """
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"'{path}' is outside the directory {root}")
+    return resolved
+
 def get_portfolio_path(user_id: str) -> str:
     """
     Get the path to a user's portfolio file.
@@ -20,12 +96,27 @@ def get_portfolio_path(user_id: str) -> str:
     Returns:
         Path to the portfolio JSON file
     """
-    return os.path.join(PORTFOLIO_DIR, f"{user_id}_portfolio.json")
+    return os.path.join(PORTFOLIO_DIR, f"{user_id}{PORTFOLIO_SUFFIX}")
+
+def list_portfolio_users() -> Iterator[str]:
+    """
+    Iterate over the ids of users with a saved portfolio, in name order.
+    
+    Returns:
+        Iterator of user ids
+    """
+    names = sorted(entry.name for entry in os.scandir(PORTFOLIO_DIR)
+                   if entry.name.endswith(PORTFOLIO_SUFFIX) and entry.is_file())
+    for name in names:
+        yield name[:-len(PORTFOLIO_SUFFIX)]
 
 def load_portfolio(user_id: str) -> Dict[str, Any]:
     """
     Load a user's portfolio, or return empty one if none exists.
     
+    A file that is not valid JSON is logged and treated as an empty
+    portfolio, so the user can still save a new one over it.
+    
     Args:
         user_id: Unique identifier for the user
         
@@ -34,8 +125,11 @@ def load_portfolio(user_id: str) -> Dict[str, Any]:
     """
     path = get_portfolio_path(user_id)
     if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logger.warning("Invalid JSON in %s, treating the portfolio as empty", path)
     return {"stocks": {}, "bonds": {}, "last_updated": None}
 
 def save_portfolio(user_id: str, portfolio: Dict[str, Any]) -> None:
@@ -47,5 +141,34 @@ def save_portfolio(user_id: str, portfolio: Dict[str, Any]) -> None:
         portfolio: Portfolio data to save
     """
     portfolio["last_updated"] = datetime.now().isoformat()
-    with open(get_portfolio_path(user_id), 'w') as f:
-        json.dump(portfolio, f, indent=2)
+    _write_portfolio(user_id, portfolio)
+    _notify_saved({user_id: portfolio})
+
+def save_portfolios(portfolios: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Save many users' portfolios in one batch.
+    
+    Every portfolio gets the same update timestamp. Each file is written to a
+    temporary name and moved into place, so readers never see a partial file.
+    
+    Args:
+        portfolios: Portfolio data to save, keyed by user id
+        
+    Returns:
+        Number of portfolios saved
+    """
+    timestamp = datetime.now().isoformat()
+    for user_id, portfolio in portfolios.items():
+        portfolio["last_updated"] = timestamp
+        _write_portfolio(user_id, portfolio)
+    _notify_saved(portfolios)
+    return len(portfolios)
+
+def _write_portfolio(user_id: str, portfolio: Dict[str, Any]) -> None:
+    """Write a portfolio file atomically."""
+    path = get_portfolio_path(user_id)
+    fd, temporary = tempfile.mkstemp(dir=PORTFOLIO_DIR, suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        f.write(json.dumps(portfolio, indent=2))
+    os.replace(temporary, path)
+    _save_counts[user_id] = _save_counts.get(user_id, 0) + 1
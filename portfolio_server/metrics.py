@@ -0,0 +1,308 @@
+"""
+In-process metrics for the MCP server.
+
+Metrics are kept in a single registry and rendered in the Prometheus text
+exposition format, both for the `/metrics` route of the SSE app and for the
+`metrics://server` resource used by stdio sessions.
+"""
+import time
+import inspect
+import functools
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Payload size buckets in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base class for labelled metrics."""
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increase the count for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the current count for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally computed when rendered."""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the value for a label set."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increase the value for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """Decrease the value for a label set."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        """Get the current value for a label set."""
+        if self._callback is not None:
+            return self._callback().get(self._key(labels), 0.0)
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterable[str]:
+        if self._callback is not None:
+            items = sorted(self._callback().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record an observation for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels: Any) -> float:
+        """Get the number of observations for a label set."""
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(state[-1])}"
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, returning the already registered one if the name is taken."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create or get a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None) -> Gauge:
+        """Create or get a gauge."""
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Create or get a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+TOOL_LATENCY = registry.histogram(
+    "portfolio_tool_latency_seconds", "Tool execution time in seconds.", ["tool"])
+TOOL_CALLS = registry.counter(
+    "portfolio_tool_calls_total", "Tool calls by outcome.", ["tool", "status"])
+TOOL_RESPONSE_BYTES = registry.histogram(
+    "portfolio_tool_response_bytes", "Size of tool results in bytes.", ["tool"], SIZE_BUCKETS)
+
+UPSTREAM_LATENCY = registry.histogram(
+    "portfolio_upstream_latency_seconds", "Upstream API call time in seconds.", ["provider", "operation"])
+UPSTREAM_CALLS = registry.counter(
+    "portfolio_upstream_calls_total", "Upstream API calls by outcome.", ["provider", "operation", "status"])
+UPSTREAM_RESPONSE_BYTES = registry.histogram(
+    "portfolio_upstream_response_bytes", "Size of upstream API responses in bytes.",
+    ["provider", "operation"], SIZE_BUCKETS)
+
+UPSTREAM_RETRIES = registry.counter(
+    "portfolio_upstream_retries_total", "Upstream call retries by failure reason.", ["provider", "reason"])
+UPSTREAM_HEDGES = registry.counter(
+    "portfolio_upstream_hedged_requests_total", "Duplicate requests sent to cut tail latency.", ["provider"])
+CIRCUIT_STATE = registry.gauge(
+    "portfolio_upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ["provider"])
+
+CACHE_REQUESTS = registry.counter(
+    "portfolio_cache_requests_total", "Series cache lookups by result.", ["cache", "result"])
+
+TENANT_TOOL_CALLS = registry.counter(
+    "portfolio_tenant_tool_calls_total", "Tool and resource calls per tenant by outcome.", ["tenant", "status"])
+TENANT_TOOL_SECONDS = registry.counter(
+    "portfolio_tenant_tool_seconds_total", "Time spent in tool and resource calls per tenant.", ["tenant"])
+TENANT_ACTIVE_CALLS = registry.gauge(
+    "portfolio_tenant_active_calls", "Tool calls currently running per tenant.", ["tenant"])
+TENANT_QUEUED_CALLS = registry.counter(
+    "portfolio_tenant_queued_calls_total", "Tool calls that waited for a free tenant concurrency slot.", ["tenant"])
+TENANT_UPSTREAM_CALLS = registry.counter(
+    "portfolio_tenant_upstream_calls_total", "Upstream API calls charged to each tenant's quota.",
+    ["tenant", "status"])
+
+PROFILES_CAPTURED = registry.counter(
+    "portfolio_profiles_captured_total", "Tool call profiles stored, by why they were kept.", ["tool", "reason"])
+
+LOOP_LAG = registry.histogram(
+    "portfolio_event_loop_lag_seconds", "How late event loop heartbeats ran past their scheduled time.")
+LOOP_LAG_LAST = registry.gauge(
+    "portfolio_event_loop_lag_last_seconds", "Lag of the most recent event loop heartbeat.")
+LOOP_STALLS = registry.counter(
+    "portfolio_event_loop_stalls_total", "Times the event loop was blocked past the stall threshold, by location.",
+    ["location"])
+LOOP_STALLED_SECONDS = registry.counter(
+    "portfolio_event_loop_stalled_seconds_total", "Time the event loop spent blocked in stalls, by location.",
+    ["location"])
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in list(CACHE_REQUESTS._values.items()):
+        hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+        if result == "hit":
+            hits_and_total[0] += value
+        hits_and_total[1] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+CACHE_HIT_RATIO = registry.gauge(
+    "portfolio_cache_hit_ratio", "Fraction of series cache lookups served from cache.", ["cache"],
+    callback=_cache_hit_ratios)
+
+def _payload_size(result: Any) -> Optional[int]:
+    """Get the size of a tool result in bytes, if it has a natural one."""
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    data = getattr(result, "data", None)
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return None
+
+def _record_tool_call(tool: str, started: float, status: str, result: Any = None) -> None:
+    TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool)
+    TOOL_CALLS.inc(tool=tool, status=status)
+    if status == "ok":
+        size = _payload_size(result)
+        if size is not None:
+            TOOL_RESPONSE_BYTES.observe(size, tool=tool)
+
+def instrument_tool(fn: Callable) -> Callable:
+    """
+    Wrap a tool function to record its latency, outcome and result size.
+
+    The wrapper keeps the function's name, docstring and signature so that
+    FastMCP derives the same tool schema as for the bare function.
+    """
+    tool = fn.__name__
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                _record_tool_call(tool, started, "error")
+                raise
+            _record_tool_call(tool, started, "ok", result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            _record_tool_call(tool, started, "error")
+            raise
+        _record_tool_call(tool, started, "ok", result)
+        return result
+    return wrapper
@@ -0,0 +1,63 @@
+"""
+Process pools shared across calls.
+
+Starting worker processes is expensive: with the "spawn" method each worker
+starts a fresh interpreter and imports numpy and the modules it needs. A
+pool is therefore created on first use and kept for later calls, and grows
+when a call asks for more workers than it has. Pools are shut down when the
+server exits.
+
+Workers are started with the "spawn" method: forking a server process that
+runs an event loop and background threads can copy locks in a held state.
+"""
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+_pools: List["SharedProcessPool"] = []
+
+class SharedProcessPool:
+    """
+    Lazily created process pool reused across calls.
+
+    The pool has as many workers as the largest number asked for so far, so
+    a call may be spread over more processes than it asked for.
+
+    Args:
+        initializer: Function each worker runs once when it starts
+    """
+    def __init__(self, initializer: Optional[Callable[[], None]] = None):
+        self.initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = 0
+        self._lock = threading.Lock()
+        _pools.append(self)
+
+    def get(self, workers: int) -> ProcessPoolExecutor:
+        """Get the pool, starting it or replacing it with a larger one if it has fewer than `workers` workers."""
+        with self._lock:
+            # A pool whose worker died cannot run anything more and is replaced as well
+            broken = self._executor is not None and getattr(self._executor, "_broken", False)
+            if self._executor is None or self._workers < workers or broken:
+                if self._executor is not None:
+                    # Work already submitted to the old pool still completes
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=self.initializer)
+                self._workers = workers
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the pool's workers; a later call starts a new pool."""
+        with self._lock:
+            executor, self._executor, self._workers = self._executor, None, 0
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+@atexit.register
+def _shutdown_pools() -> None:
+    for pool in _pools:
+        pool.shutdown()
@@ -0,0 +1,385 @@
+"""
+Opt-in profiling of tool calls and capture of slow calls.
+
+Profiling is off unless PORTFOLIO_PROFILING (or `main.py --profiling`)
+selects a mode; it is applied when tools are registered, so an unprofiled
+server pays nothing for it. With profiling on, every tool call is profiled
+while it runs, and the profiles of calls slower than
+PORTFOLIO_PROFILE_SLOW_SECONDS, plus a random PORTFOLIO_PROFILE_SAMPLE_RATE
+fraction of the others, are written to PORTFOLIO_PROFILE_DIR. The newest
+PORTFOLIO_PROFILE_KEEP profiles are kept.
+
+Modes:
+- sample: a background thread records the stack of every thread each
+  PORTFOLIO_PROFILE_INTERVAL seconds while calls run, as folded stacks
+  ("outer;inner count") that flame graph tools read. It sees work handed to
+  executor threads, such as chart rendering, and costs the same however
+  many calls run. Calls share the event loop, so a call's samples include
+  whatever else the process did meanwhile, which is often why it was slow.
+- cprofile: deterministic cProfile of the event loop thread, saved as a
+  .prof file next to the summary. One call is profiled at a time and work
+  in executor threads is not seen; calls that start while another is being
+  profiled are timed but not profiled.
+
+Each stored profile records the tool, a hash of its arguments (never the
+arguments themselves), the tenant, its duration and outcome, and every
+upstream request it made with its timing.
+"""
+import os
+import io
+import re
+import sys
+import json
+import time
+import uuid
+import pstats
+import random
+import cProfile
+import hashlib
+import inspect
+import logging
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from portfolio_server.metrics import PROFILES_CAPTURED
+from portfolio_server.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+PROFILING_MODES = ("off", "sample", "cprofile")
+
+# Profiling mode; see configure_profiling to set it at startup
+PROFILING_MODE = os.environ.get("PORTFOLIO_PROFILING", "off").strip().lower() or "off"
+
+# Calls at least this many seconds long are always stored
+PROFILE_SLOW_SECONDS = float(os.environ.get("PORTFOLIO_PROFILE_SLOW_SECONDS", "1.0"))
+
+# Fraction of faster calls stored as a baseline
+PROFILE_SAMPLE_RATE = float(os.environ.get("PORTFOLIO_PROFILE_SAMPLE_RATE", "0"))
+
+# Seconds between stack samples in sample mode
+PROFILE_INTERVAL = float(os.environ.get("PORTFOLIO_PROFILE_INTERVAL", "0.005"))
+
+# Where profiles are stored, and how many of the newest are kept
+PROFILE_DIR = os.environ.get("PORTFOLIO_PROFILE_DIR", os.path.join(
+    os.environ.get("PORTFOLIO_DATA_DIR", os.path.expanduser("~/.portfolio-manager")), "profiles"))
+PROFILE_KEEP = int(os.environ.get("PORTFOLIO_PROFILE_KEEP", "500"))
+
+# Frames kept per sampled stack, innermost first, and distinct stacks stored per profile
+MAX_STACK_DEPTH = 64
+MAX_STORED_STACKS = 2000
+
+_PROFILE_ID = re.compile(r"^[\w.-]+$")
+
+def configure_profiling(mode: Optional[str] = None) -> str:
+    """
+    Set the profiling mode used by tools registered afterwards
+
+    Args:
+        mode: "off", "sample" or "cprofile" (default: PORTFOLIO_PROFILING)
+
+    Returns:
+        The mode now in effect
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    global PROFILING_MODE
+    mode = (mode or PROFILING_MODE).strip().lower()
+    if mode not in PROFILING_MODES:
+        raise ValueError(f"Unknown profiling mode '{mode}'. Valid options are: {', '.join(PROFILING_MODES)}")
+    PROFILING_MODE = mode
+    return mode
+
+class CallProfile:
+    """
+    Timings and samples of one running tool call.
+
+    Args:
+        tool: Tool name
+        args_hash: Hash of the call's arguments
+    """
+    def __init__(self, tool: str, args_hash: str):
+        self.tool = tool
+        self.args_hash = args_hash
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.upstream: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+        self.threads: Counter = Counter()
+        self.samples = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+# Profile of the tool call the current task belongs to; tasks started by a
+# call copy the context, so their upstream requests are recorded too
+_current_call: ContextVar[Optional[CallProfile]] = ContextVar("current_call_profile", default=None)
+
+def record_upstream(provider: str, operation: str, status: str, started: float, seconds: float) -> None:
+    """
+    Record an upstream request against the tool call being profiled, if any
+
+    Args:
+        provider: Upstream provider name
+        operation: Upstream operation name
+        status: Outcome of the request
+        started: perf_counter() value when the request started
+        seconds: Duration of the request
+    """
+    call = _current_call.get()
+    if call is not None:
+        call.upstream.append({"provider": provider, "operation": operation, "status": status,
+                              "offset": round(started - call.started, 6), "seconds": round(seconds, 6)})
+
+def _frame_name(code) -> str:
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Background thread sampling every thread's stack while profiled calls run.
+
+    Each sample is added to every call running at the time. The thread
+    stops when no profiled call is running.
+
+    Args:
+        interval: Seconds between samples
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._calls: List[CallProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, call: CallProfile) -> None:
+        """Start sampling for a call."""
+        with self._lock:
+            self._calls.append(call)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, call: CallProfile) -> None:
+        """Stop sampling for a call."""
+        with self._lock:
+            self._calls.remove(call)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                    frames.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                thread = names.get(ident, str(ident))
+                stacks.append((thread, ";".join([thread] + frames[::-1])))
+            with self._lock:
+                if not self._calls:
+                    self._thread = None
+                    return
+                for call in self._calls:
+                    call.samples += 1
+                    for thread, stack in stacks:
+                        call.threads[thread] += 1
+                        call.stacks[stack] += 1
+
+_sampler = StackSampler()
+
+# Only one cProfile can be active in a thread at a time
+_cprofile_lock = threading.Lock()
+
+# Profiles are written off the calling thread, one at a time
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-writer")
+
+def _args_hash(signature: inspect.Signature, args: tuple, kwargs: Dict[str, Any]) -> str:
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        arguments = {"args": args, "kwargs": kwargs}
+    encoded = json.dumps(arguments, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def _begin(tool: str, signature: inspect.Signature, args: tuple, kwargs: Dict[str, Any]) -> CallProfile:
+    call = CallProfile(tool, _args_hash(signature, args, kwargs))
+    if PROFILING_MODE == "sample":
+        _sampler.start(call)
+    elif _cprofile_lock.acquire(blocking=False):
+        call.profiler = cProfile.Profile()
+        call.profiler.enable()
+    return call
+
+def _end(call: CallProfile, status: str) -> None:
+    seconds = time.perf_counter() - call.started
+    if PROFILING_MODE == "sample":
+        _sampler.stop(call)
+    elif call.profiler is not None:
+        call.profiler.disable()
+        _cprofile_lock.release()
+
+    if seconds >= PROFILE_SLOW_SECONDS:
+        reason = "slow"
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        reason = "sampled"
+    else:
+        return
+    if PROFILING_MODE == "cprofile" and call.profiler is None:
+        # Another call held the profiler; there is nothing but the timings to keep
+        logger.info("Slow call to %s (%.3fs) was not profiled while another call was", call.tool, seconds)
+    PROFILES_CAPTURED.inc(tool=call.tool, reason=reason)
+    _writer.submit(_store, call, seconds, status, reason, current_tenant.get())
+
+def _upstream_wall_seconds(upstream: List[Dict[str, Any]]) -> float:
+    """Get the time during which at least one upstream request was in flight."""
+    total, end = 0.0, None
+    for request in sorted(upstream, key=lambda request: request["offset"]):
+        start, stop = request["offset"], request["offset"] + request["seconds"]
+        if end is None or start > end:
+            total += stop - start
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total
+
+def _store(call: CallProfile, seconds: float, status: str, reason: str, tenant: Optional[str]) -> None:
+    profile_id = f"{call.started_at.strftime('%Y%m%dT%H%M%S')}-{call.tool}-{uuid.uuid4().hex[:8]}"
+    record = {
+        "id": profile_id,
+        "tool": call.tool,
+        "mode": PROFILING_MODE,
+        "reason": reason,
+        "status": status,
+        "tenant": tenant,
+        "started_at": call.started_at.isoformat(),
+        "seconds": round(seconds, 6),
+        "args_hash": call.args_hash,
+        "upstream": call.upstream,
+        "upstream_wall_seconds": round(_upstream_wall_seconds(call.upstream), 6),
+    }
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if call.profiler is not None:
+            call.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+            buf = io.StringIO()
+            pstats.Stats(call.profiler, stream=buf).sort_stats("cumulative").print_stats(40)
+            record["functions"] = buf.getvalue()
+        elif PROFILING_MODE == "sample":
+            record["interval"] = _sampler.interval
+            record["samples"] = call.samples
+            record["threads"] = dict(call.threads)
+            record["stacks"] = dict(call.stacks.most_common(MAX_STORED_STACKS))
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+            json.dump(record, f)
+        _prune()
+    except OSError:
+        logger.exception("Could not store the profile of a %s call", call.tool)
+
+def _prune() -> None:
+    # Ids start with the call's start time, so sorting them orders the profiles by age
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for profile_id in ids[:max(len(ids) - PROFILE_KEEP, 0)]:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Wrap a tool function to profile its calls, if profiling is enabled.
+
+    Returns the function unchanged when profiling is off. The wrapper keeps
+    the function's name, docstring and signature.
+    """
+    if PROFILING_MODE == "off":
+        return fn
+    tool = fn.__name__
+    signature = inspect.signature(fn)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            call = _begin(tool, signature, args, kwargs)
+            token = _current_call.set(call)
+            status = "error"
+            try:
+                result = await fn(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                _current_call.reset(token)
+                _end(call, status)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call = _begin(tool, signature, args, kwargs)
+        token = _current_call.set(call)
+        status = "error"
+        try:
+            result = fn(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            _current_call.reset(token)
+            _end(call, status)
+    return wrapper
+
+def list_stored_profiles(tool: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Get the metadata of the newest stored profiles
+
+    Args:
+        tool: Only list profiles of this tool
+        limit: Maximum number of profiles
+
+    Returns:
+        Profile records without their stacks or function tables, newest first
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True):
+        if tool is not None and f"-{tool}-" not in name:
+            continue
+        try:
+            record = load_profile(name[:-5])
+        except (OSError, ValueError):
+            continue
+        if tool is not None and record.get("tool") != tool:
+            continue
+        for key in ("stacks", "functions", "threads"):
+            record.pop(key, None)
+        profiles.append(record)
+        if len(profiles) >= limit:
+            break
+    return profiles
+
+def load_profile(profile_id: str) -> Dict[str, Any]:
+    """
+    Load a stored profile
+
+    Args:
+        profile_id: Profile id from list_stored_profiles
+
+    Returns:
+        The profile record
+
+    Raises:
+        ValueError: If the id is malformed
+        FileNotFoundError: If there is no such profile
+    """
+    if not _PROFILE_ID.match(profile_id or ""):
+        raise ValueError(f"'{profile_id}' is not a profile id")
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json")) as f:
+        return json.load(f)
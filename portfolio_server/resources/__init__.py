@@ -1,3 +1,5 @@
-"""MCP resources for portfolio data."""
+"""MCP resources for portfolio data.
 
-from portfolio_server.resources import portfolio_resources
+Resource modules are imported by the server when it registers them, so that a
+minimal server only loads the modules it uses.
+"""
@@ -0,0 +1,19 @@
+"""
+MCP resources for live portfolio P&L.
+"""
+import json
+
+from portfolio_server.data.live import get_live_portfolio
+
+async def get_live_pnl_resource(user_id: str) -> str:
+    """
+    Get the live market value and P&L of a portfolio as a resource
+
+    Subscribed clients are sent resources/updated whenever a new quote moves
+    one of the portfolio's symbols.
+
+    Args:
+        user_id: Unique identifier for the user
+    """
+    live = await get_live_portfolio(user_id)
+    return json.dumps(live.summary(), indent=2)
@@ -0,0 +1,10 @@
+"""
+MCP resources for server metrics.
+"""
+from portfolio_server.metrics import registry
+
+def get_metrics_resource() -> str:
+    """
+    Get server latency, upstream call, cache and error metrics in Prometheus text format
+    """
+    return registry.render()
@@ -0,0 +1,74 @@
+"""
+MCP resources for portfolio performance.
+"""
+import json
+from typing import Any, Dict
+
+from portfolio_server.data.market_data import (
+    convert_changes,
+    fetch_bond_data,
+    get_price_changes,
+    portfolio_currencies,
+)
+from portfolio_server.data.memo import ResultMemo
+
+# Performance per user, reused while the portfolio and its prices are unchanged
+_performance = ResultMemo("performance")
+
+async def get_portfolio_performance(user_id: str) -> str:
+    """
+    Get the current portfolio performance data as a resource
+    
+    Args:
+        user_id: Unique identifier for the user
+    """
+    return await _performance.get_or_compute(user_id, _compute_performance)
+
+async def _compute_performance(portfolio: Dict[str, Any]) -> str:
+    """Compute portfolio performance from the latest prices, in the portfolio's base currency."""
+    if not portfolio["stocks"] and not portfolio["bonds"]:
+        return "No investments in portfolio to analyze performance."
+    
+    # Get stock price changes and bond estimates, restated in the base currency
+    base, currencies = portfolio_currencies(portfolio)
+    stock_symbols = list(portfolio["stocks"].keys())
+    price_data = await get_price_changes(stock_symbols, 7) if stock_symbols else {}
+    bond_data = await fetch_bond_data(list(portfolio["bonds"].keys()), 7) if portfolio["bonds"] else {}
+    await convert_changes(price_data, base, currencies)
+    await convert_changes(bond_data, base)
+    
+    # Calculate performance metrics
+    performance = {
+        "base_currency": base,
+        "symbols": {},
+        "bonds": {},
+        "total_contribution": 0
+    }
+    
+    for symbol, allocation in portfolio["stocks"].items():
+        if symbol in price_data and "percent_change" in price_data[symbol]:
+            change = price_data[symbol]["percent_change"]
+            contribution = (change * allocation) / 100
+            performance["symbols"][symbol] = {
+                "allocation": allocation,
+                "currency": price_data[symbol]["currency"],
+                "percent_change": change,
+                "contribution": contribution
+            }
+            if "fx_percent_change" in price_data[symbol]:
+                performance["symbols"][symbol]["local_percent_change"] = price_data[symbol]["local_percent_change"]
+                performance["symbols"][symbol]["fx_percent_change"] = price_data[symbol]["fx_percent_change"]
+            performance["total_contribution"] += contribution
+    
+    for bond_id, allocation in portfolio["bonds"].items():
+        if bond_id in bond_data and "percent_change" in bond_data[bond_id]:
+            change = bond_data[bond_id]["percent_change"]
+            contribution = (change * allocation) / 100
+            performance["bonds"][bond_id] = {
+                "allocation": allocation,
+                "percent_change": change,
+                "contribution": contribution
+            }
+            performance["total_contribution"] += contribution
+    
+    return json.dumps(performance, indent=2)
@@ -1,26 +1,65 @@
+import os
 import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
 from mcp.server.fastmcp import FastMCP
-from portfolio_server.tools import portfolio_tools, stock_tools, analysis_tools, visualization_tools
-from portfolio_server.resources import portfolio_resources
+from portfolio_server.metrics import instrument_tool
+from portfolio_server.profiling import profiled
+from portfolio_server.tenancy import tenant_scoped
+from portfolio_server.watchdog import ensure_watchdog
 
-def create_mcp_server() -> FastMCP:
+# Tool sets that can be selected at startup:
+# - full: every tool and resource
+# - minimal: portfolio storage tools and resources only, without market data,
+#   analytics or charts, so that neither numpy, pandas nor matplotlib is imported
+PROFILES = ("full", "minimal")
+
+def get_profile(profile: Optional[str] = None) -> str:
+    """
+    Resolve the server profile, defaulting to PORTFOLIO_SERVER_PROFILE or "full"
+
+    Args:
+        profile: Profile name, or None to use the environment
+    """
+    profile = (profile or os.environ.get("PORTFOLIO_SERVER_PROFILE") or "full").strip().lower()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown server profile '{profile}'. Valid options are: {', '.join(PROFILES)}")
+    return profile
+
+@asynccontextmanager
+async def _lifespan(mcp: FastMCP) -> AsyncIterator[dict]:
+    # Every session, over stdio or SSE, runs in the server's one event loop;
+    # the first one starts the watchdog on it
+    ensure_watchdog()
+    yield {}
+
+def create_mcp_server(profile: Optional[str] = None) -> FastMCP:
     # Create and configure the MCP server with default transport (stdio)
     try:
-        print("Initializing Portfolio Manager MCP Server...", file=sys.stderr)
+        profile = get_profile(profile)
+        print(f"Initializing Portfolio Manager MCP Server ({profile} profile)...", file=sys.stderr)
         mcp = FastMCP("Portfolio Manager MCP Server",
-                      dependencies = [
+                      dependencies = [] if profile == "minimal" else [
                           "pandas",
+                          "numpy",
                           "httpx",
                           "matplotlib"
-                      ])
-        
+                      ],
+                      lifespan=_lifespan)
+
         # Register tools
         print("Registering tools...", file=sys.stderr)
-        register_tools(mcp)
+        if profile == "minimal":
+            register_core_tools(mcp)
+        else:
+            register_tools(mcp)
         print("Registering resources...", file=sys.stderr)
-        register_resources(mcp)
-        
+        if profile == "minimal":
+            register_core_resources(mcp)
+        else:
+            register_resources(mcp)
+
         print("MCP Server initialized successfully!", file=sys.stderr)
         return mcp
     except Exception as e:
@@ -29,21 +68,81 @@ def create_mcp_server() -> FastMCP:
         # Re-raise the exception so it's visible in the logs
         raise
 
+# Tool and resource modules are imported where they are registered, so that a
+# minimal server never pays for the imports of the modules it leaves out
+
+def _tool(mcp: FastMCP, fn, admin_only: bool = False) -> None:
+    # Register a tool, scoped to the session's tenant, profiled when profiling is
+    # enabled, and wrapped to record latency and outcome metrics
+    mcp.tool()(instrument_tool(profiled(tenant_scoped(fn, admin_only))))
+
+def register_core_tools(mcp: FastMCP) -> None:
+    # Register the portfolio storage tools shared by every profile
+    from portfolio_server.tools import portfolio_tools
+
+    _tool(mcp, portfolio_tools.update_portfolio)
+    _tool(mcp, portfolio_tools.remove_investment)
+    _tool(mcp, portfolio_tools.view_portfolio)
+
 def register_tools(mcp: FastMCP) -> None:
-    # TODO: Register all tools
-    mcp.tool()(portfolio_tools.update_portfolio)
-    mcp.tool()(portfolio_tools.remove_investment)
-    
-    mcp.tool()(stock_tools.get_stock_prices)
-    mcp.tool()(stock_tools.get_stock_news)
-    mcp.tool()(stock_tools.search_stocks)
+    # Register all tools
+    from portfolio_server.tools import (
+        portfolio_tools,
+        stock_tools,
+        bond_tools,
+        holdings_tools,
+        analysis_tools,
+        visualization_tools,
+        profiling_tools,
+    )
 
-    mcp.tool()(analysis_tools.generate_portfolio_report)
-    mcp.tool()(analysis_tools.get_investment_recommendations)
+    register_core_tools(mcp)
+    _tool(mcp, portfolio_tools.import_portfolios, admin_only=True)
+    _tool(mcp, portfolio_tools.export_portfolios, admin_only=True)
+    _tool(mcp, portfolio_tools.get_portfolio_history)
 
-    mcp.tool()(visualization_tools.visualize_portfolio)
+    _tool(mcp, stock_tools.get_stock_prices)
+    _tool(mcp, stock_tools.get_intraday_prices)
+    _tool(mcp, stock_tools.get_stock_news)
+    _tool(mcp, stock_tools.search_stocks)
+
+    _tool(mcp, bond_tools.get_bond_data)
+
+    _tool(mcp, holdings_tools.update_holdings)
+    _tool(mcp, holdings_tools.get_portfolio_valuation)
+    _tool(mcp, holdings_tools.get_live_pnl)
+
+    _tool(mcp, analysis_tools.generate_portfolio_report)
+    _tool(mcp, analysis_tools.get_investment_recommendations)
+    _tool(mcp, analysis_tools.rebalance_portfolio)
+    _tool(mcp, analysis_tools.project_portfolio_goal)
+
+    _tool(mcp, visualization_tools.visualize_portfolio)
+    _tool(mcp, visualization_tools.visualize_price_history)
+    _tool(mcp, visualization_tools.visualize_drawdown)
+    _tool(mcp, visualization_tools.visualize_correlation)
+    _tool(mcp, visualization_tools.render_charts, admin_only=True)
+
+    _tool(mcp, profiling_tools.list_profiles, admin_only=True)
+    _tool(mcp, profiling_tools.get_profile, admin_only=True)
+    _tool(mcp, profiling_tools.get_event_loop_stalls, admin_only=True)
+
+def register_core_resources(mcp: FastMCP) -> None:
+    # Register the portfolio and metrics resources shared by every profile
+    from portfolio_server.resources import portfolio_resources, metrics_resources
+
+    mcp.resource("portfolio://{user_id}")(tenant_scoped(portfolio_resources.get_portfolio_resource))
+    mcp.resource("metrics://server", mime_type="text/plain")(
+        tenant_scoped(metrics_resources.get_metrics_resource, admin_only=True))
 
 def register_resources(mcp: FastMCP) -> None:
-    # Register all resources within the portfolio_resources module
-    mcp.resource("portfolio://{user_id}")(portfolio_resources.get_portfolio_resource)
-    mcp.resource("portfolio-performance://{user_id}")(portfolio_resources.get_portfolio_performance)
\ No newline at end of file
+    # Register all resources
+    from portfolio_server.resources import performance_resources, live_resources
+    from portfolio_server.subscriptions import register_subscriptions
+
+    register_core_resources(mcp)
+    mcp.resource("portfolio-performance://{user_id}")(tenant_scoped(performance_resources.get_portfolio_performance))
+    mcp.resource("portfolio-live://{user_id}")(tenant_scoped(live_resources.get_live_pnl_resource))
+
+    # Let clients subscribe to portfolio resources instead of polling them
+    register_subscriptions(mcp)
@@ -7,22 +7,36 @@ from starlette.applications import Starlette
 from starlette.routing import Mount, Route
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import PlainTextResponse, Response
 
 from mcp.server.sse import SseServerTransport
 from portfolio_server.server import create_mcp_server
+from portfolio_server.metrics import registry
+from portfolio_server.tenancy import ADMIN_TENANT, auth_enabled, authenticate, current_tenant
 
-def create_sse_app(port=8080):
+def _request_token(request):
+    """Get the API token of a request from its bearer Authorization header or its token query parameter."""
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip()
+    return request.query_params.get("token")
+
+def _unauthorized():
+    return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+
+def create_sse_app(port=8080, profile=None):
     """
     Create a Starlette app for SSE transport with the portfolio MCP server.
     
     Args:
         port: Port to use for the SSE server
+        profile: Server profile ("full" or "minimal"), or None to use PORTFOLIO_SERVER_PROFILE
         
     Returns:
         Starlette app configured with SSE routes
     """
     # Create the MCP server
-    mcp = create_mcp_server()
+    mcp = create_mcp_server(profile)
     
     # Create SSE transport
     transport = SseServerTransport("/mcp/messages")
@@ -30,17 +44,37 @@ def create_sse_app(port=8080):
     # Define route handlers
     async def handle_sse(request):
         """Handle SSE connection requests"""
-        async with transport.connect_sse(
-            request.scope, request.receive, request._send
-        ) as streams:
-            await mcp._mcp_server.run(
-                streams[0],
-                streams[1],
-                mcp._mcp_server.create_initialization_options()
-            )
+        # With tokens configured, the session acts for the tenant of its token;
+        # every request of the session is handled within this context
+        tenant = None
+        if auth_enabled():
+            tenant = authenticate(_request_token(request))
+            if tenant is None:
+                return _unauthorized()
+        token = current_tenant.set(tenant)
+        try:
+            async with transport.connect_sse(
+                request.scope, request.receive, request._send
+            ) as streams:
+                await mcp._mcp_server.run(
+                    streams[0],
+                    streams[1],
+                    mcp._mcp_server.create_initialization_options()
+                )
+        finally:
+            current_tenant.reset(token)
+        # Starlette expects a response once the SSE stream has closed
+        return Response()
+    
+    async def handle_metrics(request):
+        """Serve server metrics in Prometheus text format"""
+        if auth_enabled() and authenticate(_request_token(request)) != ADMIN_TENANT:
+            return _unauthorized()
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
     
     # Create routes
     routes = [
+        Route("/metrics", endpoint=handle_metrics),
         Route("/mcp/sse", endpoint=handle_sse),
         Mount("/mcp/messages", app=transport.handle_post_message)
     ]
@@ -58,15 +92,16 @@ def create_sse_app(port=8080):
     # Create the Starlette app
     return Starlette(routes=routes, middleware=middleware)
 
-def run_sse_server(port=8080, host="0.0.0.0"):
+def run_sse_server(port=8080, host="0.0.0.0", profile=None):
     """
     Run the MCP server with SSE transport using uvicorn.
     
     Args:
         port: Port to run the server on
         host: Host to bind to
+        profile: Server profile ("full" or "minimal"), or None to use PORTFOLIO_SERVER_PROFILE
     """
-    app = create_sse_app(port)
+    app = create_sse_app(port, profile)
     uvicorn.run(app, host=host, port=port)
 
 if __name__ == "__main__":
@@ -0,0 +1,263 @@
+"""
+Resource subscriptions and change notifications.
+
+Clients subscribe to `portfolio://{user_id}`,
+`portfolio-performance://{user_id}` or `portfolio-live://{user_id}` and
+receive `notifications/resources/updated` instead of polling:
+
+- when a portfolio is saved, for all of the user's resources
+- when the series cache stores changed prices for a stock the user holds,
+  changed yields for a treasury maturity the user's bonds are priced
+  from, or changed rates for a currency the user's returns are converted
+  from, for the performance resource
+- when a new quote moves the price of a stock the user holds, for the live
+  resource
+
+While anyone is subscribed to a performance resource, a background task
+re-fetches the subscribed users' stocks, treasury curve points and
+exchange rates every PRICE_REFRESH_INTERVAL seconds so that price changes
+are noticed without a client asking. Likewise, while anyone is subscribed to a live resource,
+the quotes of the stocks those users hold are polled every
+QUOTE_REFRESH_INTERVAL seconds, and each quote updates only the live
+portfolios that hold its symbol.
+
+The background tasks run outside any session's context. Each series or
+quote they fetch is charged to the upstream quota of one of the subscribed
+users that needs it, not to the session that happened to subscribe first.
+"""
+import os
+import asyncio
+import logging
+import contextvars
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from mcp.server.fastmcp import FastMCP
+from pydantic import AnyUrl
+
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.data.market_data import (
+    get_daily_series,
+    get_fx_series,
+    get_treasury_series,
+    portfolio_series_keys,
+    series_cache,
+)
+from portfolio_server.data.intraday import get_quotes
+from portfolio_server.data.live import live_pnl, track_live_portfolio
+from portfolio_server.data.storage import add_save_listener, load_portfolio
+from portfolio_server.tenancy import acting_for, check_user
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background refreshes of prices held by subscribed users
+PRICE_REFRESH_INTERVAL = float(os.environ.get("PORTFOLIO_PRICE_REFRESH_INTERVAL", "300"))
+
+# Seconds between polls of the quotes held by users with a subscribed live resource
+QUOTE_REFRESH_INTERVAL = float(os.environ.get("PORTFOLIO_QUOTE_REFRESH_INTERVAL", "15"))
+
+# Series the background refresher fetches at once
+REFRESH_CONCURRENCY = 8
+
+PORTFOLIO_SCHEME = "portfolio://"
+PERFORMANCE_SCHEME = "portfolio-performance://"
+LIVE_SCHEME = "portfolio-live://"
+
+class SubscriptionManager:
+    """
+    Tracks which sessions subscribe to which resource URIs and notifies them.
+
+    Args:
+        refresh_interval: Seconds between background price refreshes
+        quote_interval: Seconds between background quote polls
+    """
+    def __init__(self, refresh_interval: float = PRICE_REFRESH_INTERVAL,
+                 quote_interval: float = QUOTE_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.quote_interval = quote_interval
+        self._sessions: Dict[str, Set[Any]] = {}
+        # Users with a subscribed performance resource -> series cache keys it depends on
+        self._inputs: Dict[str, Set[Tuple[str, str]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._quoter: Optional[asyncio.Task] = None
+        # Strong references to scheduled notifications until they finish
+        self._pending: Set[asyncio.Task] = set()
+
+    def subscribers(self, uri: str) -> int:
+        """Get the number of sessions subscribed to a URI."""
+        return len(self._sessions.get(uri, ()))
+
+    async def subscribe(self, uri: str, session: Any) -> None:
+        """Subscribe a session to a resource URI."""
+        self._loop = asyncio.get_running_loop()
+        self._sessions.setdefault(uri, set()).add(session)
+        if uri.startswith(PERFORMANCE_SCHEME):
+            user_id = uri[len(PERFORMANCE_SCHEME):]
+            self._inputs[user_id] = set(portfolio_series_keys(load_portfolio(user_id)))
+            if self._refresher is None or self._refresher.done():
+                # A fresh context, so the loop does not keep acting as this request's tenant
+                self._refresher = asyncio.create_task(self._refresh_loop(), context=contextvars.Context())
+        elif uri.startswith(LIVE_SCHEME):
+            await track_live_portfolio(uri[len(LIVE_SCHEME):])
+            if self._quoter is None or self._quoter.done():
+                self._quoter = asyncio.create_task(self._quote_loop(), context=contextvars.Context())
+
+    async def unsubscribe(self, uri: str, session: Any) -> None:
+        """Unsubscribe a session from a resource URI."""
+        sessions = self._sessions.get(uri)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                self._drop(uri)
+
+    def _drop(self, uri: str) -> None:
+        self._sessions.pop(uri, None)
+        if uri.startswith(PERFORMANCE_SCHEME):
+            self._inputs.pop(uri[len(PERFORMANCE_SCHEME):], None)
+        elif uri.startswith(LIVE_SCHEME):
+            live_pnl.forget(uri[len(LIVE_SCHEME):])
+
+    async def notify(self, uri: str) -> None:
+        """Send a resources/updated notification to every session subscribed to a URI."""
+        for session in list(self._sessions.get(uri, ())):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception:
+                # The session is gone; forget it rather than failing every later notification
+                logger.debug("Dropping subscription of closed session to %s", uri)
+                sessions = self._sessions.get(uri)
+                if sessions is not None:
+                    sessions.discard(session)
+                    if not sessions:
+                        self._drop(uri)
+
+    def notify_threadsafe(self, uris: Iterable[str]) -> None:
+        """Schedule notifications from any thread, for URIs that have subscribers."""
+        uris = [uri for uri in uris if uri in self._sessions]
+        loop = self._loop
+        if not uris or loop is None or loop.is_closed():
+            return
+        for uri in uris:
+            loop.call_soon_threadsafe(self._schedule, uri)
+
+    def _schedule(self, uri: str) -> None:
+        task = asyncio.get_running_loop().create_task(self.notify(uri))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def portfolios_saved(self, portfolios: Dict[str, Dict[str, Any]]) -> None:
+        """Storage save listener: notify the portfolio and performance resources of every saved user."""
+        uris = []
+        for user_id, portfolio in portfolios.items():
+            if user_id in self._inputs:
+                self._inputs[user_id] = set(portfolio_series_keys(portfolio))
+            uris.append(f"{PORTFOLIO_SCHEME}{user_id}")
+            uris.append(f"{PERFORMANCE_SCHEME}{user_id}")
+        self.notify_threadsafe(uris)
+
+    def series_changed(self, key: Tuple[str, str]) -> None:
+        """Series cache listener: notify performance resources that depend on the changed series."""
+        users = [user_id for user_id, keys in self._inputs.items() if key in keys]
+        self.notify_threadsafe(f"{PERFORMANCE_SCHEME}{user_id}" for user_id in users)
+
+    def live_changed(self, users: Iterable[str]) -> None:
+        """Live P&L listener: notify the live resources of users whose live values moved."""
+        self.notify_threadsafe(f"{LIVE_SCHEME}{user_id}" for user_id in users)
+
+    async def refresh_prices(self) -> None:
+        """Re-fetch every series that a subscribed performance resource depends on."""
+        # Each series is fetched for, and charged to, one of the users depending on it
+        owners: Dict[Tuple[str, str], str] = {}
+        for user_id, keys in sorted(self._inputs.items()):
+            for key in keys:
+                owners.setdefault(key, user_id)
+        fetchers = {
+            "TIME_SERIES_DAILY": get_daily_series,
+            "TREASURY_YIELD": get_treasury_series,
+            "FX_DAILY": get_fx_series,
+        }
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+
+        async def run(function: str, name: str, user_id: str) -> None:
+            async with semaphore, acting_for(user_id):
+                try:
+                    # Changed series reach series_changed through the cache listener
+                    await fetchers[function](name, refresh=True)
+                except UpstreamError as e:
+                    logger.debug("Background price refresh failed: %s", e)
+
+        await asyncio.gather(*(run(function, name, user_id)
+                               for (function, name), user_id in sorted(owners.items())
+                               if function in fetchers))
+
+    async def _refresh_loop(self) -> None:
+        while self._inputs:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_prices()
+            except Exception:
+                logger.exception("Background price refresh failed")
+
+    async def refresh_quotes(self) -> None:
+        """Poll the quotes of every stock held by a user with a subscribed live resource."""
+        # Each quote is fetched for, and charged to, one of the users holding the symbol
+        by_owner: Dict[str, list] = {}
+        for symbol in sorted(live_pnl.symbols()):
+            holders = live_pnl.holders(symbol)
+            if holders:
+                by_owner.setdefault(min(holders), []).append(symbol)
+        for user_id, symbols in by_owner.items():
+            async with acting_for(user_id):
+                # Changed quotes reach live_changed through the intraday store and live P&L listeners
+                await get_quotes(symbols, refresh=True, max_concurrency=REFRESH_CONCURRENCY)
+
+    async def _quote_loop(self) -> None:
+        while live_pnl.tracked():
+            await asyncio.sleep(self.quote_interval)
+            try:
+                await self.refresh_quotes()
+            except Exception:
+                logger.exception("Background quote refresh failed")
+
+subscriptions = SubscriptionManager()
+
+add_save_listener(subscriptions.portfolios_saved)
+series_cache.add_listener(subscriptions.series_changed)
+live_pnl.add_listener(subscriptions.live_changed)
+
+def _resource_user(uri: str) -> Optional[str]:
+    """Get the user a portfolio resource URI belongs to, or None for other URIs."""
+    for scheme in (PORTFOLIO_SCHEME, PERFORMANCE_SCHEME, LIVE_SCHEME):
+        if uri.startswith(scheme):
+            return uri[len(scheme):]
+    return None
+
+def register_subscriptions(mcp: FastMCP) -> None:
+    """
+    Handle resources/subscribe and resources/unsubscribe on an MCP server
+
+    Args:
+        mcp: Server whose resources can be subscribed to
+    """
+    server = mcp._mcp_server
+
+    @server.subscribe_resource()
+    async def handle_subscribe(uri: AnyUrl) -> None:
+        # The same access rule as for reading the resource
+        check_user(_resource_user(str(uri)))
+        await subscriptions.subscribe(str(uri), server.request_context.session)
+
+    @server.unsubscribe_resource()
+    async def handle_unsubscribe(uri: AnyUrl) -> None:
+        await subscriptions.unsubscribe(str(uri), server.request_context.session)
+
+    # The low-level server always advertises subscribe=False; advertise the handlers above
+    get_capabilities = server.get_capabilities
+
+    def get_capabilities_with_subscribe(*args, **kwargs):
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    server.get_capabilities = get_capabilities_with_subscribe
@@ -0,0 +1,272 @@
+"""
+Tenant authentication, access control and per-tenant limits.
+
+When PORTFOLIO_API_TOKENS is set, every SSE connection must present one of
+its tokens, as `Authorization: Bearer <token>` or a `?token=` query
+parameter. The token names the tenant the session acts for:
+
+    PORTFOLIO_API_TOKENS="s3cr3t-a:alice,s3cr3t-b:bob,ops-key:*"
+
+A tenant may only read and change its own portfolio (the `user_id` of every
+tool and resource must be the tenant), while `*` marks an admin token that
+may act for any user and use the tools that span users (bulk import and
+export) and the metrics. Each tenant additionally gets:
+
+- at most TENANT_CONCURRENCY tool calls running at once; further calls wait
+  for a slot, so one tenant cannot occupy the whole server
+- an upstream API budget of TENANT_UPSTREAM_QUOTA calls per
+  TENANT_QUOTA_WINDOW seconds, refilled continuously; calls beyond it fail
+  with QuotaExceededError from the HTTP helper (and fall back to cached
+  data where there is any), so one tenant cannot spend the shared provider
+  quota
+
+Sessions without a tenant (stdio, or SSE without tokens configured) are
+not restricted.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import inspect
+import functools
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from portfolio_server.metrics import (
+    TENANT_ACTIVE_CALLS,
+    TENANT_QUEUED_CALLS,
+    TENANT_TOOL_CALLS,
+    TENANT_TOOL_SECONDS,
+    TENANT_UPSTREAM_CALLS,
+)
+
+# Tenant name of tokens that may act for every user
+ADMIN_TENANT = "*"
+
+# Tool calls a tenant may run at the same time
+TENANT_CONCURRENCY = int(os.environ.get("PORTFOLIO_TENANT_CONCURRENCY", "4"))
+
+# Upstream API calls a tenant may make per quota window
+TENANT_UPSTREAM_QUOTA = float(os.environ.get("PORTFOLIO_TENANT_UPSTREAM_QUOTA", "120"))
+TENANT_QUOTA_WINDOW = float(os.environ.get("PORTFOLIO_TENANT_QUOTA_WINDOW", "60"))
+
+# Tenant of the session handling the current request, or None when unauthenticated
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def parse_tokens(spec: str) -> Dict[str, str]:
+    """
+    Parse a token list of the form "token:tenant,token:tenant"
+
+    Args:
+        spec: Comma-separated token:tenant pairs
+
+    Returns:
+        Tenant per SHA-256 digest of its token
+    """
+    tokens = {}
+    for pair in spec.split(","):
+        token, separator, tenant = pair.strip().rpartition(":")
+        if not separator or not token or not tenant.strip():
+            if pair.strip():
+                raise ValueError("PORTFOLIO_API_TOKENS entries must look like token:tenant")
+            continue
+        tokens[_digest(token)] = tenant.strip()
+    return tokens
+
+_tokens = parse_tokens(os.environ.get("PORTFOLIO_API_TOKENS", ""))
+
+def auth_enabled() -> bool:
+    """Check whether connections must authenticate."""
+    return bool(_tokens)
+
+def set_tokens(spec: str) -> None:
+    """Replace the configured tokens, e.g. "token:tenant,token:*"; an empty string disables authentication."""
+    global _tokens
+    _tokens = parse_tokens(spec)
+
+def authenticate(token: Optional[str]) -> Optional[str]:
+    """Get the tenant a token belongs to, or None if it is missing or unknown."""
+    if not token:
+        return None
+    return _tokens.get(_digest(token))
+
+def check_user(user_id: Optional[str], admin_only: bool = False) -> None:
+    """
+    Check that the current tenant may act for a user
+
+    Args:
+        user_id: User the request reads or changes, or None if it names no user
+        admin_only: Whether the request is reserved for admin tokens
+
+    Raises:
+        PermissionError: When the tenant may not act for the user
+    """
+    tenant = current_tenant.get()
+    if tenant is None or tenant == ADMIN_TENANT:
+        return
+    if admin_only:
+        raise PermissionError(f"Tenant '{tenant}' is not allowed to use this operation")
+    if user_id is not None and user_id != tenant:
+        raise PermissionError(f"Tenant '{tenant}' may only access its own portfolio")
+
+class TenantLimits:
+    """
+    Concurrency slots and upstream call budgets of every tenant.
+
+    Args:
+        concurrency: Tool calls each tenant may run at once
+        upstream_calls: Upstream calls each tenant may make per window
+        window: Seconds over which the upstream budget refills completely
+    """
+    def __init__(self, concurrency: int = TENANT_CONCURRENCY,
+                 upstream_calls: float = TENANT_UPSTREAM_QUOTA, window: float = TENANT_QUOTA_WINDOW):
+        self.concurrency = concurrency
+        self.upstream_calls = upstream_calls
+        self.window = window
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        # tenant -> (remaining calls, time of the last refill)
+        self._budgets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str) -> AsyncIterator[None]:
+        """Hold one of the tenant's concurrency slots, waiting for one if all are taken."""
+        semaphore = self._slots.get(tenant)
+        if semaphore is None:
+            semaphore = self._slots[tenant] = asyncio.Semaphore(self.concurrency)
+        if semaphore.locked():
+            TENANT_QUEUED_CALLS.inc(tenant=tenant)
+        async with semaphore:
+            TENANT_ACTIVE_CALLS.inc(tenant=tenant)
+            try:
+                yield
+            finally:
+                TENANT_ACTIVE_CALLS.dec(tenant=tenant)
+
+    def charge_upstream(self, tenant: str) -> Optional[float]:
+        """
+        Take one call from the tenant's upstream budget
+
+        Returns:
+            None if the call was charged, or the seconds until the budget
+            allows another call if it is used up
+        """
+        now = time.monotonic()
+        with self._lock:
+            budget = self._budgets.setdefault(tenant, [self.upstream_calls, now])
+            budget[0] = min(self.upstream_calls, budget[0] + (now - budget[1]) * self.upstream_calls / self.window)
+            budget[1] = now
+            if budget[0] < 1:
+                TENANT_UPSTREAM_CALLS.inc(tenant=tenant, status="rejected")
+                return (1 - budget[0]) * self.window / self.upstream_calls
+            budget[0] -= 1
+        TENANT_UPSTREAM_CALLS.inc(tenant=tenant, status="ok")
+        return None
+
+    def remaining(self, tenant: str) -> float:
+        """Get the upstream calls a tenant may still make now."""
+        with self._lock:
+            budget = self._budgets.get(tenant)
+            if budget is None:
+                return self.upstream_calls
+            return min(self.upstream_calls,
+                       budget[0] + (time.monotonic() - budget[1]) * self.upstream_calls / self.window)
+
+limits = TenantLimits()
+
+def charge_upstream() -> Optional[float]:
+    """
+    Charge one upstream call to the current tenant, if there is one
+
+    Returns:
+        None if the call may be made, or the seconds until the tenant's budget allows another call
+    """
+    tenant = current_tenant.get()
+    if tenant is None or tenant == ADMIN_TENANT:
+        return None
+    return limits.charge_upstream(tenant)
+
+@asynccontextmanager
+async def acting_for(user_id: Optional[str]) -> AsyncIterator[None]:
+    """
+    Run background work on behalf of a user, so that its upstream calls are
+    charged to that user's tenant rather than to whichever session started it
+
+    Args:
+        user_id: User the work is done for, or None to charge no tenant
+    """
+    # A tenant's name is the user it may act for; without authentication nobody is charged
+    token = current_tenant.set(user_id if auth_enabled() else None)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+def _record(tenant: str, started: float, status: str) -> None:
+    TENANT_TOOL_CALLS.inc(tenant=tenant, status=status)
+    TENANT_TOOL_SECONDS.inc(time.perf_counter() - started, tenant=tenant)
+
+def tenant_scoped(fn: Callable, admin_only: bool = False) -> Callable:
+    """
+    Wrap a tool or resource function to enforce the current tenant's access and limits.
+
+    The `user_id` argument, if the function has one, must belong to the
+    tenant. Async functions also run in one of the tenant's concurrency
+    slots. Calls are counted and timed per tenant. Without a tenant the
+    function runs unchanged. The wrapper keeps the function's signature.
+
+    Args:
+        fn: Tool or resource function
+        admin_only: Whether only admin tokens may call it
+    """
+    signature = inspect.signature(fn)
+
+    def authorize(args: tuple, kwargs: Dict[str, Any]) -> None:
+        user_id = signature.bind_partial(*args, **kwargs).arguments.get("user_id")
+        check_user(user_id, admin_only)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            tenant = current_tenant.get()
+            if tenant is None:
+                return await fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                authorize(args, kwargs)
+            except PermissionError:
+                _record(tenant, started, "denied")
+                raise
+            async with limits.slot(tenant):
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException:
+                    _record(tenant, started, "error")
+                    raise
+            _record(tenant, started, "ok")
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tenant = current_tenant.get()
+        if tenant is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            authorize(args, kwargs)
+            result = fn(*args, **kwargs)
+        except PermissionError:
+            _record(tenant, started, "denied")
+            raise
+        except BaseException:
+            _record(tenant, started, "error")
+            raise
+        _record(tenant, started, "ok")
+        return result
+    return wrapper
@@ -1,9 +1,5 @@
-"""MCP tools for portfolio management and analysis."""
+"""MCP tools for portfolio management and analysis.
 
-# Import all tools to make them available when importing this package
-from portfolio_server.tools import (
-    portfolio_tools,
-    stock_tools,
-    analysis_tools,
-    visualization_tools,
-)
+Tool modules are imported by the server when it registers them, so that a
+minimal server only loads the modules it uses.
+"""
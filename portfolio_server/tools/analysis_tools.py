@@ -1,11 +1,46 @@
 """
 Tools for analyzing portfolio data.
 """
-import json
-from typing import Dict
+import asyncio
+import secrets
+from functools import partial
+from typing import Any, Dict, Optional
 
+import numpy as np
+
+from portfolio_server.analytics.optimizer import (
+    OPTIMIZATION_METHODS,
+    WarmStartCache,
+    risk_contributions,
+    solve_mean_variance,
+    solve_min_variance,
+    solve_risk_parity,
+)
+from portfolio_server.analytics.simulation import (
+    MAX_PROJECTION_YEARS,
+    MAX_SIMULATION_PATHS,
+    MAX_SIMULATION_WORKERS,
+    SIMULATION_METHODS,
+    TRADING_DAYS_PER_MONTH,
+    monthly_returns_from_daily,
+    simulate_yearly_values,
+)
+from portfolio_server.data.market_data import (
+    convert_changes,
+    estimate_moments,
+    fetch_bond_data,
+    get_price_changes,
+    get_return_matrix,
+    portfolio_currencies,
+)
+from portfolio_server.data.memo import ResultMemo
 from portfolio_server.data.storage import load_portfolio
-from portfolio_server.tools.stock_tools import get_stock_prices
+
+# Previous optimizer solutions, used to warm-start re-solves for the same user
+_warm_starts = WarmStartCache()
+
+# Reports per user, reused while the portfolio and its prices are unchanged
+_reports = ResultMemo("portfolio_report")
 
 async def generate_portfolio_report(user_id: str) -> str:
     """
@@ -14,20 +49,27 @@ async def generate_portfolio_report(user_id: str) -> str:
     Args:
         user_id: Unique identifier for the user
     """
-    portfolio = load_portfolio(user_id)
-    
+    return await _reports.get_or_compute(user_id, _compute_report)
+
+async def _compute_report(portfolio: Dict[str, Any]) -> str:
+    """Build the portfolio report from the latest prices, in the portfolio's base currency."""
     if not portfolio["stocks"] and not portfolio["bonds"]:
         return "Portfolio is empty. Use update_portfolio tool to add investments."
     
-    # Get stock price data
+    # Get stock price changes and bond estimates, restated in the base currency
+    base, currencies = portfolio_currencies(portfolio)
     stock_symbols = list(portfolio["stocks"].keys())
-    price_data = json.loads(await get_stock_prices(stock_symbols))
+    price_data = await get_price_changes(stock_symbols, 7) if stock_symbols else {}
+    bond_data = await fetch_bond_data(list(portfolio["bonds"].keys()), 7) if portfolio["bonds"] else {}
+    await convert_changes(price_data, base, currencies)
+    await convert_changes(bond_data, base)
     
     # Create a report
     report = ["# Portfolio Analysis Report", ""]
     report.append(f"## Current Allocation")
     report.append(f"- **Stocks**: {sum(portfolio['stocks'].values())}%")
     report.append(f"- **Bonds**: {sum(portfolio['bonds'].values())}%")
+    report.append(f"- **Base currency**: {base} (all returns below are in {base})")
     report.append("")
     
     # Add performance section
@@ -40,17 +82,28 @@ async def generate_portfolio_report(user_id: str) -> str:
             if symbol in price_data and "percent_change" in price_data[symbol]:
                 change = price_data[symbol]["percent_change"]
                 contribution = (change * allocation) / 100
-                report.append(f"- **{symbol}** ({allocation}% of portfolio): {change}% change, contributing {contribution:.2f}% to portfolio")
+                fx = ""
+                if "fx_percent_change" in price_data[symbol]:
+                    fx = (f" ({price_data[symbol]['local_percent_change']}% in {price_data[symbol]['currency']}, "
+                          f"{price_data[symbol]['fx_percent_change']}% from exchange rates)")
+                report.append(f"- **{symbol}** ({allocation}% of portfolio): {change}% change{fx}, contributing {contribution:.2f}% to portfolio")
             else:
                 report.append(f"- **{symbol}** ({allocation}% of portfolio): No recent data available")
         report.append("")
     
-    # Bond performance (simplified as bonds have more complex data sources)
+    # Bond performance, estimated from cached treasury curves
     if portfolio["bonds"]:
         report.append("### Bonds")
-        report.append("Bond data typically changes less frequently than stocks.")
         for bond_id, allocation in portfolio["bonds"].items():
-            report.append(f"- **{bond_id}** ({allocation}% of portfolio)")
+            if bond_id in bond_data and "percent_change" in bond_data[bond_id]:
+                bond = bond_data[bond_id]
+                contribution = (bond["percent_change"] * allocation) / 100
+                fx = f", {bond['fx_percent_change']}% from exchange rates" if "fx_percent_change" in bond else ""
+                report.append(f"- **{bond_id}** ({allocation}% of portfolio): {bond['percent_change']}% estimated return "
+                              f"(yield {bond['yield']}%, {bond['yield_change_bp']:+} bp, duration {bond['modified_duration']}{fx}), "
+                              f"contributing {contribution:.2f}% to portfolio")
+            else:
+                report.append(f"- **{bond_id}** ({allocation}% of portfolio): No recent data available")
         report.append("")
     
     # Add overall portfolio performance calculation
@@ -61,9 +114,12 @@ async def generate_portfolio_report(user_id: str) -> str:
             change = price_data[symbol]["percent_change"]
             contribution = (change * allocation) / 100
             total_contribution += contribution
+    for bond_id, allocation in portfolio["bonds"].items():
+        if bond_id in bond_data and "percent_change" in bond_data[bond_id]:
+            total_contribution += (bond_data[bond_id]["percent_change"] * allocation) / 100
     
     report.append(f"## Overall Portfolio Performance")
-    report.append(f"The portfolio has changed approximately {total_contribution:.2f}% recently based on stock performance.")
+    report.append(f"The portfolio has changed approximately {total_contribution:.2f}% recently based on stock and bond performance.")
     
     return "\n".join(report)
 
@@ -124,3 +180,213 @@ async def get_investment_recommendations(user_id: str) -> str:
         recommendations.append("For more detailed recommendations, consider adding more information about your financial goals and risk tolerance.")
     
     return "\n".join(recommendations)
+
+async def rebalance_portfolio(user_id: str,
+                              method: str = "min_variance",
+                              max_position: float = 15.0,
+                              min_stock_allocation: float = 0.0,
+                              max_stock_allocation: float = 100.0,
+                              risk_aversion: float = 3.0,
+                              lookback_days: int = 90,
+                              portfolio_value: Optional[float] = None) -> str:
+    """
+    Compute optimized target weights for the stocks in a portfolio and the trades needed to reach them
+    
+    Args:
+        user_id: Unique identifier for the user
+        method: Optimization method: "mean_variance", "min_variance" or "risk_parity"
+        max_position: Maximum allocation percentage for any single stock (default: 15)
+        min_stock_allocation: Minimum total stock allocation percentage (default: 0)
+        max_stock_allocation: Maximum total stock allocation percentage (default: 100)
+        risk_aversion: Variance penalty used by the mean_variance method (default: 3)
+        lookback_days: Number of daily returns used to estimate risk and return (default: 90)
+        portfolio_value: Optional total portfolio value used to express trades in currency
+    """
+    if method not in OPTIMIZATION_METHODS:
+        return f"Unknown method '{method}'. Valid options are: {', '.join(OPTIMIZATION_METHODS)}"
+    if not (0 <= min_stock_allocation <= max_stock_allocation <= 100):
+        return "Stock allocation bounds must satisfy 0 <= min_stock_allocation <= max_stock_allocation <= 100."
+    
+    portfolio = load_portfolio(user_id)
+    
+    if not portfolio["stocks"]:
+        return "Portfolio has no stocks to optimize. Use update_portfolio tool to add investments."
+    
+    stock_allocation = sum(portfolio["stocks"].values())
+    bond_allocation = sum(portfolio["bonds"].values())
+    total_allocation = stock_allocation + bond_allocation
+    if total_allocation <= 0:
+        return "Portfolio allocations sum to zero. Use update_portfolio tool to set allocations first."
+    
+    # Size the stock sleeve from the current mix, clipped to the asset-class bounds
+    stock_target = min(max(stock_allocation / total_allocation * 100, min_stock_allocation), max_stock_allocation)
+    if bond_allocation <= 0:
+        if max_stock_allocation < 100:
+            return "Portfolio has no bonds, so the stock allocation cannot be limited below 100%."
+        stock_target = 100.0
+    
+    symbols, returns = await get_return_matrix(list(portfolio["stocks"].keys()), lookback_days)
+    if len(returns) < 2:
+        return "Not enough overlapping price history to estimate risk for the stocks in this portfolio."
+    
+    # Stocks without price data keep their current weight and are excluded from the solve
+    fixed = {symbol: allocation for symbol, allocation in portfolio["stocks"].items() if symbol not in symbols}
+    optimized_total = (stock_target - sum(fixed.values())) / 100
+    upper = max_position / 100
+    if optimized_total <= 0:
+        return "Stocks without price data already fill the target stock allocation; nothing to optimize."
+    if upper * len(symbols) < optimized_total:
+        return (f"A {max_position}% position limit cannot fill a {optimized_total * 100:.1f}% allocation "
+                f"across {len(symbols)} stocks. Raise max_position or lower the stock allocation.")
+    
+    mu, cov = estimate_moments(returns)
+    warm_key = (user_id, method)
+    w0 = _warm_starts.initial_weights(warm_key, symbols, optimized_total)
+    if method == "mean_variance":
+        weights, iterations = solve_mean_variance(mu, cov, risk_aversion, optimized_total, upper, w0)
+    elif method == "min_variance":
+        weights, iterations = solve_min_variance(cov, optimized_total, upper, w0)
+    else:
+        weights, iterations = solve_risk_parity(cov, optimized_total, upper, w0)
+    _warm_starts.store(warm_key, symbols, weights)
+    
+    targets = dict(zip(symbols, (weights * 100).tolist()))
+    targets.update(fixed)
+    # Bonds keep their relative weights and fill the remainder of the portfolio
+    for bond_id, allocation in portfolio["bonds"].items():
+        targets[bond_id] = (100 - stock_target) * allocation / bond_allocation
+    
+    sleeve_weights = weights / weights.sum()
+    expected_return = float(sleeve_weights @ mu) * 100
+    volatility = float(np.sqrt(sleeve_weights @ cov @ sleeve_weights)) * 100
+    contributions = dict(zip(symbols, (risk_contributions(weights, cov) * 100).tolist()))
+    
+    report = ["# Rebalancing Plan", ""]
+    report.append(f"- **Method**: {method} ({iterations} iterations, {len(returns)} days of returns)")
+    report.append(f"- **Target allocation**: {stock_target:.1f}% stocks, {100 - stock_target:.1f}% bonds")
+    report.append(f"- **Optimized stocks**: expected return {expected_return:.2f}%/yr, volatility {volatility:.2f}%/yr")
+    if fixed:
+        report.append(f"- **Held at current weight (no price data)**: {', '.join(fixed)}")
+    report.append("")
+    
+    report.append("## Trades")
+    header = "| Holding | Current % | Target % | Change % | Risk Share % |"
+    divider = "|---|---|---|---|---|"
+    if portfolio_value:
+        header += " Trade Amount |"
+        divider += "---|"
+    report.append(header)
+    report.append(divider)
+    current = {**portfolio["stocks"], **portfolio["bonds"]}
+    for holding, target in targets.items():
+        change = target - current[holding]
+        risk_share = f"{contributions[holding]:.1f}" if holding in contributions else "-"
+        row = f"| {holding} | {current[holding]:.2f} | {target:.2f} | {change:+.2f} | {risk_share} |"
+        if portfolio_value:
+            row += f" {change / 100 * portfolio_value:+,.2f} |"
+        report.append(row)
+    
+    return "\n".join(report)
+
+async def project_portfolio_goal(user_id: str,
+                                 initial_value: float,
+                                 goal_value: float,
+                                 years: int = 10,
+                                 monthly_contribution: float = 0.0,
+                                 method: str = "bootstrap",
+                                 n_paths: int = 20000,
+                                 bond_annual_return: float = 4.0,
+                                 annual_return: Optional[float] = None,
+                                 annual_volatility: Optional[float] = None,
+                                 lookback_days: int = 100,
+                                 seed: Optional[int] = None,
+                                 workers: int = 1) -> str:
+    """
+    Project the portfolio's future value with a Monte Carlo simulation and estimate the chance of reaching a goal
+    
+    Args:
+        user_id: Unique identifier for the user
+        initial_value: Current total value of the portfolio
+        goal_value: Target portfolio value at the end of the horizon
+        years: Projection horizon in years (default: 10)
+        monthly_contribution: Amount added to the portfolio every month (default: 0)
+        method: "bootstrap" to resample historical monthly returns, or "parametric" for log-normal returns
+        n_paths: Number of simulated paths (default: 20000, at most PORTFOLIO_MAX_SIMULATION_PATHS)
+        bond_annual_return: Assumed annual return percentage of the bond allocation (default: 4)
+        annual_return: Optional expected annual stock return percentage overriding history (parametric only)
+        annual_volatility: Optional annual stock volatility percentage overriding history (parametric only)
+        lookback_days: Number of daily returns of history to use (default: 100)
+        seed: Optional random seed; runs with the same seed and inputs are reproducible
+        workers: Number of processes to spread the simulation across
+            (default: 1, at most PORTFOLIO_MAX_SIMULATION_WORKERS)
+    """
+    if method not in SIMULATION_METHODS:
+        return f"Unknown method '{method}'. Valid options are: {', '.join(SIMULATION_METHODS)}"
+    if years < 1 or n_paths < 1:
+        return "years and n_paths must both be at least 1."
+    if years > MAX_PROJECTION_YEARS:
+        return f"years must be at most {MAX_PROJECTION_YEARS}."
+    n_paths = min(n_paths, MAX_SIMULATION_PATHS)
+    workers = max(1, min(workers, MAX_SIMULATION_WORKERS))
+    
+    portfolio = load_portfolio(user_id)
+    stock_allocation = sum(portfolio["stocks"].values())
+    bond_allocation = sum(portfolio["bonds"].values())
+    
+    if stock_allocation + bond_allocation <= 0:
+        return "Portfolio is empty. Use update_portfolio tool to add investments first."
+    
+    risky_weight = stock_allocation / (stock_allocation + bond_allocation)
+    fixed_return = (1 + bond_annual_return / 100) ** (1 / 12) - 1
+    
+    sample = None
+    mu = sigma = 0.0
+    history_note = "no stock allocation"
+    if risky_weight > 0:
+        symbols, returns = await get_return_matrix(list(portfolio["stocks"].keys()), lookback_days)
+        if len(returns) < 2 and (method == "bootstrap" or annual_return is None or annual_volatility is None):
+            return "Not enough price history for the stocks in this portfolio to run a projection."
+        if len(returns) >= 2:
+            # Weight the stocks that have history by their current allocations
+            weights = np.array([portfolio["stocks"][symbol] for symbol in symbols])
+            sleeve_returns = returns @ (weights / weights.sum())
+            sample = monthly_returns_from_daily(sleeve_returns)
+            log_returns = np.log1p(sleeve_returns)
+            mu = float(log_returns.mean()) * TRADING_DAYS_PER_MONTH
+            sigma = float(log_returns.std(ddof=1)) * np.sqrt(TRADING_DAYS_PER_MONTH)
+            history_note = f"{len(returns)} days of history for {len(symbols)} stocks"
+        if annual_return is not None:
+            mu = np.log1p(annual_return / 100) / 12
+        if annual_volatility is not None:
+            sigma = annual_volatility / 100 / np.sqrt(12)
+    
+    if seed is None:
+        seed = secrets.randbits(32)
+    
+    # Keep the event loop responsive while the paths are simulated
+    simulate = partial(simulate_yearly_values, initial_value, years, n_paths, method,
+                       monthly_contribution=monthly_contribution, sample=sample, mu=mu, sigma=sigma,
+                       fixed_return=fixed_return, risky_weight=risky_weight, seed=seed, workers=workers)
+    yearly = await asyncio.get_running_loop().run_in_executor(None, simulate)
+    
+    final_values = yearly[-1]
+    probability = float(np.mean(final_values >= goal_value)) * 100
+    percentiles = (5, 25, 50, 75, 95)
+    
+    report = ["# Portfolio Goal Projection", ""]
+    report.append(f"- **Method**: {method} ({n_paths:,} paths, seed {seed})")
+    report.append(f"- **Inputs**: {history_note}; {risky_weight * 100:.1f}% stocks, "
+                  f"bonds assumed to return {bond_annual_return}%/yr")
+    report.append(f"- **Contributions**: {monthly_contribution:,.2f} per month over {years} years")
+    report.append(f"- **Probability of reaching {goal_value:,.2f}**: {probability:.1f}%")
+    report.append("")
+    
+    report.append("## Projected Value by Percentile")
+    report.append("| Year | " + " | ".join(f"P{p}" for p in percentiles) + " |")
+    report.append("|---|" + "---|" * len(percentiles))
+    milestones = sorted({1, *range(5, years + 1, 5), years})
+    table = np.percentile(yearly[[year - 1 for year in milestones]], percentiles, axis=1)
+    for column, year in enumerate(milestones):
+        report.append(f"| {year} | " + " | ".join(f"{value:,.0f}" for value in table[:, column]) + " |")
+    
+    return "\n".join(report)
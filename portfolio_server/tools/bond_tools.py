@@ -0,0 +1,18 @@
+"""
+Tools for retrieving bond yields and risk measures.
+"""
+import json
+from typing import List
+
+from portfolio_server.data.market_data import fetch_bond_data
+
+async def get_bond_data(bond_ids: List[str], days: int = 7) -> str:
+    """
+    Get yields, duration, convexity and estimated recent returns for bonds
+
+    Args:
+        bond_ids: List of bond identifiers such as US10Y, US3M, CORP_AAA or CORP_BBB_5Y
+        days: Number of days of yield history to measure changes over (default: 7)
+    """
+    result = await fetch_bond_data(bond_ids, days)
+    return json.dumps(result, indent=2)
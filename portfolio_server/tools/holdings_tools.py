@@ -0,0 +1,185 @@
+"""
+Tools for position-level holdings and their valuation.
+"""
+import math
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from portfolio_server.data.holdings import Holdings, value_holdings
+from portfolio_server.data.live import get_live_portfolio
+from portfolio_server.data.market_data import get_latest_prices, portfolio_currencies
+from portfolio_server.data.storage import load_portfolio, save_portfolio
+
+def _parse_lots(lots: List[Dict[str, Any]]) -> tuple:
+    """Split lot dictionaries into parallel columns, raising ValueError for invalid lots."""
+    symbols, quantity, cost_basis = [], [], []
+    for i, lot in enumerate(lots, start=1):
+        symbol = str(lot.get("symbol") or "").strip().upper()
+        if not symbol:
+            raise ValueError(f"Lot {i} has no symbol")
+        try:
+            units = float(lot["quantity"])
+            if "cost_basis" in lot:
+                cost = float(lot["cost_basis"])
+            else:
+                cost = float(lot.get("unit_cost", 0.0)) * units
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Lot {i} ({symbol}) needs a numeric quantity and cost_basis or unit_cost")
+        if not math.isfinite(units) or units <= 0:
+            raise ValueError(f"Lot {i} ({symbol}) must have a positive quantity")
+        if not math.isfinite(cost) or cost < 0:
+            raise ValueError(f"Lot {i} ({symbol}) must have a non-negative cost")
+        symbols.append(symbol)
+        quantity.append(units)
+        cost_basis.append(cost)
+    return symbols, quantity, cost_basis
+
+def update_holdings(user_id: str,
+                    lots: Optional[List[Dict[str, Any]]] = None,
+                    targets: Optional[Dict[str, float]] = None,
+                    remove_symbols: Optional[List[str]] = None) -> str:
+    """
+    Add position lots, set target weights or remove positions in a user's holdings
+
+    Args:
+        user_id: Unique identifier for the user
+        lots: Lots to add, each {"symbol": "AAPL", "quantity": 10, "cost_basis": 1500}
+              (total amount paid) or with "unit_cost" (price paid per unit) instead of cost_basis
+        targets: Target weight percentage per symbol, e.g. {"AAPL": 30}; 0 clears a target
+        remove_symbols: Symbols whose lots and targets are removed entirely
+    """
+    portfolio = load_portfolio(user_id)
+    holdings = Holdings.from_dict(portfolio.get("holdings"))
+
+    try:
+        new_lots = _parse_lots(lots or [])
+    except ValueError as e:
+        return f"Error: {e}"
+
+    for symbol, weight in (targets or {}).items():
+        if not 0 <= weight <= 100:
+            return f"Error: Target weight for {symbol} must be between 0 and 100"
+
+    removed = holdings.remove_symbols([symbol.upper() for symbol in remove_symbols]) if remove_symbols else 0
+    holdings.add_lots(*new_lots)
+    for symbol, weight in (targets or {}).items():
+        if weight:
+            holdings.targets[symbol.upper()] = float(weight)
+        else:
+            holdings.targets.pop(symbol.upper(), None)
+    holdings.compact()
+
+    total_target = sum(holdings.targets.values())
+    if total_target > 100.5:
+        return f"Error: Target weights total {total_target:.1f}%, which exceeds 100%"
+
+    portfolio["holdings"] = holdings.to_dict()
+    save_portfolio(user_id, portfolio)
+
+    summary = f"Holdings updated for user {user_id}: added {len(new_lots[0])} lots"
+    if removed:
+        summary += f", removed {removed} lots"
+    return summary + f". Now {len(holdings)} lots in {len(holdings.symbols)} symbols, " \
+                     f"targets total {total_target:.1f}%."
+
+def _quantity(value: float) -> str:
+    return f"{value:,.4f}".rstrip("0").rstrip(".")
+
+def _money(value: float, currency: str = "USD") -> str:
+    if math.isnan(value):
+        return "n/a"
+    if currency != "USD":
+        return f"{value:,.2f} {currency}"
+    return f"-${-value:,.2f}" if value < 0 else f"${value:,.2f}"
+
+def _percent(value: float) -> str:
+    return "n/a" if math.isnan(value) else f"{value:.2f}%"
+
+async def get_portfolio_valuation(user_id: str) -> str:
+    """
+    Value a user's holdings at the latest prices, with unrealized P&L and drift from target weights
+
+    Prices are converted into the portfolio's base currency, which cost
+    basis amounts are taken to be recorded in.
+
+    Args:
+        user_id: Unique identifier for the user
+    """
+    portfolio = load_portfolio(user_id)
+    holdings = Holdings.from_dict(portfolio.get("holdings"))
+
+    if not len(holdings) and not holdings.targets:
+        return "No holdings recorded. Use update_holdings tool to add position lots."
+
+    base, currencies = portfolio_currencies(portfolio)
+    prices = await get_latest_prices(holdings.all_symbols(), base=base, currencies=currencies)
+    valuation = value_holdings(holdings, prices)
+    totals = valuation["totals"]
+    money = partial(_money, currency=base)
+
+    report = ["# Portfolio Valuation", ""]
+    report.append(f"**Market value**: {money(totals['market_value'])}")
+    report.append(f"**Cost basis**: {money(totals['cost_basis'])}")
+    pnl_percent = totals["unrealized_pnl"] / totals["cost_basis"] * 100 if totals["cost_basis"] else float("nan")
+    report.append(f"**Unrealized P&L**: {money(totals['unrealized_pnl'])} ({_percent(pnl_percent)})")
+    if any(currency != base for currency in currencies.values()):
+        report.append(f"**Base currency**: {base}; prices in other currencies are converted at the latest daily exchange rate")
+    report.append("")
+
+    report.append("| Symbol | Lots | Quantity | Price | Market Value | Unrealized P&L | Weight | Target | Drift |")
+    report.append("|--------|------|----------|-------|--------------|----------------|--------|--------|-------|")
+    # Largest positions first, unpriced ones last
+    order = np.argsort(-np.nan_to_num(valuation["market_value"], nan=-np.inf), kind="stable")
+    for i in order:
+        report.append(
+            f"| {valuation['symbols'][i]} | {valuation['lots'][i]} | {_quantity(valuation['quantity'][i])} "
+            f"| {money(valuation['price'][i])} | {money(valuation['market_value'][i])} "
+            f"| {money(valuation['unrealized_pnl'][i])} | {_percent(valuation['weight'][i])} "
+            f"| {valuation['target'][i]:.2f}% | {valuation['drift'][i]:+.2f}% |"
+        )
+
+    missing = [symbol for symbol in valuation["symbols"] if symbol not in prices]
+    if missing:
+        report.append("")
+        report.append(f"No price data or exchange rate for: {', '.join(missing)}. These positions are excluded from totals.")
+
+    return "\n".join(report)
+
+async def get_live_pnl(user_id: str) -> str:
+    """
+    Get a portfolio's live market value and today's P&L from real-time quotes
+
+    Args:
+        user_id: Unique identifier for the user
+    """
+    live = await get_live_portfolio(user_id)
+    if not live.symbols:
+        return "No stocks or holdings in portfolio to value."
+    summary = live.summary()
+    money = partial(_money, currency=summary["base_currency"])
+
+    report = ["# Live Portfolio P&L", ""]
+    report.append(f"**As of**: {summary['updated_at'] or 'n/a'}")
+    report.append(f"**Market value**: {money(summary['market_value'])}")
+    report.append(f"**Unrealized P&L**: {money(summary['unrealized_pnl'])}")
+    report.append(f"**Today's P&L**: {money(summary['day_pnl'])}")
+    report.append(f"**Today's change (allocation-weighted)**: {summary['day_change_percent']:+.2f}%")
+    report.append("")
+
+    report.append("| Symbol | Quantity | Allocation | Price | Change | Market Value | Today's P&L |")
+    report.append("|--------|----------|------------|-------|--------|--------------|-------------|")
+    for symbol, row in summary["symbols"].items():
+        change = row.get("change_percent")
+        report.append(
+            f"| {symbol} | {_quantity(row['quantity'])} | {row['allocation']:.2f}% "
+            f"| {money(row.get('price', float('nan')))} | {'n/a' if change is None else f'{change:+.2f}%'} "
+            f"| {money(row.get('market_value', float('nan')))} | {money(row.get('day_pnl', float('nan')))} |"
+        )
+
+    if summary["unpriced"]:
+        report.append("")
+        report.append(f"No quote or exchange rate for: {', '.join(summary['unpriced'])}. These symbols are excluded from totals.")
+
+    return "\n".join(report)
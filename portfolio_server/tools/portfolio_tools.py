@@ -1,18 +1,67 @@
-from typing import Dict, List, Optional
+import os
+import json
+import asyncio
+from collections import deque
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from mcp.server.fastmcp import Context
-from portfolio_server.data.storage import load_portfolio, save_portfolio
+from portfolio_server.data import history
+from portfolio_server.data.bulk import (
+    allocation_error,
+    check_user_ids,
+    read_allocations,
+    transfer_path,
+    write_allocations,
+)
+from portfolio_server.data.currency import normalize_currency
+from portfolio_server.data.storage import (
+    get_portfolio_path,
+    list_portfolio_users,
+    load_portfolio,
+    save_portfolio,
+    save_portfolios,
+)
+
+IMPORT_MODES = ("replace", "merge")
+
+# Rejected users listed by name in an import summary
+MAX_REPORTED_ERRORS = 20
 
 def update_portfolio(user_id: str,
                      stocks: Optional[Dict[str, float]] = None,
                      bonds: Optional[Dict[str, float]] = None,
+                     base_currency: Optional[str] = None,
+                     currencies: Optional[Dict[str, str]] = None,
                      ctx: Context = None) -> str:
+    """
+    Create or update a user's portfolio allocation
     
+    Args:
+        user_id: Unique identifier for the user
+        stocks: Allocation percentage per stock symbol
+        bonds: Allocation percentage per bond identifier
+        base_currency: Currency returns and valuations are reported in, e.g. EUR
+        currencies: Listing currency per stock symbol, for symbols whose
+            currency is not implied by their exchange suffix (e.g. {"SAP": "EUR"})
+    """
     portfolio = load_portfolio(user_id)
 
+    try:
+        if base_currency:
+            base_currency = normalize_currency(base_currency)
+        currencies = {symbol: normalize_currency(code) for symbol, code in (currencies or {}).items()}
+    except ValueError as e:
+        return f"Error: {e}"
+
     if stocks:
         portfolio["stocks"].update(stocks)
     if bonds:
         portfolio["bonds"].update(bonds)
+    if base_currency:
+        portfolio["base_currency"] = base_currency
+    if currencies:
+        portfolio.setdefault("currencies", {}).update(currencies)
     
     # validate accuracy of the portfolio
     total_percent = sum(portfolio["stocks"].values()) + sum(portfolio["bonds"].values())
@@ -51,3 +100,245 @@ def remove_investment(user_id: str,
     else:
         return "No matching investments are found for removal."
 
+def view_portfolio(user_id: str) -> str:
+    """
+    View a user's current portfolio allocation
+    
+    Args:
+        user_id: Unique identifier for the user
+    """
+    portfolio = load_portfolio(user_id)
+    
+    if not portfolio["stocks"] and not portfolio["bonds"]:
+        return "Portfolio is empty. Use update_portfolio tool to add investments."
+    
+    result = ["# Current Portfolio Allocation", ""]
+    
+    if portfolio["stocks"]:
+        result.append("## Stocks")
+        for symbol, allocation in portfolio["stocks"].items():
+            result.append(f"- {symbol}: {allocation}%")
+        result.append("")
+    
+    if portfolio["bonds"]:
+        result.append("## Bonds")
+        for bond_id, allocation in portfolio["bonds"].items():
+            result.append(f"- {bond_id}: {allocation}%")
+        result.append("")
+    
+    stock_allocation = sum(portfolio["stocks"].values())
+    bond_allocation = sum(portfolio["bonds"].values())
+    
+    result.append("## Summary")
+    result.append(f"- Total stock allocation: {stock_allocation}%")
+    result.append(f"- Total bond allocation: {bond_allocation}%")
+    result.append(f"- Total allocation: {stock_allocation + bond_allocation}%")
+    if portfolio.get("base_currency"):
+        result.append(f"- Base currency: {portfolio['base_currency']}")
+    
+    return "\n".join(result)
+
+
+def _import_portfolios(path: str, format: Optional[str], mode: str, dry_run: bool) -> str:
+    users, errors, rows = read_allocations(path, format, MAX_REPORTED_ERRORS)
+
+    portfolios = {}
+    for user_id, allocations in users.items():
+        # Bulk files only carry allocations; holdings and currency settings are kept in both modes
+        portfolio = load_portfolio(user_id)
+        if mode == "merge":
+            portfolio["stocks"].update(allocations["stocks"])
+            portfolio["bonds"].update(allocations["bonds"])
+        else:
+            portfolio["stocks"] = allocations["stocks"]
+            portfolio["bonds"] = allocations["bonds"]
+        error = allocation_error(portfolio)
+        if error is not None:
+            errors[user_id] = error if len(errors) < MAX_REPORTED_ERRORS else ""
+            continue
+        portfolios[user_id] = portfolio
+
+    if not dry_run:
+        save_portfolios(portfolios)
+
+    verb = "Validated" if dry_run else "Imported"
+    lines = [f"{verb} {len(portfolios):,} portfolios from {path} ({rows:,} rows, {mode} mode)."]
+    if dry_run:
+        lines.append("Dry run: no portfolios were saved.")
+    if errors:
+        lines.append(f"Rejected {len(errors):,} users:")
+        reported = [(user_id, message) for user_id, message in errors.items() if message]
+        lines.extend(f"- {user_id}: {message}" for user_id, message in reported)
+        if len(errors) > len(reported):
+            lines.append(f"- ... and {len(errors) - len(reported):,} more")
+    return "\n".join(lines)
+
+async def import_portfolios(path: str,
+                            format: Optional[str] = None,
+                            mode: str = "replace",
+                            dry_run: bool = False) -> str:
+    """
+    Import many users' portfolios from a CSV or JSON Lines file
+    
+    CSV files need user_id, asset_type (stock or bond), symbol and allocation
+    columns with one row per investment. JSON Lines files hold one
+    {"user_id", "stocks", "bonds"} object per line. Users whose rows are
+    invalid or whose allocations do not total about 100% are skipped; all
+    other portfolios are saved in one batch. Only allocations are imported:
+    existing holdings and currency settings are kept.
+    
+    Args:
+        path: Name of the file in the server's transfer directory
+            (.csv or .jsonl, optionally .gz compressed)
+        format: "csv" or "jsonl"; detected from the file extension when omitted
+        mode: "replace" to overwrite existing allocations, "merge" to update them like update_portfolio
+        dry_run: Validate the file without saving anything
+        
+    Returns:
+        Summary of imported and rejected portfolios
+    """
+    if mode not in IMPORT_MODES:
+        return f"Invalid mode '{mode}'. Use one of: {', '.join(IMPORT_MODES)}"
+    
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(_import_portfolios, transfer_path(path), format, mode, dry_run))
+    except (OSError, ValueError) as e:
+        return f"Import failed: {e}"
+
+def _saved_portfolios(user_ids: Optional[List[str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for user_id in user_ids if user_ids is not None else list_portfolio_users():
+        if not os.path.exists(get_portfolio_path(user_id)):
+            continue
+        try:
+            yield user_id, load_portfolio(user_id)
+        except (OSError, json.JSONDecodeError):
+            # A damaged file should not abort the whole export
+            continue
+
+async def export_portfolios(path: str,
+                            format: Optional[str] = None,
+                            user_ids: Optional[List[str]] = None) -> str:
+    """
+    Export saved portfolios to a CSV or JSON Lines file
+    
+    Portfolios are written one at a time as they are read, in the same
+    layout import_portfolios accepts. Only allocations are exported, and
+    importing them back keeps the holdings and currency settings saved on
+    this server.
+    
+    Args:
+        path: Name of the file to write in the server's transfer directory
+            (.csv or .jsonl, optionally .gz compressed)
+        format: "csv" or "jsonl"; detected from the file extension when omitted
+        user_ids: Users to export (default: every saved portfolio)
+        
+    Returns:
+        Number of portfolios exported
+    """
+    try:
+        path = transfer_path(path)
+        if user_ids is not None:
+            user_ids = check_user_ids(user_ids)
+        count = await asyncio.get_running_loop().run_in_executor(
+            None, partial(write_allocations, path, _saved_portfolios(user_ids), format))
+    except (OSError, ValueError) as e:
+        return f"Export failed: {e}"
+    
+    return f"Exported {count:,} portfolios to {path}."
+
+# Changes listed when a history query gives no time range
+DEFAULT_HISTORY_ENTRIES = 20
+
+def _parse_history_time(value: str, end_of_day: bool = False) -> datetime:
+    """Parse an ISO date or datetime, reading a bare date as the start or end of that day."""
+    value = value.strip()
+    # A trailing Z for UTC is only understood by fromisoformat from Python 3.11
+    parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith(("Z", "z")) else value)
+    if end_of_day and len(value.strip()) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed
+
+def _describe_change(previous: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Summarize how allocations and holdings changed between two snapshots."""
+    if not previous:
+        return "Initial snapshot"
+    parts = []
+    for section in ("stocks", "bonds"):
+        before, after = previous.get(section, {}), current.get(section, {})
+        for symbol in sorted(set(before) | set(after)):
+            if symbol not in before:
+                parts.append(f"+{symbol} {after[symbol]:g}%")
+            elif symbol not in after:
+                parts.append(f"-{symbol}")
+            elif before[symbol] != after[symbol]:
+                parts.append(f"{symbol} {before[symbol]:g}% → {after[symbol]:g}%")
+    lots_before = len(previous.get("holdings", {}).get("lots", {}).get("quantity", []))
+    lots_after = len(current.get("holdings", {}).get("lots", {}).get("quantity", []))
+    if lots_before != lots_after:
+        parts.append(f"holdings {lots_before} → {lots_after} lots")
+    if previous.get("holdings", {}).get("targets") != current.get("holdings", {}).get("targets"):
+        parts.append("targets updated")
+    return ", ".join(parts) or "Other changes"
+
+def _format_allocations(portfolio: Dict[str, Any]) -> List[str]:
+    lines = []
+    for section, title in (("stocks", "Stocks"), ("bonds", "Bonds")):
+        allocations = portfolio.get(section, {})
+        if allocations:
+            lines.append(f"**{title}**: " + ", ".join(f"{symbol} {value:g}%" for symbol, value in allocations.items()))
+    lots = portfolio.get("holdings", {}).get("lots", {}).get("quantity", [])
+    if lots:
+        lines.append(f"**Holdings**: {len(lots)} lots in {len(portfolio['holdings'].get('symbols', []))} symbols")
+    return lines or ["Portfolio was empty."]
+
+def get_portfolio_history(user_id: str,
+                          as_of: Optional[str] = None,
+                          start: Optional[str] = None,
+                          end: Optional[str] = None) -> str:
+    """
+    Show a user's portfolio as it was at a point in time, or the changes made over a time range
+    
+    Args:
+        user_id: Unique identifier for the user
+        as_of: ISO date or datetime to reconstruct the portfolio at, e.g. "2025-03-31"
+        start: ISO date or datetime of the earliest change to list
+        end: ISO date or datetime of the latest change to list
+        
+    Returns:
+        The reconstructed portfolio, or a table of changes (the most recent ones when no range is given)
+    """
+    try:
+        as_of_time = _parse_history_time(as_of, end_of_day=True) if as_of else None
+        start_time = _parse_history_time(start) if start else None
+        end_time = _parse_history_time(end, end_of_day=True) if end else None
+    except ValueError as e:
+        return f"Invalid date: {e}. Use ISO format such as 2025-03-31 or 2025-03-31T16:00:00."
+    
+    if not history.HistoryLog(user_id).exists():
+        return f"No portfolio history recorded for user {user_id}."
+    
+    if as_of_time is not None:
+        found = history.snapshot_at(user_id, as_of_time)
+        if found is None:
+            return f"User {user_id} had no portfolio as of {as_of}."
+        recorded_at, portfolio = found
+        return "\n".join([f"# Portfolio of {user_id} as of {as_of}", "",
+                          f"Last changed at {recorded_at}.", ""] + _format_allocations(portfolio))
+    
+    entries = history.snapshots_between(user_id, start_time, end_time)
+    title = f"# Portfolio changes for {user_id}"
+    if start_time is None and end_time is None:
+        # Keep only the most recent changes while streaming through the log
+        changes = deque(entries, maxlen=DEFAULT_HISTORY_ENTRIES + 1)
+        if len(changes) > DEFAULT_HISTORY_ENTRIES:
+            changes.popleft()
+            title += f" (last {DEFAULT_HISTORY_ENTRIES})"
+    else:
+        changes = list(entries)
+    if not changes:
+        return f"No portfolio changes for user {user_id} in the requested range."
+    
+    lines = [title, "", "| Time | Change |", "|------|--------|"]
+    lines.extend(f"| {t} | {_describe_change(previous, current)} |" for t, previous, current in changes)
+    return "\n".join(lines)
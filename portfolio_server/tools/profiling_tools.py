@@ -0,0 +1,142 @@
+"""
+Tools for inspecting stored tool call profiles and event loop stalls.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+
+from portfolio_server import profiling, watchdog
+from portfolio_server.profiling import list_stored_profiles, load_profile
+
+PROFILE_FORMATS = ("summary", "folded")
+
+def list_profiles(tool: Optional[str] = None, limit: int = 20) -> str:
+    """
+    List the newest stored profiles of slow or sampled tool calls
+
+    Args:
+        tool: Only list profiles of this tool (default: all tools)
+        limit: Maximum number of profiles to list (default: 20)
+
+    Returns:
+        Markdown table of profile ids, durations and upstream time
+    """
+    profiles = list_stored_profiles(tool, max(1, min(limit, 500)))
+    if not profiles:
+        if profiling.PROFILING_MODE == "off":
+            return "No profiles stored. Profiling is off; start the server with --profiling or PORTFOLIO_PROFILING."
+        return "No profiles stored yet."
+
+    lines = [
+        "| Profile | Tool | Seconds | Upstream calls | Upstream seconds | Status | Reason |",
+        "|---------|------|---------|----------------|------------------|--------|--------|",
+    ]
+    for profile in profiles:
+        lines.append(f"| {profile['id']} | {profile['tool']} | {profile['seconds']:.3f} | "
+                     f"{len(profile['upstream'])} | {profile['upstream_wall_seconds']:.3f} | "
+                     f"{profile['status']} | {profile['reason']} |")
+    return "\n".join(lines)
+
+def _top_functions(stacks: Dict[str, int], top: int) -> List[tuple]:
+    """Get the functions with the most samples of their own, as (function, self samples, total samples)."""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        # The first element names the thread, not a function
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    ranked = sorted(total, key=lambda frame: (own[frame], total[frame]), reverse=True)
+    return [(frame, own[frame], total[frame]) for frame in ranked[:top]]
+
+def get_profile(profile_id: str, top: int = 25, format: str = "summary") -> str:
+    """
+    Show a stored tool call profile
+
+    Args:
+        profile_id: Profile id from list_profiles
+        top: Number of functions to show in the summary (default: 25)
+        format: "summary" for a readable report, or "folded" for folded
+            stacks that flame graph tools read (sample mode profiles only)
+
+    Returns:
+        The profile as markdown, or folded stacks one per line
+    """
+    if format not in PROFILE_FORMATS:
+        return f"Error: Unknown format '{format}'. Valid options are: {', '.join(PROFILE_FORMATS)}"
+    try:
+        profile = load_profile(profile_id)
+    except FileNotFoundError:
+        return f"Error: No profile {profile_id}"
+    except (OSError, ValueError) as e:
+        return f"Error: {e}"
+
+    stacks: Dict[str, int] = profile.get("stacks") or {}
+    if format == "folded":
+        if not stacks:
+            return f"Error: Profile {profile_id} has no stack samples"
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.items())
+
+    lines = [
+        f"# Profile {profile['id']}",
+        "",
+        f"- Tool: {profile['tool']} ({profile['status']}, {profile['reason']})",
+        f"- Started: {profile['started_at']}",
+        f"- Duration: {profile['seconds']:.3f}s",
+        f"- Arguments hash: {profile['args_hash']}",
+        f"- Tenant: {profile.get('tenant') or '-'}",
+        f"- Mode: {profile['mode']}",
+        f"- Upstream: {len(profile['upstream'])} requests in flight for {profile['upstream_wall_seconds']:.3f}s",
+    ]
+    if profile["upstream"]:
+        lines.extend(["", "## Upstream Requests", "",
+                      "| Start (s) | Seconds | Provider | Operation | Status |",
+                      "|-----------|---------|----------|-----------|--------|"])
+        for request in profile["upstream"]:
+            lines.append(f"| {request['offset']:.3f} | {request['seconds']:.3f} | {request['provider']} | "
+                         f"{request['operation']} | {request['status']} |")
+
+    if stacks:
+        samples = profile.get("samples") or 1
+        lines.extend(["", f"## Busiest Functions ({samples} samples every {profile['interval'] * 1000:g} ms)", "",
+                      "Shares are of the call's duration, per thread.", "",
+                      "| Function | Self % | Total % |", "|----------|--------|---------|"])
+        for frame, own, total in _top_functions(stacks, top):
+            lines.append(f"| {frame} | {own / samples * 100:.1f} | {total / samples * 100:.1f} |")
+    elif profile.get("functions"):
+        lines.extend(["", "## Functions by Cumulative Time", "", "```", profile["functions"].strip(), "```"])
+    else:
+        lines.extend(["", "No profile was taken: another call held the profiler."])
+    return "\n".join(lines)
+
+def get_event_loop_stalls(limit: int = 10, stacks: bool = False) -> str:
+    """
+    Show recent times the server's event loop was blocked by synchronous work
+
+    Args:
+        limit: Maximum number of stalls to show, newest first (default: 10)
+        stacks: Include the loop thread's stack when each stall was detected (default: False)
+
+    Returns:
+        Markdown table of stalls with their duration, location, task and coroutine
+    """
+    if not watchdog.WATCHDOG_ENABLED:
+        return "The event loop watchdog is off; unset PORTFOLIO_LOOP_WATCHDOG to enable it."
+    stalls = watchdog.recent_stalls(max(1, min(limit, watchdog.RECENT_STALLS)))
+    if not stalls:
+        return (f"No event loop stalls longer than {watchdog.STALL_THRESHOLD:g}s "
+                f"since the server started.")
+
+    lines = [
+        "| Started | Seconds | Location | Task | Coroutine |",
+        "|---------|---------|----------|------|-----------|",
+    ]
+    for stall in stalls:
+        lines.append(f"| {stall['started_at']} | {stall['seconds']:.3f} | {stall['location']} | "
+                     f"{stall['task'] or '-'} | {stall['coroutine'] or '-'} |")
+    if stacks:
+        for stall in stalls:
+            lines.extend(["", f"## {stall['started_at']} in {stall['location']}", "",
+                          "```", stall["stack"].rstrip(), "```"])
+    return "\n".join(lines)
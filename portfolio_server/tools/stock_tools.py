@@ -2,10 +2,18 @@
 Tools for retrieving stock data and news.
 """
 import json
+import asyncio
 from typing import List, Dict, Any
 
-from portfolio_server.api.alpha_vantage import fetch_stock_data, search_company
+import numpy as np
+
+from portfolio_server.api.resilience import UpstreamError
 from portfolio_server.api.news_api import fetch_stock_news as fetch_news
+from portfolio_server.data.intraday import get_intraday_bars, get_quotes
+from portfolio_server.data.market_data import get_daily_series, search_symbols
+
+# Upstream requests a single tool call keeps in flight at once
+MAX_CONCURRENT_REQUESTS = 8
 
 async def _fetch_stock_data_with_fallback(symbol: str, days: int) -> Dict[str, Any]:
     """
@@ -15,57 +23,54 @@ async def _fetch_stock_data_with_fallback(symbol: str, days: int) -> Dict[str, A
         symbol: Stock symbol or company name to fetch data for
         days: Number of days of history to include
     """
-    # First try direct symbol lookup
-    data = await fetch_stock_data(symbol)
-    
-    # If direct lookup fails, try searching by company name
-    if "Error Message" in data or "Time Series (Daily)" not in data:
-        search_results = await search_company(symbol)
+    try:
+        # First try direct symbol lookup
+        series = await get_daily_series(symbol)
         
-        if search_results:
+        # If direct lookup fails, try searching by company name
+        search_results = await search_symbols(symbol) if series is None else []
+        if series is None and search_results:
             # Use the first match's symbol
             best_match = search_results[0]["symbol"]
-            data = await fetch_stock_data(best_match)
-            
+            series = await get_daily_series(best_match)
+    except UpstreamError as e:
+        # Rate limits and outages are reported as such rather than as missing data
+        return {"error": f"Market data temporarily unavailable for '{symbol}': {e}"}
+    
+    if series is None:
+        if search_results:
             # If data is still not available after searching
-            if "Error Message" in data or "Time Series (Daily)" not in data:
-                return {
-                    "error": f"Stock Data Not Found. Original Query: {symbol}, Tried Symbol: {best_match}"
-                }
+            return {
+                "error": f"Stock Data Not Found. Original Query: {symbol}, Tried Symbol: {best_match}"
+            }
         else:
             return {
                 "error": f"No Company or stock symbol matching '{symbol}' was found."
             }
     
-    # Process successful data
-    if "Time Series (Daily)" in data:
-        time_series = data["Time Series (Daily)"]
-        dates = sorted(time_series.keys(), reverse=True)[:days]
-        
-        prices = {}
-        for date in dates:
-            prices[date] = {
-                "open": float(time_series[date]["1. open"]),
-                "high": float(time_series[date]["2. high"]),
-                "low": float(time_series[date]["3. low"]),
-                "close": float(time_series[date]["4. close"]),
-                "volume": int(time_series[date]["5. volume"])
-            }
-        
-        # Calculate change from first to last day
-        if len(dates) >= 2:
-            first_close = prices[dates[-1]]["close"]
-            last_close = prices[dates[0]]["close"]
-            percent_change = ((last_close - first_close) / first_close) * 100
-        else:
-            percent_change = 0
-            
-        return {
-            "prices": prices,
-            "percent_change": round(percent_change, 2)
+    # Process successful data (most recent day first)
+    prices = {}
+    for i in range(len(series) - 1, max(len(series) - days, 0) - 1, -1):
+        prices[str(series.dates[i])] = {
+            "open": float(series.open[i]),
+            "high": float(series.high[i]),
+            "low": float(series.low[i]),
+            "close": float(series.close[i]),
+            "volume": int(series.volume[i])
         }
     
-    return {"error": "Unable to obtain Stock Data"}
+    # Calculate change from first to last day
+    if len(prices) >= 2:
+        first_close = float(series.close[len(series) - len(prices)])
+        last_close = series.latest_close
+        percent_change = ((last_close - first_close) / first_close) * 100
+    else:
+        percent_change = 0
+        
+    return {
+        "prices": prices,
+        "percent_change": round(percent_change, 2)
+    }
 
 async def get_stock_prices(symbols: List[str], days: int = 7) -> str:
     """
@@ -75,10 +80,63 @@ async def get_stock_prices(symbols: List[str], days: int = 7) -> str:
         symbols: List of stock symbols or company names to fetch data for
         days: Number of days of history to include (default: 7)
     """
-    result = {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    
+    async def fetch(symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _fetch_stock_data_with_fallback(symbol, days)
     
-    for symbol in symbols:
-        result[symbol] = await _fetch_stock_data_with_fallback(symbol, days)
+    # Fetch concurrently so one slow symbol does not delay the rest
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+    result = dict(zip(symbols, results))
+    
+    return json.dumps(result, indent=2)
+
+async def get_intraday_prices(symbols: List[str], bars: int = 12) -> str:
+    """
+    Get today's intraday bars and the latest real-time quote for multiple stocks
+    
+    Args:
+        symbols: List of stock symbols to fetch data for
+        bars: Number of most recent intraday bars to include per symbol (default: 12)
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    
+    async def fetch(symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"bars": await get_intraday_bars(symbol, bars)}
+            except UpstreamError as e:
+                return {"error": f"Intraday data temporarily unavailable for '{symbol}': {e}"}
+    
+    results, quotes = await asyncio.gather(asyncio.gather(*(fetch(symbol) for symbol in symbols)),
+                                           get_quotes(symbols))
+    result = {}
+    for symbol, data in zip(symbols, results):
+        window = data.pop("bars", None)
+        if window is not None:
+            # Most recent bar first, like get_stock_prices
+            data["bars"] = {
+                str(np.datetime64(int(window["timestamp"][i]), "s")).replace("T", " "): {
+                    "open": float(window["open"][i]),
+                    "high": float(window["high"][i]),
+                    "low": float(window["low"][i]),
+                    "close": float(window["close"][i]),
+                    "volume": int(window["volume"][i])
+                }
+                for i in range(len(window["timestamp"]) - 1, -1, -1)
+            }
+        quote = quotes.get(symbol)
+        if quote is not None:
+            data["quote"] = {
+                "price": quote.price,
+                "previous_close": quote.previous_close,
+                "change_percent": round(quote.change_percent, 2),
+                "trading_day": quote.trading_day
+            }
+        if not data:
+            data["error"] = f"No intraday data found for '{symbol}'."
+        result[symbol] = data
     
     return json.dumps(result, indent=2)
 
@@ -90,11 +148,14 @@ async def get_stock_news(symbols: List[str], max_articles: int = 5) -> str:
         symbols: List of stock symbols to get news for
         max_articles: Maximum number of articles to return per symbol
     """
-    result = {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    
+    async def fetch(symbol: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await fetch_news(symbol, max_articles)
     
-    for symbol in symbols:
-        articles = await fetch_news(symbol, max_articles)
-        result[symbol] = articles
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+    result = dict(zip(symbols, results))
     
     return json.dumps(result, indent=2)
 
@@ -108,5 +169,9 @@ async def search_stocks(query: str) -> str:
     Returns:
         JSON string containing search results with company information
     """
-    results = await search_company(query)
+    try:
+        results = await search_symbols(query)
+    except UpstreamError as e:
+        # A throttled or failing provider yields no results, as for the other market data tools
+        return json.dumps({"results": [], "error": str(e)}, indent=2)
     return json.dumps({"results": results}, indent=2)
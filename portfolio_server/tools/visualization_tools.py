@@ -1,53 +1,125 @@
 """
 Tools for visualizing portfolio data.
+
+Charts are rendered off the event loop and returned as PNG or SVG images;
+see portfolio_server/charts for the renderers and the batch renderer. The
+image tools raise ValueError for invalid options or missing price data,
+which MCP reports to the client as a tool error.
 """
-import matplotlib.pyplot as plt
-from io import BytesIO
+import json
+import asyncio
+from functools import partial
+from typing import Any, Dict, List, Optional
+
 from mcp.server.fastmcp import Image
 
-from portfolio_server.data.storage import load_portfolio
+from portfolio_server.charts.batch import CHART_OUTPUT_DIR, DEFAULT_CHART_DAYS, render_portfolio_charts
+from portfolio_server.charts.data import allocation_data, portfolio_chart_data, price_history_data
+from portfolio_server.charts.render import chart_options, render_chart
+from portfolio_server.data.bulk import check_user_ids
+from portfolio_server.data.storage import confined_path, load_portfolio
+
+async def _image(kind: str, data: Dict[str, Any], format: str, dpi: int) -> Image:
+    content = await asyncio.get_running_loop().run_in_executor(None, partial(render_chart, kind, data, format, dpi))
+    # MCP derives the MIME type from the format, and SVG is image/svg+xml
+    return Image(data=content, format="svg+xml" if format == "svg" else format)
+
+async def _portfolio_chart(kind: str, user_id: str, days: int, format: Optional[str], dpi: Optional[int]) -> Image:
+    format, dpi = chart_options(format, dpi)
+    data = (await portfolio_chart_data(user_id, load_portfolio(user_id), [kind], days))[kind]
+    if data is None:
+        raise ValueError(f"Not enough price history for the stocks in the portfolio of {user_id}")
+    return await _image(kind, data, format, dpi)
 
-def visualize_portfolio(user_id: str) -> Image:
+async def visualize_portfolio(user_id: str, format: Optional[str] = None,
+                              dpi: Optional[int] = None) -> Image:
     """
     Create a visualization of the current portfolio allocation
-    
+
+    Args:
+        user_id: Unique identifier for the user
+        format: "png" or "svg" (default: server setting, usually png)
+        dpi: PNG resolution; lower values give smaller images (default: server setting)
+    """
+    format, dpi = chart_options(format, dpi)
+    return await _image("allocation", allocation_data(user_id, load_portfolio(user_id)), format, dpi)
+
+async def visualize_price_history(symbols: List[str], days: int = 180, format: Optional[str] = None,
+                                  dpi: Optional[int] = None) -> Image:
+    """
+    Chart the price history of several stocks, rebased to 100 at the start
+
+    Args:
+        symbols: List of stock symbols to chart
+        days: Number of trading days of history (default: 180)
+        format: "png" or "svg" (default: server setting, usually png)
+        dpi: PNG resolution; lower values give smaller images (default: server setting)
+    """
+    format, dpi = chart_options(format, dpi)
+    data = await price_history_data(symbols, days)
+    if data is None:
+        raise ValueError(f"Not enough shared price history for {', '.join(symbols)}")
+    return await _image("price_history", data, format, dpi)
+
+async def visualize_drawdown(user_id: str, days: int = DEFAULT_CHART_DAYS, format: Optional[str] = None,
+                             dpi: Optional[int] = None) -> Image:
+    """
+    Chart the value of a portfolio's stocks and their drawdown from the running peak
+
+    The stocks are bought at their allocation weights at the start of the
+    period and held, valued in the portfolio's base currency.
+
+    Args:
+        user_id: Unique identifier for the user
+        days: Number of trading days of history (default: 365)
+        format: "png" or "svg" (default: server setting, usually png)
+        dpi: PNG resolution; lower values give smaller images (default: server setting)
+    """
+    return await _portfolio_chart("drawdown", user_id, days, format, dpi)
+
+async def visualize_correlation(user_id: str, days: int = 180, format: Optional[str] = None,
+                                dpi: Optional[int] = None) -> Image:
+    """
+    Chart a heatmap of the correlations between the daily returns of a portfolio's stocks
+
     Args:
         user_id: Unique identifier for the user
+        days: Number of trading days of returns (default: 180)
+        format: "png" or "svg" (default: server setting, usually png)
+        dpi: PNG resolution; lower values give smaller images (default: server setting)
+    """
+    return await _portfolio_chart("correlation", user_id, days, format, dpi)
+
+async def render_charts(output_dir: str,
+                        user_ids: Optional[List[str]] = None,
+                        charts: Optional[List[str]] = None,
+                        format: Optional[str] = None,
+                        dpi: Optional[int] = None,
+                        days: int = DEFAULT_CHART_DAYS) -> str:
+    """
+    Render charts of many users' portfolios into files on the server
+
+    Charts are drawn in a pool of worker processes and written as
+    {user_id}_{chart}.{format}, overwriting earlier runs.
+
+    Args:
+        output_dir: Directory to write the charts into, inside the server's
+            chart output directory (e.g. "nightly")
+        user_ids: Users to chart (default: every saved portfolio)
+        charts: Any of allocation, price_history, drawdown and correlation
+            (default: allocation, drawdown and correlation)
+        format: "png" or "svg" (default: server setting, usually png)
+        dpi: PNG resolution (default: server setting)
+        days: Number of trading days of history in the price-based charts (default: 365)
+
+    Returns:
+        JSON summary of the charts written, skipped and failed
     """
-    portfolio = load_portfolio(user_id)
-    
-    # Prepare data for visualization
-    labels = []
-    sizes = []
-    colors = []
-    
-    # Add stocks (in blue shades)
-    for i, (symbol, allocation) in enumerate(portfolio["stocks"].items()):
-        labels.append(f"{symbol} ({allocation}%)")
-        sizes.append(allocation)
-        # Generate different blue shades
-        blue_val = min(0.8, 0.3 + (i * 0.1))
-        colors.append((0, 0, blue_val))
-    
-    # Add bonds (in green shades)
-    for i, (bond_id, allocation) in enumerate(portfolio["bonds"].items()):
-        labels.append(f"{bond_id} ({allocation}%)")
-        sizes.append(allocation)
-        # Generate different green shades
-        green_val = min(0.8, 0.3 + (i * 0.1))
-        colors.append((0, green_val, 0))
-    
-    # Create pie chart
-    plt.figure(figsize=(10, 7))
-    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
-    plt.axis('equal')  # Equal aspect ratio ensures the pie chart is circular
-    plt.title(f"Portfolio Allocation for User {user_id}")
-    
-    # Save to bytes object
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    plt.close()
-    
-    # Return as MCP Image
-    return Image(data=buf.getvalue(), format="png")
+    try:
+        output_dir = confined_path(CHART_OUTPUT_DIR, output_dir)
+        if user_ids is not None:
+            user_ids = check_user_ids(user_ids)
+        summary = await render_portfolio_charts(output_dir, user_ids, charts, format, dpi, days)
+    except (OSError, ValueError) as e:
+        return f"Error: {e}"
+    return json.dumps(summary, indent=2)
@@ -0,0 +1,180 @@
+"""
+Event loop watchdog.
+
+Every tool call and SSE session shares one event loop, so synchronous work
+in an async tool (file I/O, serializing a large payload, rendering) stalls
+all of them. The watchdog finds such stalls:
+
+- a heartbeat task on the loop wakes every PORTFOLIO_LOOP_WATCHDOG_INTERVAL
+  seconds and records how late it woke as the event loop lag metric;
+- a monitor thread checks the heartbeat. When the loop has not run it for
+  PORTFOLIO_LOOP_STALL_SECONDS, the thread logs the loop thread's stack and
+  the task it is running, and keeps sampling the stack until the loop
+  recovers. The stall is then counted against the code location that was
+  seen blocking most often, and kept in a short list of recent stalls.
+
+The watchdog is on unless PORTFOLIO_LOOP_WATCHDOG is "0", and starts with
+the first session.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from portfolio_server.metrics import LOOP_LAG, LOOP_LAG_LAST, LOOP_STALLED_SECONDS, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+WATCHDOG_ENABLED = os.environ.get("PORTFOLIO_LOOP_WATCHDOG", "1").strip().lower() not in ("0", "false", "off", "no")
+
+# Seconds between heartbeats
+WATCHDOG_INTERVAL = float(os.environ.get("PORTFOLIO_LOOP_WATCHDOG_INTERVAL", "0.1"))
+
+# Seconds the loop may go without running the heartbeat before it counts as stalled
+STALL_THRESHOLD = float(os.environ.get("PORTFOLIO_LOOP_STALL_SECONDS", "0.5"))
+
+# Recent stalls kept for inspection
+RECENT_STALLS = 50
+
+# Frames of the blocked stack kept per stall
+STALL_STACK_DEPTH = 40
+
+_PACKAGE = __name__.split(".")[0]
+
+def _function_name(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+def _location(frame) -> str:
+    """Get the innermost frame of this package in a stack, or the innermost frame, as module.function."""
+    innermost = frame
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.split(".")[0] == _PACKAGE and module != __name__:
+            return _function_name(frame)
+        frame = frame.f_back
+    return _function_name(innermost)
+
+class LoopWatchdog:
+    """
+    Heartbeat and monitor thread watching one event loop.
+
+    Args:
+        interval: Seconds between heartbeats
+        threshold: Seconds without a heartbeat after which the loop counts as stalled
+    """
+    def __init__(self, interval: float = WATCHDOG_INTERVAL, threshold: float = STALL_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=RECENT_STALLS)
+        self._loop_thread: Optional[int] = None
+        self._beat = time.monotonic()
+        self._stall: Optional[Dict[str, Any]] = None
+        self._locations: Counter = Counter()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def running(self) -> bool:
+        """Check whether the watchdog is watching a loop."""
+        return self.loop is not None and not self._stopped.is_set()
+
+    def start(self) -> None:
+        """Start watching the running loop; must be called from it."""
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stall = None
+        self._locations.clear()
+        # Each start gets its own event, so threads of an earlier start cannot be revived
+        self._stopped = stopped = threading.Event()
+        self._heartbeat_task = self.loop.create_task(self._heartbeat(stopped), name="loop-watchdog-heartbeat")
+        threading.Thread(target=self._monitor, args=(stopped,), name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop watching; the heartbeat task is cancelled if the loop is still running."""
+        self._stopped.set()
+        if self._heartbeat_task is not None and not self._heartbeat_task.done():
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self, stopped: threading.Event) -> None:
+        try:
+            while True:
+                scheduled = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - scheduled)
+                LOOP_LAG.observe(lag)
+                LOOP_LAG_LAST.set(lag)
+                self._beat = now
+        finally:
+            # The loop is shutting down; a missing heartbeat is no longer a stall
+            stopped.set()
+
+    def _monitor(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.interval / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.threshold and self.loop.is_running():
+                self._sample(beat, blocked)
+            elif self._stall is not None and beat > self._stall["beat"]:
+                self._finish(beat)
+
+    def _sample(self, beat: float, blocked: float) -> None:
+        """Record where the loop thread is while it is blocked, logging the first sample of a stall."""
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        location = _location(frame)
+        self._locations[location] += 1
+        if self._stall is not None:
+            return
+
+        task = asyncio.current_task(self.loop)
+        stack = "".join(traceback.format_stack(frame)[-STALL_STACK_DEPTH:])
+        self._stall = {
+            "beat": beat,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "task": task.get_name() if task is not None else None,
+            "coroutine": getattr(task.get_coro(), "__qualname__", None) if task is not None else None,
+            "location": location,
+            "stack": stack,
+        }
+        logger.warning("Event loop blocked for %.3fs in %s (task %s, coroutine %s)\n%s",
+                       blocked, location, self._stall["task"], self._stall["coroutine"], stack)
+
+    def _finish(self, beat: float) -> None:
+        """Close the current stall once the heartbeat has run again."""
+        stall, self._stall = self._stall, None
+        seconds = max(0.0, beat - stall["beat"] - self.interval)
+        # The location seen most often is the one that blocked the longest
+        stall["location"] = self._locations.most_common(1)[0][0]
+        stall["seconds"] = round(seconds, 6)
+        del stall["beat"]
+        self._locations.clear()
+        LOOP_STALLS.inc(location=stall["location"])
+        LOOP_STALLED_SECONDS.inc(seconds, location=stall["location"])
+        self.stalls.append(stall)
+        logger.warning("Event loop was blocked for %.3fs, mostly in %s", seconds, stall["location"])
+
+watchdog = LoopWatchdog()
+
+def ensure_watchdog() -> None:
+    """Start the watchdog on the running loop unless it already watches it or is disabled."""
+    if not WATCHDOG_ENABLED:
+        return
+    loop = asyncio.get_running_loop()
+    if watchdog.running() and watchdog.loop is loop:
+        return
+    watchdog.stop()
+    watchdog.start()
+
+def recent_stalls(limit: int = 20) -> List[Dict[str, Any]]:
+    """Get the most recent event loop stalls, newest first."""
+    return list(watchdog.stalls)[::-1][:limit]
@@ -0,0 +1,31 @@
+"""
+Shared test setup.
+
+The server reads its data directory and tenancy settings from the
+environment when its modules are imported, so they are pointed at a
+throwaway directory here, before any test imports portfolio_server.
+Upstream requests go to the FakeUpstream transport from the benchmarks,
+so the tests run offline.
+"""
+import os
+import tempfile
+
+os.environ["PORTFOLIO_DATA_DIR"] = tempfile.mkdtemp(prefix="portfolio-tests-")
+os.environ.pop("PORTFOLIO_API_TOKENS", None)
+os.environ["PORTFOLIO_MARKET_DATA_PROVIDER"] = "alpha_vantage"
+
+import pytest
+
+from benchmarks import fake_upstream
+
+@pytest.fixture
+def upstream():
+    """Route upstream requests to a FakeUpstream without latency, with an empty series cache."""
+    from portfolio_server.api.http import set_transport
+    from portfolio_server.data.market_data import series_cache
+
+    series_cache.invalidate()
+    transport = fake_upstream.install(latency=0.0, jitter=0.0)
+    yield transport
+    set_transport(None)
+    series_cache.invalidate()
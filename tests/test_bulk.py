@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from portfolio_server.data import bulk
+
+PORTFOLIOS = [
+    ("alice", {"stocks": {"AAPL": 60.0, "MSFT": 20.0}, "bonds": {"US10Y": 20.0}}),
+    ("bob", {"stocks": {"NVDA": 100.0}, "bonds": {}}),
+]
+
+@pytest.mark.parametrize("name", ["export.csv", "export.jsonl.gz"])
+def test_allocations_round_trip(name):
+    path = bulk.transfer_path(name)
+    assert bulk.write_allocations(path, PORTFOLIOS) == 2
+    users, errors, rows = bulk.read_allocations(path)
+    assert users == dict(PORTFOLIOS)
+    assert not errors
+
+def test_invalid_rows_reject_the_whole_user():
+    path = bulk.transfer_path("invalid.csv")
+    with open(path, "w") as f:
+        f.write("user_id,asset_type,symbol,allocation\n"
+                "alice,stock,AAPL,100\n"
+                "bob,stock,MSFT,50\n"
+                "bob,stock,NVDA,lots\n")
+    users, errors, _ = bulk.read_allocations(path)
+    assert list(users) == ["alice"]
+    assert list(errors) == ["bob"]
+
+@pytest.mark.parametrize("path", ["/etc/passwd.csv", "../outside.csv", "nested/../../outside.jsonl", "notes.txt"])
+def test_transfer_paths_stay_in_the_transfer_directory(path):
+    with pytest.raises(ValueError):
+        bulk.transfer_path(path)
+
+def test_transfer_paths_may_use_subdirectories():
+    path = bulk.transfer_path("2025/export.csv")
+    assert os.path.dirname(path) == os.path.join(os.path.realpath(bulk.TRANSFER_DIR), "2025")
+
+def test_user_ids_must_be_plain_names():
+    assert bulk.check_user_ids(["alice", "bob"]) == ["alice", "bob"]
+    with pytest.raises(ValueError):
+        bulk.check_user_ids(["alice", "../../x"])
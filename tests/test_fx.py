@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from portfolio_server.analytics.fx import (
+    build_fx_matrix,
+    major_currency,
+    required_fx_currencies,
+    symbol_currency,
+)
+from portfolio_server.data.currency import normalize_currency
+
+# Value of one unit of each currency in USD, the pivot
+PIVOT_RATES = {
+    "EUR": (np.array(["2025-01-02", "2025-01-03", "2025-01-06"]), np.array([1.10, 1.20, 1.30])),
+    "GBP": (np.array(["2025-01-02", "2025-01-06"]), np.array([1.25, 1.50])),
+}
+
+def test_listing_currencies():
+    assert symbol_currency("AAPL") == "USD"
+    assert symbol_currency("SHOP.TRT") == "CAD"
+    assert symbol_currency("VOD.LON") == "GBX"
+    assert symbol_currency("SAP", {"SAP": "EUR"}) == "EUR"
+    assert major_currency("GBX") == ("GBP", 0.01)
+
+def test_currency_codes_are_normalized():
+    assert normalize_currency(" eur ") == "EUR"
+    with pytest.raises(ValueError):
+        normalize_currency("euro")
+
+def test_pivot_is_not_fetched():
+    assert required_fx_currencies("USD", ["USD", "EUR", "GBX"]) == ["EUR", "GBP"]
+
+def test_rates_convert_through_the_pivot():
+    matrix = build_fx_matrix("EUR", ["USD", "GBP", "EUR"], PIVOT_RATES)
+    np.testing.assert_array_equal(matrix.dates, ["2025-01-02", "2025-01-03", "2025-01-06"])
+    usd, gbp, eur = matrix.columns(["USD", "GBP", "EUR"])
+    np.testing.assert_allclose(matrix.rates[:, usd], 1 / np.array([1.10, 1.20, 1.30]))
+    # GBP has no fixing on 01-03 and keeps its previous rate
+    np.testing.assert_allclose(matrix.rates[:, gbp], np.array([1.25, 1.25, 1.50]) / [1.10, 1.20, 1.30])
+    np.testing.assert_allclose(matrix.rates[:, eur], 1.0)
+
+def test_minor_units_are_scaled():
+    matrix = build_fx_matrix("USD", ["GBX", "GBP"], PIVOT_RATES)
+    gbx, gbp = matrix.columns(["GBX", "GBP"])
+    np.testing.assert_allclose(matrix.rates[:, gbx], matrix.rates[:, gbp] * 0.01)
+
+    pounds = build_fx_matrix("GBP", ["GBX"], PIVOT_RATES)
+    np.testing.assert_allclose(pounds.rates[:, 0], 0.01)
+
+def test_rates_at_uses_the_latest_rate_on_or_before_each_date():
+    matrix = build_fx_matrix("USD", ["EUR"], PIVOT_RATES)
+    column = matrix.columns(["EUR"])
+    rates = matrix.rates_at(np.array(["2024-12-31", "2025-01-04", "2025-02-01"]), column)
+    np.testing.assert_allclose(rates, [1.10, 1.20, 1.30])
+    np.testing.assert_allclose(matrix.latest(column), [1.30])
+
+def test_unknown_currencies_have_no_rate():
+    matrix = build_fx_matrix("USD", ["JPY"], PIVOT_RATES)
+    assert np.isnan(matrix.rates).all()
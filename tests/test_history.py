@@ -0,0 +1,64 @@
+import copy
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from portfolio_server.data import history
+
+OLD = {
+    "stocks": {"AAPL": 60.0, "MSFT": 40.0},
+    "bonds": {"US10Y": 0.0},
+    "holdings": {"lots": {"quantity": [1.0, 2.0]}},
+    "base_currency": "USD",
+}
+
+@pytest.mark.parametrize("new", [
+    {**OLD, "stocks": {"AAPL": 50.0, "MSFT": 30.0, "NVDA": 20.0}},
+    {key: value for key, value in OLD.items() if key != "bonds"},
+    {**OLD, "holdings": {"lots": {"quantity": [1.0, 2.0, 3.0]}}},
+    {**OLD, "holdings": {"lots": {"quantity": [5.0]}}},
+    {**OLD, "base_currency": "EUR", "currencies": {"SAP": "EUR"}},
+    OLD,
+])
+def test_diff_and_apply_delta_round_trip(new):
+    changes = history.diff(OLD, new)
+    assert history.apply_delta(copy.deepcopy(OLD), changes) == new
+
+def test_growing_lists_are_stored_as_appends():
+    new = {**OLD, "holdings": {"lots": {"quantity": [1.0, 2.0, 3.0]}}}
+    changes = history.diff(OLD, new)
+    assert changes == {"set": [], "unset": [], "append": [[["holdings", "lots", "quantity"], [3.0]]]}
+
+def test_unchanged_values_give_no_changes():
+    assert not any(history.diff(OLD, copy.deepcopy(OLD)).values())
+
+def _record(user_id, when, stocks):
+    assert history.record_snapshot(user_id, {"stocks": stocks, "bonds": {}, "last_updated": when.isoformat()})
+
+def test_snapshots_replay_to_any_point_in_time():
+    start = datetime(2025, 3, 1, 12, 0)
+    for day in range(40):
+        _record("history-replay", start + timedelta(days=day), {"AAPL": 100.0 - day, "MSFT": float(day)})
+
+    t, portfolio = history.snapshot_at("history-replay", start + timedelta(days=25, hours=1))
+    assert t == (start + timedelta(days=25)).isoformat()
+    assert portfolio["stocks"] == {"AAPL": 75.0, "MSFT": 25.0}
+    assert history.snapshot_at("history-replay", start - timedelta(days=1)) is None
+
+    changes = list(history.snapshots_between("history-replay", start + timedelta(days=10), start + timedelta(days=12)))
+    assert [current["stocks"]["MSFT"] for _, _, current in changes] == [10.0, 11.0, 12.0]
+    assert changes[0][1]["stocks"]["MSFT"] == 9.0
+
+def test_unchanged_saves_are_not_recorded():
+    when = datetime(2025, 1, 1)
+    _record("history-unchanged", when, {"AAPL": 100.0})
+    assert not history.record_snapshot("history-unchanged", {"stocks": {"AAPL": 100.0}, "bonds": {},
+                                                             "last_updated": (when + timedelta(1)).isoformat()})
+
+def test_timezone_aware_queries_compare_in_local_time():
+    recorded = datetime(2025, 6, 1, 12, 0)
+    _record("history-aware", recorded, {"AAPL": 100.0})
+    aware = recorded.astimezone(timezone.utc)
+    assert history.snapshot_at("history-aware", aware + timedelta(seconds=1)) is not None
+    assert history.snapshot_at("history-aware", aware - timedelta(seconds=1)) is None
+    assert len(list(history.snapshots_between("history-aware", aware - timedelta(hours=1), aware))) == 1
@@ -0,0 +1,41 @@
+import numpy as np
+
+from portfolio_server.data.intraday import BarRing
+from portfolio_server.data.series import IntradayBars
+
+def _bars(timestamps, closes=None) -> IntradayBars:
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    closes = np.asarray(closes if closes is not None else timestamps, dtype=float)
+    return IntradayBars("TEST", timestamps, closes, closes + 1, closes - 1, closes,
+                        np.full(len(timestamps), 100, dtype=np.int64))
+
+def test_merge_adds_only_newer_bars():
+    ring = BarRing(capacity=10)
+    assert ring.merge(_bars([1, 2, 3])) == 3
+    assert ring.merge(_bars([2, 3, 4, 5])) == 2
+    np.testing.assert_array_equal(ring.window()["timestamp"], [1, 2, 3, 4, 5])
+
+def test_merge_wraps_around_and_drops_the_oldest_bars():
+    ring = BarRing(capacity=4)
+    ring.merge(_bars([1, 2, 3]))
+    assert ring.merge(_bars([4, 5, 6])) == 3
+    assert len(ring) == 4
+    window = ring.window()
+    np.testing.assert_array_equal(window["timestamp"], [3, 4, 5, 6])
+    np.testing.assert_array_equal(window["close"], [3, 4, 5, 6])
+    np.testing.assert_array_equal(ring.window(2)["timestamp"], [5, 6])
+    assert ring.last("timestamp") == 6
+
+def test_merge_of_more_bars_than_fit_keeps_the_newest():
+    ring = BarRing(capacity=3)
+    ring.merge(_bars([1]))
+    assert ring.merge(_bars(range(2, 10))) == 8
+    np.testing.assert_array_equal(ring.window()["timestamp"], [7, 8, 9])
+
+def test_merge_revises_the_newest_bar():
+    ring = BarRing(capacity=3)
+    ring.merge(_bars([1, 2, 3]))
+    assert ring.merge(_bars([3], closes=[3.5])) == 1
+    assert ring.merge(_bars([3], closes=[3.5])) == 0
+    np.testing.assert_array_equal(ring.window()["close"], [1, 2, 3.5])
+    np.testing.assert_array_equal(ring.window()["timestamp"], [1, 2, 3])
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_upstream import FakeUpstream, install
+from portfolio_server.api.resilience import UpstreamError
+from portfolio_server.data import market_data
+
+def test_price_changes_come_from_the_cached_series(upstream):
+    changes = asyncio.run(market_data.get_price_changes(["AAPL", "MSFT"], 5))
+    assert set(changes) == {"AAPL", "MSFT"}
+    calls = upstream.calls
+    assert asyncio.run(market_data.get_price_changes(["AAPL", "MSFT"], 5)) == changes
+    assert upstream.calls == calls
+
+def test_prices_convert_into_the_base_currency(upstream):
+    listed = asyncio.run(market_data.get_latest_prices(["VOD.LON", "AAPL"]))
+    converted = asyncio.run(market_data.get_latest_prices(["VOD.LON", "AAPL"], base="USD"))
+    assert converted["AAPL"] == pytest.approx(listed["AAPL"])
+    # Pence are converted through GBP/USD
+    assert converted["VOD.LON"] < listed["VOD.LON"]
+
+def test_bond_data_reports_unknown_bonds(upstream):
+    bonds = asyncio.run(market_data.fetch_bond_data(["US10Y", "bogus"], 7))
+    assert "error" in bonds["bogus"]
+    assert bonds["US10Y"]["modified_duration"] > 0
+    assert bonds["US10Y"]["from"] < bonds["US10Y"]["as_of"]
+
+def test_throttled_search_raises_upstream_error(upstream):
+    install(FakeUpstream(latency=0.0, jitter=0.0, rate_limit_rate=1.0))
+    with pytest.raises(UpstreamError):
+        asyncio.run(market_data.search_symbols("apple"))
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from portfolio_server.analytics.optimizer import (
+    WarmStartCache,
+    project_capped_simplex,
+    risk_contributions,
+    solve_mean_variance,
+    solve_min_variance,
+    solve_risk_parity,
+)
+
+def _covariance(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, size=(250, n)) + rng.normal(0, 0.005, size=(250, 1))
+    return np.cov(returns, rowvar=False)
+
+def test_projection_is_feasible_and_keeps_feasible_points():
+    v = np.array([0.5, -0.2, 0.9, 0.1])
+    w = project_capped_simplex(v, 1.0, 0.4)
+    assert w.sum() == pytest.approx(1.0, abs=1e-9)
+    assert np.all(w >= 0) and np.all(w <= 0.4 + 1e-12)
+
+    feasible = np.array([0.25, 0.25, 0.3, 0.2])
+    np.testing.assert_allclose(project_capped_simplex(feasible, 1.0, 0.4), feasible, atol=1e-12)
+
+def test_projection_is_the_closest_feasible_point():
+    rng = np.random.default_rng(1)
+    v = rng.normal(size=5)
+    w = project_capped_simplex(v, 1.0, 0.35)
+    # No random feasible point is closer to v than the projection
+    for _ in range(200):
+        other = project_capped_simplex(rng.normal(size=5), 1.0, 0.35)
+        assert np.linalg.norm(v - w) <= np.linalg.norm(v - other) + 1e-9
+
+def test_projection_rejects_infeasible_caps():
+    with pytest.raises(ValueError):
+        project_capped_simplex(np.zeros(3), 1.0, 0.3)
+
+def test_min_variance_matches_closed_form():
+    cov = _covariance(4)
+    inverse_ones = np.linalg.solve(cov, np.ones(4))
+    expected = inverse_ones / inverse_ones.sum()
+    assert np.all(expected > 0), "test covariance should have a long-only minimum"
+
+    weights, _ = solve_min_variance(cov)
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+def test_min_variance_respects_cap_and_total():
+    cov = _covariance(5, seed=2)
+    weights, _ = solve_min_variance(cov, total=0.6, upper=0.15)
+    assert weights.sum() == pytest.approx(0.6, abs=1e-9)
+    assert weights.max() <= 0.15 + 1e-9
+    assert weights.min() >= 0
+
+def test_mean_variance_matches_closed_form_without_binding_bounds():
+    cov = np.diag([0.04, 0.09, 0.16])
+    mu = np.array([0.05, 0.06, 0.07])
+    risk_aversion = 3.0
+    # Stationarity of mu'w - a/2 w'Cw subject to sum(w) = 1
+    inverse = np.linalg.inv(cov)
+    ones = np.ones(3)
+    lam = (ones @ inverse @ mu - risk_aversion) / (ones @ inverse @ ones)
+    expected = inverse @ (mu - lam) / risk_aversion
+    assert np.all(expected > 0)
+
+    weights, _ = solve_mean_variance(mu, cov, risk_aversion=risk_aversion)
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+def test_risk_parity_equalizes_contributions():
+    cov = _covariance(6, seed=3)
+    weights, _ = solve_risk_parity(cov)
+    assert weights.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(risk_contributions(weights, cov), np.full(6, 1 / 6), atol=1e-6)
+
+def test_risk_parity_of_uncorrelated_assets_is_inverse_volatility():
+    volatilities = np.array([0.1, 0.2, 0.4])
+    weights, _ = solve_risk_parity(np.diag(volatilities ** 2))
+    expected = (1 / volatilities) / (1 / volatilities).sum()
+    np.testing.assert_allclose(weights, expected, atol=1e-8)
+
+def test_warm_start_reuses_weights_of_the_same_symbols():
+    cache = WarmStartCache()
+    cache.store(("alice", "min_variance"), ["AAPL", "MSFT"], np.array([0.3, 0.7]))
+    np.testing.assert_allclose(cache.initial_weights(("alice", "min_variance"), ["AAPL", "MSFT"], 1.0), [0.3, 0.7])
+    assert cache.initial_weights(("bob", "min_variance"), ["AAPL", "MSFT"], 1.0) is None
+
+    cov = _covariance(4, seed=4)
+    cold, cold_iterations = solve_min_variance(cov)
+    warm, warm_iterations = solve_min_variance(cov, w0=cold)
+    np.testing.assert_allclose(warm, cold, atol=1e-8)
+    assert warm_iterations <= cold_iterations
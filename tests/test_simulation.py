@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from portfolio_server.analytics.simulation import CHUNK_PATHS, monthly_returns_from_daily, simulate_yearly_values
+
+PARAMETRIC = dict(mu=0.005, sigma=0.04, fixed_return=0.003, risky_weight=0.6)
+
+def test_monthly_returns_compound_daily_returns():
+    daily = np.full(42, 0.001)
+    monthly = monthly_returns_from_daily(daily, window=21)
+    assert len(monthly) == 22
+    np.testing.assert_allclose(monthly, 1.001 ** 21 - 1)
+
+def test_monthly_returns_of_short_history_are_scaled():
+    monthly = monthly_returns_from_daily(np.full(5, 0.002), window=21)
+    np.testing.assert_allclose(monthly, [1.002 ** 21 - 1])
+
+def test_seeded_runs_are_reproducible():
+    first = simulate_yearly_values(1000.0, 5, 3000, "parametric", seed=42, **PARAMETRIC)
+    second = simulate_yearly_values(1000.0, 5, 3000, "parametric", seed=42, **PARAMETRIC)
+    other = simulate_yearly_values(1000.0, 5, 3000, "parametric", seed=43, **PARAMETRIC)
+    assert first.shape == (5, 3000)
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+def test_sharded_runs_match_serial_runs():
+    n_paths = 2 * CHUNK_PATHS + 10
+    serial = simulate_yearly_values(1000.0, 2, n_paths, "parametric", seed=7, workers=1, **PARAMETRIC)
+    sharded = simulate_yearly_values(1000.0, 2, n_paths, "parametric", seed=7, workers=2, **PARAMETRIC)
+    np.testing.assert_array_equal(serial, sharded)
+
+def test_bootstrap_without_risk_grows_at_the_fixed_return():
+    values = simulate_yearly_values(100.0, 2, 10, "bootstrap", sample=np.array([0.5, -0.5]),
+                                    fixed_return=0.01, risky_weight=0.0, seed=1)
+    np.testing.assert_allclose(values[:, 0], [100 * 1.01 ** 12, 100 * 1.01 ** 24])
+
+def test_contributions_are_added_every_month():
+    values = simulate_yearly_values(0.0, 1, 3, "parametric", monthly_contribution=10.0,
+                                    mu=0.0, sigma=0.0, fixed_return=0.0, risky_weight=1.0, seed=1)
+    np.testing.assert_allclose(values, 120.0)
+
+def test_bootstrap_requires_a_sample():
+    with pytest.raises(ValueError):
+        simulate_yearly_values(1000.0, 1, 10, "bootstrap", seed=1)
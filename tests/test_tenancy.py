@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from portfolio_server import tenancy
+from portfolio_server.tenancy import (
+    ADMIN_TENANT,
+    TenantLimits,
+    acting_for,
+    authenticate,
+    check_user,
+    current_tenant,
+    parse_tokens,
+    set_tokens,
+)
+
+@pytest.fixture
+def tokens():
+    set_tokens("key-a:alice,key-b:bob,ops:*")
+    yield
+    set_tokens("")
+
+def _as_tenant(tenant, fn, *args):
+    token = current_tenant.set(tenant)
+    try:
+        return fn(*args)
+    finally:
+        current_tenant.reset(token)
+
+def test_tokens_map_to_tenants(tokens):
+    assert authenticate("key-a") == "alice"
+    assert authenticate("ops") == ADMIN_TENANT
+    assert authenticate("wrong") is None
+    assert authenticate(None) is None
+
+def test_malformed_token_specs_are_rejected():
+    with pytest.raises(ValueError):
+        parse_tokens("no-tenant")
+
+def test_tenants_may_only_act_for_themselves():
+    _as_tenant("alice", check_user, "alice")
+    _as_tenant("alice", check_user, None)
+    with pytest.raises(PermissionError):
+        _as_tenant("alice", check_user, "bob")
+    with pytest.raises(PermissionError):
+        _as_tenant("alice", check_user, None, True)
+
+def test_admins_and_unauthenticated_sessions_are_unrestricted():
+    _as_tenant(ADMIN_TENANT, check_user, "bob", True)
+    _as_tenant(None, check_user, "bob", True)
+
+def test_upstream_budget_is_spent_and_refilled(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tenancy.time, "monotonic", lambda: now[0])
+    limits = TenantLimits(concurrency=1, upstream_calls=2, window=10)
+    assert limits.charge_upstream("alice") is None
+    assert limits.charge_upstream("alice") is None
+    assert limits.charge_upstream("alice") == pytest.approx(5.0)
+    # Other tenants have budgets of their own
+    assert limits.charge_upstream("bob") is None
+    now[0] += 5.0
+    assert limits.charge_upstream("alice") is None
+
+def test_acting_for_charges_the_user_only_with_authentication(tokens):
+    async def tenant_inside(user_id):
+        async with acting_for(user_id):
+            return current_tenant.get()
+
+    assert asyncio.run(tenant_inside("bob")) == "bob"
+    set_tokens("")
+    assert asyncio.run(tenant_inside("bob")) is None
+
+def test_tenant_scoped_checks_the_user_id_argument():
+    def view(user_id: str) -> str:
+        return user_id
+
+    scoped = tenancy.tenant_scoped(view)
+    assert _as_tenant("alice", scoped, "alice") == "alice"
+    with pytest.raises(PermissionError):
+        _as_tenant("alice", scoped, "bob")